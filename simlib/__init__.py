@@ -0,0 +1,14 @@
+"""
+Shared cocotb testbench helpers for the weekNN labs.
+
+Testbenches put the repository root on sys.path (next to sim/ and sim/model)
+and import from here, e.g. `from simlib.axis import AXISSource`.
+"""
+import os
+
+if os.getenv("SIMLIB_PROFILE"):  # opt-in per-coroutine profile, see simlib/profiler.py
+    from simlib import profiler as _profiler
+    _profiler.start_from_env()
+elif os.getenv("SIMLIB_PYTIME"):  # opt-in Python/simulator time split, see simlib/pytime.py
+    from simlib import pytime as _pytime
+    _pytime.start_from_env()
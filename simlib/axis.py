@@ -0,0 +1,345 @@
+"""
+AXI-stream bus functional models: AXISSource, AXISSink and AXISMonitor.
+
+These do not go through cocotb_bus's BusDriver queue: a whole stream is handed
+over as an array (or a generator of arrays) and driven by a single coroutine
+that waits on one trigger per clock, with signal handles and edge triggers
+cached up front. The sink only wakes when tready changes, and the monitor
+samples once per clock into preallocated NumPy buffers.
+"""
+import collections
+import itertools
+
+import numpy as np
+import cocotb
+from cocotb.triggers import ClockCycles, Event, FallingEdge, RisingEdge
+from cocotb_bus.monitors import Monitor
+
+from simlib import patterns
+
+CHUNK = 1 << 16  # beats converted to Python ints at a time
+
+
+def gap_pattern(gaps):
+    """
+    Valid pattern that idles for gaps[i] cycles after beat i.
+
+    Same timing as queueing a write_single followed by a pause of gaps[i] for
+    each beat, without building any dicts.
+    """
+    gaps = np.asarray(gaps, dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(gaps + 1)[:-1]))
+    pattern = np.zeros(int((gaps + 1).sum()), dtype=bool)
+    pattern[starts] = True
+    return pattern
+
+
+def runs(pattern):
+    """(level, cycles) for every run of equal values in a bool pattern."""
+    pattern = np.asarray(pattern, dtype=bool)
+    if len(pattern) == 0:
+        return []
+    edges = np.flatnonzero(np.diff(pattern)) + 1
+    starts = np.concatenate(([0], edges))
+    lengths = np.diff(np.concatenate((starts, [len(pattern)])))
+    return list(zip(pattern[starts].astype(int).tolist(), lengths.tolist()))
+
+
+def _to_words(values, mask):
+    if mask >> 63:
+        # Wider than int64 (e.g. 112 bit squitters): stay in Python ints.
+        return [int(v) & mask for v in values]
+    return (np.asarray(values).astype(np.int64) & mask).tolist()
+
+
+def _word_chunks(data, mask):
+    """Turn an array, memoryview, sequence or iterator into lists of masked ints."""
+    if isinstance(data, (np.ndarray, memoryview, list, tuple)):
+        data = np.asarray(data)
+        for lo in range(0, len(data), CHUNK):
+            yield _to_words(data[lo:lo + CHUNK], mask)
+        return
+    it = iter(data)
+    while True:
+        first = next(it, None)
+        if first is None:
+            return
+        if isinstance(first, (np.ndarray, memoryview, list, tuple)):
+            # Generator of chunks, e.g. iq_capture.iter_words().
+            if len(first):
+                yield _to_words(first, mask)
+        else:
+            # Generator of scalars: batch them so the masking stays vectorized.
+            chunk = [first] + list(itertools.islice(it, CHUNK - 1))
+            yield _to_words(np.asarray(chunk, dtype=object), mask)
+
+
+class AXISSource:
+    """
+    AXI-stream master that drives {name}_axis_tdata/tvalid/tlast/tstrb of a DUT.
+
+    Values are written right after a rising edge and a transfer is counted at
+    the next rising edge that sees tvalid && tready. tvalid and tlast are only
+    written when they change, so a back-to-back burst costs one tdata write
+    and one tready read per beat.
+    """
+
+    def __init__(self, dut, name, clk):
+        self.clock = clk
+        self.tdata = getattr(dut, f"{name}_axis_tdata")
+        self.tvalid = getattr(dut, f"{name}_axis_tvalid")
+        self.tready = getattr(dut, f"{name}_axis_tready")
+        self.tlast = getattr(dut, f"{name}_axis_tlast")
+        self.tstrb = getattr(dut, f"{name}_axis_tstrb", None)
+        self.mask = (1 << len(self.tdata)) - 1
+        self.sent = 0  # accepted beats over the lifetime of the source
+        self.cycles = 0  # clock cycles spent inside send()
+        self.stream_cycles = 0  # clock cycles taken by the most recent send()
+        self.tdata.value = 0
+        self.tlast.value = 0
+        self.tvalid.value = 0
+        if self.tstrb is not None:
+            self.tstrb.value = (1 << len(self.tstrb)) - 1
+
+    def start(self, data, frame_length=None, valid_pattern=None):
+        """Run send() in the background and return its task."""
+        return cocotb.start_soon(self.send(data, frame_length, valid_pattern))
+
+    async def send(self, data, frame_length=None, valid_pattern=None):
+        """
+        Drive every beat of `data` and return once the last one is accepted.
+
+        data: NumPy array, memoryview, sequence, or an iterator of scalars or of
+            array chunks (consumed lazily, one chunk at a time).
+        frame_length: assert tlast every frame_length beats; the final beat of
+            the stream always carries tlast, like write_burst.
+        valid_pattern: optional bool array, one entry per cycle on which the
+            source is free to start a new beat (0 keeps tvalid low), repeated
+            cyclically. See gap_pattern().
+        """
+        pattern = None
+        if valid_pattern is not None:
+            pattern = np.asarray(valid_pattern, dtype=bool)
+            if not pattern.any():
+                raise ValueError("valid_pattern never asserts tvalid")
+            pattern = pattern.tolist()
+            plen = len(pattern)
+            p = 0
+
+        chunks = _word_chunks(data, self.mask)
+        chunk = next(chunks, [])
+        upcoming = next(chunks, None)
+        n = len(chunk)
+        i = 0
+        beat = 0  # beats of this stream accepted so far
+        valid = 0
+        last = 0
+        edge = RisingEdge(self.clock)
+        tdata, tvalid, tready, tlast = self.tdata, self.tvalid, self.tready, self.tlast
+        start_cycles = self.cycles
+
+        while n:
+            await edge
+            self.cycles += 1
+            if valid:
+                if not tready.value:
+                    continue
+                # Transfer happened on this edge.
+                i += 1
+                beat += 1
+                self.sent += 1
+                if i == n:
+                    if upcoming is None:
+                        break
+                    chunk, upcoming = upcoming, next(chunks, None)
+                    n = len(chunk)
+                    i = 0
+            if pattern is not None:
+                go = pattern[p]
+                p = p + 1 if p + 1 < plen else 0
+                if not go:
+                    if valid:
+                        tvalid.value = valid = 0
+                    continue
+            tdata.value = chunk[i]
+            if i + 1 == n and upcoming is None:
+                want_last = 1
+            else:
+                want_last = 1 if frame_length and (beat + 1) % frame_length == 0 else 0
+            if want_last != last:
+                tlast.value = last = want_last
+            if not valid:
+                tvalid.value = valid = 1
+
+        tvalid.value = 0
+        if last:
+            tlast.value = 0
+        self.stream_cycles = self.cycles - start_cycles
+        return beat
+
+
+class AXISSink:
+    """
+    AXI-stream slave that drives {name}_axis_tready of a DUT.
+
+    tready follows a queue of (level, cycles) runs. Each run starts on a
+    falling edge and lasts `cycles` rising edges, like the old S_AXIS_Driver
+    read/pause items; once the queue drains tready keeps its last level. The
+    coroutine wakes once per run rather than once per clock.
+    """
+
+    def __init__(self, dut, name, clk, ready=False):
+        self.clock = clk
+        self.tready = getattr(dut, f"{name}_axis_tready")
+        self.level = int(bool(ready))
+        self.tready.value = self.level
+        self._runs = collections.deque()
+        self._wake = Event()
+        self._thread = cocotb.start_soon(self._drive())
+
+    def hold(self, level, cycles=1):
+        """Queue tready = level for `cycles` clock cycles."""
+        if cycles > 0:
+            self._runs.append((int(bool(level)), int(cycles)))
+            self._wake.set()
+
+    def append(self, item):
+        """
+        Queue a read/pause dict the way the old drivers took them.
+
+        {'type': 'pause', 'duration': n} drops tready for n cycles; 'read',
+        'read_burst' and 'read_single' raise it for n cycles (default 1).
+        """
+        self.hold(item.get("type") != "pause", item.get("duration", 1))
+
+    def start(self, ready_pattern, after=True, cycles=None, seed=None):
+        """
+        Queue a bool pattern, one entry per cycle, then hold tready at `after`.
+
+        ready_pattern may also be a simlib.patterns spec such as
+        'bernoulli:p=0.7', generated for `cycles` cycles with `seed`.
+        """
+        if isinstance(ready_pattern, str):
+            if cycles is None:
+                raise ValueError("a named ready pattern needs a cycle count")
+            ready_pattern = patterns.named(ready_pattern, cycles, seed)
+        for level, cycles in runs(ready_pattern):
+            self.hold(level, cycles)
+        self.hold(after, 1)
+
+    @property
+    def idle(self):
+        """True once every queued run has been driven."""
+        return not self._runs
+
+    def kill(self):
+        if self._thread:
+            self._thread.kill()
+            self._thread = None
+
+    async def _drive(self):
+        falling_edge = FallingEdge(self.clock)
+        tready = self.tready
+        queue = self._runs
+        while True:
+            if not queue:
+                self._wake.clear()
+                await self._wake.wait()
+            await falling_edge
+            level, cycles = queue.popleft()
+            # Merge queued runs at the same level into one wait.
+            while queue and queue[0][0] == level:
+                cycles += queue.popleft()[1]
+            if level != self.level:
+                tready.value = self.level = level
+            await ClockCycles(self.clock, cycles)
+
+
+class AXISMonitor(Monitor):
+    """
+    Passive monitor for the {name}_axis_* handshake of a DUT.
+
+    Samples tvalid/tready once per rising edge (seeing the values the DUT
+    registers on that edge) and, on a transfer, stores tdata, tlast and the
+    cycle number into growable NumPy buffers (see data, last and cycle). Each
+    beat is passed to the callbacks as an int, or as the raw binstr with
+    binstr=True (which keeps x/z bits). Works with cocotb_bus's Scoreboard.
+    capture=False keeps only the count and callbacks.
+    """
+
+    def __init__(self, dut, name, clk, callback=None, signed=False, binstr=False,
+                 capture=True, capacity=1 << 12):
+        self.name = name
+        self.clock = clk
+        self.tdata = getattr(dut, f"{name}_axis_tdata")
+        self.tvalid = getattr(dut, f"{name}_axis_tvalid")
+        self.tready = getattr(dut, f"{name}_axis_tready")
+        self.tlast = getattr(dut, f"{name}_axis_tlast")
+        self.signed = signed
+        self.binstr = binstr
+        self.capture = capture
+        self.transactions = 0  # transfers seen
+        self.cycles = 0  # rising edges sampled
+        wide = len(self.tdata) > (64 if signed else 63)
+        dtype = object if binstr or wide else np.int64
+        self._data = np.empty(capacity if capture else 0, dtype=dtype)
+        self._last = np.empty(len(self._data), dtype=bool)
+        self._cycle = np.empty(len(self._data), dtype=np.int64)
+        super().__init__(callback)
+
+    @property
+    def data(self):
+        """tdata of every transfer so far."""
+        return self._data[:self.transactions]
+
+    @property
+    def last(self):
+        """tlast of every transfer so far."""
+        return self._last[:self.transactions]
+
+    @property
+    def cycle(self):
+        """Cycle (rising edge count since the monitor started) of every transfer."""
+        return self._cycle[:self.transactions]
+
+    def clear(self):
+        """Forget the captured beats; the cycle counter keeps running."""
+        self.transactions = 0
+
+    def remove_callback(self, callback):
+        """Undo add_callback()."""
+        self._callbacks.remove(callback)
+
+    def _grow(self):
+        n = max(2 * len(self._data), 1 << 12)
+        for attr in ("_data", "_last", "_cycle"):
+            old = getattr(self, attr)
+            new = np.empty(n, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    async def _monitor_recv(self):
+        rising_edge = RisingEdge(self.clock)
+        tdata, tvalid, tready, tlast = self.tdata, self.tvalid, self.tready, self.tlast
+        if self.binstr:
+            def read(v): return v.binstr
+        elif self.signed:
+            def read(v): return v.signed_integer
+        else:
+            def read(v): return v.integer
+        while True:
+            await rising_edge
+            self.cycles += 1
+            if not (tvalid.value and tready.value):
+                continue
+            value = read(tdata.value)
+            i = self.transactions
+            if self.capture:
+                if i == len(self._data):
+                    self._grow()
+                self._data[i] = value
+                self._last[i] = bool(tlast.value)
+                self._cycle[i] = self.cycles
+            self.transactions = i + 1
+            if self._callbacks:
+                self._recv(value)
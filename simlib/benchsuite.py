@@ -0,0 +1,231 @@
+"""
+Simulation speed benchmark with an append-only history.
+
+Runs fixed, seeded workloads, one per DUT, each as a single testcase of the
+DUT's own test module:
+
+    fir_1M        1,000,000 random samples through axis_fir_15 (test_stream)
+    cordic_100k   100,000 random vectors through axis_cordic (test_axis_cordic_sweep)
+    adsb_capture  the recorded ADS-B capture through top (test_a)
+    spi_500       500 back-to-back messages out of spi_tx (bench_point)
+    framer_65536  one 65536-beat data_framer frame (test_data_framer, which
+                  asserts every tlast-framed frame is BURST_LENGTH beats)
+
+Each workload is built first (through the build cache), then simulated in a
+fresh process, serially, so its numbers are its own:
+
+    wall_time      wall seconds of the simulator run
+    sim_time_ns    simulated time
+    cycles_per_second   simulated clock cycles per wall second
+    cpu_time       CPU seconds of the simulator process
+    python_time    wall seconds spent in cocotb's scheduler, i.e. in Python (simlib.pytime)
+    python_share   python_time over the wall time of the simulator run
+    peak_rss_mb    peak resident memory of the simulator process
+
+Every run appends one JSON line to the history file (default
+bench_history.jsonl at the repository root) with the commit, host and
+simulator. Each workload is compared with its own latest earlier passing run
+on the same host and simulator, so a `-k fir` run in between does not hide
+the other workloads' baselines: a workload whose wall time grew by more than
+--threshold (default 10%) is flagged, and the exit status is 1. A workload
+that cannot be built or run is recorded with status "error" and the suite
+carries on.
+
+    python -m simlib.benchsuite
+    python -m simlib.benchsuite -k fir --threshold 0.05
+    python -m simlib.benchsuite --no-record      # compare without appending
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # no getrusage on Windows: no CPU/memory numbers
+    resource = None
+
+from simlib import regress
+
+REPO_ROOT = regress.REPO_ROOT
+DEFAULT_HISTORY = REPO_ROOT / "bench_history.jsonl"
+DEFAULT_ROOT = REPO_ROOT / "sim_build" / "benchsuite"
+THRESHOLD = 0.10
+SEED = 1  # RANDOM_SEED of every run; the workloads' own generators are seeded too
+
+WORKLOADS = [
+    dict(name="fir_1M", test="week04/fir/sim/test_axis_fir_15.py", testcase="test_stream",
+         env=dict(FIR_STREAM_SAMPLES="1000000", FIR_STREAM_SEED="1")),
+    dict(name="cordic_100k", test="week05/cordic/sim/test_axis_cordic.py", testcase="test_axis_cordic_sweep",
+         env=dict(CORDIC_SWEEP_RANDOM="100000", CORDIC_SWEEP_SEED="1")),
+    dict(name="adsb_capture", test="week08/starter_code/sim/test_adsb_decode.py", testcase="test_a", env={}),
+    dict(name="spi_500", test="week02/spi_tx/sim/test_spi_tx.py", testcase="bench_point",
+         env=dict(SPI_BENCH_POINT=json.dumps(dict(messages=500)), SPI_BENCH_RESULT="bench_point.json")),
+    dict(name="framer_65536", test="week05/data_framer/sim/test_data_framer.py", testcase="test_data_framer",
+         env=dict(DATA_FRAMER_FRAMES="1", DATA_FRAMER_BURST_LENGTH="65536",
+                  AXIS_READY_PATTERN="bernoulli:p=0.4")),
+]
+
+
+def _isolated(fn, *args):
+    """fn(*args) in a fresh process, so its resource usage is only its own."""
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _measure(bench, workload, sim, build_dir, root):
+    pytime_file = Path(root) / bench["name"] / workload["testcase"] / "pytime.json"
+    pytime_file.parent.mkdir(parents=True, exist_ok=True)
+    pytime_file.unlink(missing_ok=True)
+    env = dict(workload["env"], SIMLIB_PYTIME=str(pytime_file))
+    case = regress.run_case(bench, workload["testcase"], sim, build_dir, root, extra_env=env, seed=SEED)
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)  # the simulator is this process's only child
+        case.update(cpu_time=usage.ru_utime + usage.ru_stime, peak_rss_mb=usage.ru_maxrss / 1024)  # KiB on Linux
+    if pytime_file.exists():
+        with open(pytime_file) as f:
+            pytime = json.load(f)
+        case.update(python_time=pytime["python_time"], python_share=pytime["python_share"])
+    return case
+
+
+def run_workload(workload, sim="icarus", root=DEFAULT_ROOT):
+    """Build and run one workload; returns its metrics (status 'error' with a message if it could not run)."""
+    bench = regress.discover_file(REPO_ROOT / workload["test"])
+    if "error" in bench:
+        return dict(status="error", message=bench["error"])
+    root = Path(root) / workload["name"]
+    try:
+        build_dir, build_time = _isolated(regress.build_bench, bench, sim, root)
+    except (SystemExit, Exception) as e:  # the runner exits on build errors; anything else crashed the worker
+        return dict(status="error", message=f"build failed: {e!r}")
+    try:
+        case = _isolated(_measure, bench, workload, sim, build_dir, root)
+    except (SystemExit, Exception) as e:
+        return dict(status="error", message=f"run failed: {e!r}", build_time=build_time)
+    keep = ("status", "message", "wall_time", "test_time", "sim_time_ns", "cycles", "cycles_per_second",
+            "cpu_time", "python_time", "python_share", "peak_rss_mb", "test_dir")
+    return dict({k: case[k] for k in keep if k in case}, build_time=build_time)
+
+
+def _git(*args):
+    try:
+        out = subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def load_history(path=DEFAULT_HISTORY):
+    """Every entry of a history file, oldest first."""
+    if not Path(path).exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(entry, path=DEFAULT_HISTORY):
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def baselines(history, entry):
+    """Per workload of `entry`, the latest earlier entry from the same host and simulator in which it passed."""
+    bases = {}
+    for name in entry["workloads"]:
+        base = next((h for h in reversed(history) if h["host"] == entry["host"] and h["sim"] == entry["sim"]
+                     and h["workloads"].get(name, {}).get("status") == "passed"), None)
+        if base is not None:
+            bases[name] = base
+    return bases
+
+
+def compare(entry, bases, threshold=THRESHOLD):
+    """Per workload wall time change against its baseline: dict(name -> dict(before, after, change, slower))."""
+    changes = {}
+    for name, now in entry["workloads"].items():
+        if name not in bases or now.get("status") != "passed":
+            continue
+        before = bases[name]["workloads"][name]
+        change = now["wall_time"] / before["wall_time"] - 1
+        changes[name] = dict(before=before["wall_time"], after=now["wall_time"], change=change,
+                             slower=change > threshold)
+    return changes
+
+
+def benchsuite(workloads=WORKLOADS, sim="icarus", root=DEFAULT_ROOT, log=print):
+    """Run `workloads` serially; returns a history entry (not yet appended)."""
+    entry = dict(time=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 commit=_git("rev-parse", "--short", "HEAD"),
+                 dirty=bool(_git("status", "--porcelain", "--untracked-files=no")),
+                 host=platform.node(), sim=sim, python=platform.python_version(), seed=SEED, workloads={})
+    for workload in workloads:
+        start = time.perf_counter()
+        result = entry["workloads"][workload["name"]] = run_workload(workload, sim, root)
+        log(f"INFO: {workload['name']} {result['status']} in {time.perf_counter() - start:.1f} s")
+    return entry
+
+
+def _num(value, fmt, scale=1):
+    return "-" if value is None else format(value * scale, fmt)
+
+
+def format_table(entry, changes):
+    header = ["workload", "status", "wall_s", "sim_ms", "cycles/s", "python", "cpu_s", "rss_MB", "vs_base"]
+    lines = []
+    for name, r in entry["workloads"].items():
+        if r["status"] == "error":
+            lines.append([name, "ERROR: " + r["message"]])
+            continue
+        change = changes.get(name)
+        lines.append([name, r["status"], f"{r['wall_time']:.1f}", _num(r.get("sim_time_ns"), ".2f", 1e-6),
+                      _num(r.get("cycles_per_second"), ".3g"), _num(r.get("python_share"), ".0%"),
+                      _num(r.get("cpu_time"), ".1f"), _num(r.get("peak_rss_mb"), ".0f"),
+                      "-" if change is None else f"{change['change']:+.1%}" + (" SLOWER" if change["slower"] else "")])
+    widths = [max(len(line[i]) for line in [header] + lines if len(line) == len(header))
+              for i in range(len(header))]
+    return "\n".join("  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(line, widths)))
+                     for line in [header] + lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the simulation speed benchmarks and track them over time.")
+    parser.add_argument("-k", dest="keyword", help="only workloads whose name contains this")
+    parser.add_argument("--sim", default=os.getenv("SIM", "icarus"))
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="append-only JSON lines history file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="flag workloads whose wall time grew by more than this fraction")
+    parser.add_argument("--no-record", dest="record", action="store_false", help="do not append to the history")
+    args = parser.parse_args()
+
+    workloads = [w for w in WORKLOADS if not args.keyword or args.keyword in w["name"]]
+    entry = benchsuite(workloads, args.sim)
+    bases = baselines(load_history(args.history), entry)
+    changes = compare(entry, bases, args.threshold)
+    if bases:
+        entry["baseline"] = {name: dict(time=base["time"], commit=base["commit"]) for name, base in bases.items()}
+    print(format_table(entry, changes))
+    compared = {}
+    for name, base in bases.items():
+        compared.setdefault(f"{base['commit']} ({base['time']})", []).append(name)
+    for base, names in compared.items():
+        print(f"compared with {base}: {', '.join(names)}")
+    missing = [name for name in entry["workloads"] if name not in bases]
+    if missing:
+        print(f"no earlier passing {args.sim} run on {entry['host']} in {args.history} for {', '.join(missing)}")
+    if args.record:
+        append_history(entry, args.history)
+    slower = [name for name, c in changes.items() if c["slower"]]
+    if slower:
+        print(f"SLOWER by more than {args.threshold:.0%}: {', '.join(slower)}")
+    if slower or any(r["status"] != "passed" for r in entry["workloads"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Content-hashed simulator build cache.
+
+cached_build(runner, ...) is a drop-in for runner.build(..., always=True). The
+build goes into a directory named after a hash of everything that affects the
+compiled image:
+- the contents of every source file, and of every file under the include
+  directories (so editing a header is a new build)
+- hdl_toplevel, parameters, defines, includes, build_args, timescale and waves
+- the simulator and its version, and the cocotb version
+An unchanged design is compiled once and then reused by every later run and by
+parallel workers. Each entry is built under an exclusive lock (<key>.lock), so
+concurrent workers with the same key wait for one compile instead of racing.
+
+Entries live in $SIMLIB_BUILD_CACHE (default: .build_cache at the repository
+root), with at most $SIMLIB_BUILD_CACHE_SIZE entries (default 32); the least
+recently used ones are deleted first. An entry is never deleted while it is in
+use: cached_build() and hold() take a shared lock on <key>.use that lasts
+until release() or the end of the process, and eviction needs it exclusively.
+Eviction deletes <key>.lock and <key>.use with the entry (and those of builds
+that failed), while it still holds them; a process that was waiting on one
+sees that the file it locked is gone and locks the new one instead.
+SIMLIB_BUILD_CACHE=0 turns the cache off. Only icarus and verilator builds are
+cached; other simulators build as before.
+
+Icarus bakes the path of its wave dump into the image; builds made here dump
+to <hdl_toplevel>.fst in the simulator's working directory instead, so each
+run's trace lands in its own test_dir rather than inside a shared entry.
+
+The same runner builds under SIM=icarus and SIM=verilator: cached_build adds
+what Verilator needs on top of the runner's build_args (see
+simulator_build_args).
+"""
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows: fall back to unlocked builds
+    fcntl = None
+
+import cocotb
+
+DEFAULT_CACHE = Path(__file__).resolve().parent.parent / ".build_cache"
+DEFAULT_SIZE = 32
+DONE = "build.json"  # written last, so its presence marks a complete entry
+FORMAT = 2  # bumped when the layout of an entry changes (2: relative wave dump path)
+
+# Simulators whose test step only needs the build directory, so a cache hit
+# can skip runner.build() entirely. Others always build normally.
+VERSION_COMMANDS = dict(
+    icarus=["iverilog", "-V"],
+    verilator=["verilator", "--version"],
+)
+
+
+def simulator_build_args(name, timescale=None):
+    """
+    Build arguments added for simulator `name`. Verilator stops on the lint
+    warnings -Wall turns on, only exposes parameters (dut.DATA_WIDTH.value)
+    that are public, and does not get the timescale from the cocotb runner.
+    """
+    if name != "verilator":
+        return []
+    args = ["-Wno-fatal", "--public-params"]
+    if timescale:
+        args += ["--timescale", "{}/{}".format(*timescale)]
+    return args
+
+
+def cache_dir():
+    """Root of the build cache, or None when SIMLIB_BUILD_CACHE=0."""
+    setting = os.getenv("SIMLIB_BUILD_CACHE")
+    if setting == "0":
+        return None
+    return Path(setting) if setting else DEFAULT_CACHE
+
+
+def _simulator_name(runner):
+    return type(runner).__name__.lower()
+
+
+@functools.lru_cache(maxsize=None)
+def simulator_version(name):
+    """First line of the simulator's version banner ('unknown' if it cannot be run)."""
+    try:
+        out = subprocess.run(VERSION_COMMANDS[name], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    lines = (out.stdout or out.stderr).strip().splitlines()
+    return lines[0] if lines else "unknown"
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _tree_digests(directory):
+    """(relative path, digest) of every file under `directory`, in a stable order."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return [(str(f.relative_to(directory)), _file_digest(f)) for f in sorted(directory.rglob("*")) if f.is_file()]
+
+
+def build_key(runner, sources, hdl_toplevel=None, parameters=None, timescale=None, waves=None,
+              build_args=(), includes=(), defines=None, **other):
+    """Hex digest identifying one compiled image."""
+    name = _simulator_name(runner)
+    manifest = dict(
+        simulator=name,
+        simulator_version=simulator_version(name),
+        cocotb=cocotb.__version__,
+        format=FORMAT,
+        sources=[(str(Path(s).resolve()), _file_digest(s)) for s in sources],
+        hdl_toplevel=hdl_toplevel,
+        parameters=dict(parameters or {}),
+        timescale=list(timescale) if timescale else None,
+        waves=bool(waves),
+        build_args=[str(a) for a in build_args],
+        includes=[(str(Path(i).resolve()), _tree_digests(i)) for i in includes],
+        defines=dict(defines or {}),
+        other=other,
+    )
+    blob = json.dumps(manifest, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:20], manifest
+
+
+def _is_current(f, path):
+    """Whether open file `f` is still the file at `path` (evict() unlinks lock files)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    fst = os.fstat(f.fileno())
+    return (st.st_dev, st.st_ino) == (fst.st_dev, fst.st_ino)
+
+
+@contextlib.contextmanager
+def _locked(path, blocking=True):
+    """Exclusive flock on `path`; yields False if non-blocking and already held."""
+    if fcntl is None:
+        yield True
+        return
+    while True:
+        f = open(path, "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            f.close()
+            yield False
+            return
+        if _is_current(f, path):
+            break
+        f.close()  # unlinked by evict() while we waited: lock its replacement
+    try:
+        yield True
+    finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+
+_held = {}  # entry -> open <key>.use file holding a shared lock
+
+
+def _use_lock(entry):
+    return entry.parent / f"{entry.name}.use"
+
+
+def hold(entry, create=False):
+    """
+    Mark a cache entry as in use until release(entry) or the end of the
+    process, so it is not evicted under a running simulation. Directories
+    that are not cache entries (no <key>.use, unless `create`) are left
+    alone. Returns the entry.
+    """
+    entry = Path(entry).resolve()
+    if fcntl is None or entry in _held:
+        return entry
+    while True:
+        try:
+            f = open(_use_lock(entry), "a" if create else "r")
+        except FileNotFoundError:
+            return entry
+        fcntl.flock(f, fcntl.LOCK_SH)
+        if _is_current(f, _use_lock(entry)):
+            _held[entry] = f
+            return entry
+        f.close()  # evicted while we waited
+
+
+def release(entry):
+    """End a hold(); the entry may be evicted again."""
+    f = _held.pop(Path(entry).resolve(), None)
+    if f is not None:
+        f.close()  # drops the lock
+
+
+def evict(root=None, keep=None):
+    """
+    Delete all but the `keep` most recently used complete entries, and the
+    lock files of failed builds (skipping entries in use or building).
+    """
+    root = Path(root or cache_dir() or DEFAULT_CACHE)
+    if keep is None:
+        keep = int(os.getenv("SIMLIB_BUILD_CACHE_SIZE", DEFAULT_SIZE))
+    if not root.is_dir():
+        return []
+    entries = sorted((d for d in root.iterdir() if (d / DONE).exists()),
+                     key=lambda d: (d / DONE).stat().st_mtime, reverse=True)
+    # Lock files without a complete entry are left by failed builds (or belong to one in progress).
+    orphans = {root / p.stem for p in root.iterdir() if p.suffix in (".lock", ".use")} - set(entries)
+    removed = []
+    for entry, complete in [(e, True) for e in entries[keep:]] + [(e, False) for e in sorted(orphans)]:
+        if entry.resolve() in _held:
+            continue
+        use, lock = _use_lock(entry), root / f"{entry.name}.lock"
+        with _locked(use, blocking=False) as unused, _locked(lock, blocking=False) as idle:
+            if unused and idle and (entry / DONE).exists() == complete:
+                shutil.rmtree(entry, ignore_errors=True)
+                # Unlinked while still locked: anyone waiting on them relocks the new files (see _locked).
+                use.unlink(missing_ok=True)
+                lock.unlink(missing_ok=True)
+                if complete:
+                    removed.append(entry)
+    return removed
+
+
+def _relative_dump_file(runner):
+    # Replaces the icarus runner's _create_iverilog_dump_file, which writes an
+    # absolute $dumpfile path inside the build directory.
+    with open(runner.iverilog_dump_file, "w") as f:
+        f.write("module cocotb_iverilog_dump();\n")
+        f.write("initial begin\n")
+        f.write(f'    $dumpfile("{runner.hdl_toplevel}.fst");\n')
+        f.write(f"    $dumpvars(0, {runner.hdl_toplevel});\n")
+        f.write("end\n")
+        f.write("endmodule\n")
+
+
+def cached_build(runner, build_dir="sim_build", **build_kwargs):
+    """
+    runner.build(**build_kwargs), but reusing an identical earlier build.
+
+    Leaves runner pointing at the cached image, so runner.test() works as after
+    a normal build; pass test_dir=build_dir to runner.test() so results and
+    logs still land in build_dir. Returns the directory holding the image.
+    """
+    build_kwargs.pop("always", None)
+    if _simulator_name(runner) == "icarus":
+        runner._create_iverilog_dump_file = functools.partial(_relative_dump_file, runner)
+    build_kwargs["build_args"] = list(build_kwargs.get("build_args", ())) + simulator_build_args(
+        _simulator_name(runner), build_kwargs.get("timescale"))
+    root = cache_dir()
+    if root is None or _simulator_name(runner) not in VERSION_COMMANDS:
+        runner.build(build_dir=build_dir, always=True, **build_kwargs)
+        return runner.build_dir
+
+    key, manifest = build_key(runner, **build_kwargs)
+    root.mkdir(parents=True, exist_ok=True)
+    entry = root / key
+    hold(entry, create=True)  # before the build lock, so eviction cannot slip in between
+    with _locked(root / f"{key}.lock"):
+        done = entry / DONE
+        if done.exists():
+            print(f"INFO: Reusing cached build {entry}")
+            runner.build_dir = entry
+            done.touch()  # most recently used
+        else:
+            shutil.rmtree(entry, ignore_errors=True)  # leftovers of a failed build
+            try:
+                runner.build(build_dir=entry, always=True, **build_kwargs)
+            except BaseException:
+                shutil.rmtree(entry, ignore_errors=True)
+                raise
+            with open(done, "w") as f:
+                json.dump(manifest, f, indent=1, default=str)
+    evict(root)
+    return entry
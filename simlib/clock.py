@@ -0,0 +1,21 @@
+"""
+Clock periods that every simulator can represent.
+
+cocotb's Clock needs both half periods to be a whole number of simulator
+steps. A 64 MHz clock (15625 ps) splits evenly at fs precision but not at ps,
+and which precision a run actually gets depends on the simulator (Verilator
+ignores the runner's timescale unless told, for one). even_period() makes the
+choice at run time instead of hard-coding a nudged period:
+
+    Clock(dut.clk, even_period(15625, "ps"), units="step")
+
+runs at exactly 15625 ps where the precision allows and at the nearest even
+step count above it otherwise (15626 ps at 1 ps precision).
+"""
+from cocotb.utils import get_sim_steps
+
+
+def even_period(period, units="ns"):
+    """`period` in simulator steps, rounded up to an even number of steps."""
+    steps = get_sim_steps(period, units, round_mode="ceil")
+    return steps + steps % 2
@@ -0,0 +1,86 @@
+"""
+Event-driven end of test for AXI-stream testbenches.
+
+Instead of `await ClockCycles(clk, generous_guess)`, a test awaits
+until_done() on its output monitor, which returns as soon as
+
+    beats   the monitor has seen the expected number of transfers, or
+    idle    the input has drained and the output bus has had no transfer for
+            `idle` cycles, and tvalid is low (not just held off by tready),
+
+whichever comes first, or after `timeout` cycles as a safety net (the test's
+own count/data asserts then report what is missing). With a `source` task
+(what AXISSource.start() returns) both conditions also wait for the whole
+stimulus to go in, so nothing the DUT does while consuming it is missed.
+
+    task = ind.start(data)
+    await until_done(outm, beats=len(data), source=task, timeout=10_000,
+                     budget=len(data) * 6, log=dut._log)
+
+`budget` is the fixed wait the test used to do; the log line and the returned
+dict report how many cycles stopping early saved. No coroutine runs per
+cycle: the monitor's callback flags the beat count and the idle check sleeps
+until the quiet period could next be over.
+"""
+import cocotb
+from cocotb.triggers import ClockCycles, Event, First
+
+
+async def until_done(monitor, beats=None, source=None, idle=None, timeout=100_000, budget=None, log=None):
+    """
+    Wait until `monitor` (an AXISMonitor) has `beats` transfers or has been idle
+    for `idle` cycles after `source` finished; give up after `timeout` cycles.
+
+    Returns dict(reason='beats' | 'idle' | 'timeout', cycles, budget, saved).
+    """
+    if beats is None and idle is None:
+        raise ValueError("until_done needs a beat count, an idle period or both")
+    start = monitor.cycles
+    quiet_since = [start]  # cycle of the latest transfer, or of the input draining
+    reached = Event()
+
+    def on_beat(_):
+        quiet_since[0] = monitor.cycles
+        if beats is not None and monitor.transactions >= beats:
+            reached.set()
+
+    async def done():
+        if source is not None and not source.done():
+            await source
+            quiet_since[0] = max(quiet_since[0], monitor.cycles)
+        while True:
+            if beats is not None and monitor.transactions >= beats:
+                return "beats"
+            if idle is None:
+                await reached.wait()
+                continue
+            quiet = monitor.cycles - quiet_since[0]
+            if quiet >= idle:
+                if not monitor.tvalid.value:
+                    return "idle"
+                # A beat held up by backpressure is not an idle bus: start the quiet period over.
+                quiet_since[0] = monitor.cycles
+                quiet = 0
+            await First(reached.wait(), ClockCycles(monitor.clock, idle - quiet))
+
+    monitor.add_callback(on_beat)
+    waiter = cocotb.start_soon(done())
+    try:
+        await First(waiter, ClockCycles(monitor.clock, timeout))
+    finally:
+        monitor.remove_callback(on_beat)
+    if waiter.done():
+        reason = waiter.result()
+    else:
+        waiter.kill()
+        reason = "timeout"
+
+    cycles = monitor.cycles - start
+    result = dict(reason=reason, cycles=cycles, budget=budget,
+                  saved=None if budget is None else budget - cycles)
+    if log is not None:
+        text = f"{monitor.name}: done after {cycles} cycles ({reason}, {monitor.transactions} beats)"
+        if budget is not None:
+            text += f", {budget - cycles} of the {budget} cycle budget saved"
+        (log.warning if reason == "timeout" else log.info)(text)
+    return result
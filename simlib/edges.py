@@ -0,0 +1,85 @@
+"""
+Transition recorder for slow serial buses (SPI, UART, ...).
+
+EdgeRecorder logs every value change of a few single-bit signals with its
+sim time into growable NumPy arrays. It runs one coroutine per signal that
+only wakes on that signal's Edge, so a bus toggling every 50 clocks costs a
+wake-up per toggle rather than two triggers per clock. Decoding is then done
+offline on the arrays (see week02/spi_tx/sim/model/spi_decode.py).
+
+    rec = EdgeRecorder(dut.cs, dut.dclk, dut.copi)
+    ...
+    events = rec.events()   # dict(time, signal, value), ordered by time
+
+Values are 0/1, or -1 for x/z. Each signal's value when the recorder starts
+is logged as its first event.
+"""
+import numpy as np
+import cocotb
+from cocotb.triggers import Edge
+from cocotb.utils import get_sim_time
+
+CAPACITY = 1 << 14
+
+
+def _level(handle):
+    value = handle.value
+    return int(value) if value.is_resolvable else -1
+
+
+class EdgeRecorder:
+    """Timestamped value changes of single-bit signals; see the module docstring."""
+
+    def __init__(self, *signals, units="step", capacity=CAPACITY):
+        self.signals = signals
+        self.names = [s._name for s in signals]
+        self.units = units
+        self.count = 0
+        self._time = np.empty(capacity, dtype=np.int64)
+        self._signal = np.empty(capacity, dtype=np.int8)
+        self._value = np.empty(capacity, dtype=np.int8)
+        for i, handle in enumerate(signals):
+            self._record(i, _level(handle))
+        self._threads = [cocotb.start_soon(self._watch(i, handle)) for i, handle in enumerate(signals)]
+
+    def _record(self, index, value):
+        n = self.count
+        if n == len(self._time):
+            for attr in ("_time", "_signal", "_value"):
+                old = getattr(self, attr)
+                new = np.empty(2 * len(old), dtype=old.dtype)
+                new[:n] = old
+                setattr(self, attr, new)
+        self._time[n] = get_sim_time(self.units)
+        self._signal[n] = index
+        self._value[n] = value
+        self.count = n + 1
+
+    async def _watch(self, index, handle):
+        edge = Edge(handle)
+        while True:
+            await edge
+            self._record(index, _level(handle))
+
+    def stop(self):
+        for thread in self._threads:
+            thread.kill()
+        self._threads = []
+
+    def clear(self):
+        """Drop the events so far, keeping each signal's current value as its first event."""
+        self.count = 0
+        for i, handle in enumerate(self.signals):
+            self._record(i, _level(handle))
+
+    def events(self):
+        """Copies of the recorded (time, signal index, value) arrays, stably sorted by time."""
+        order = np.argsort(self._time[:self.count], kind="stable")
+        return dict(time=self._time[:self.count][order], signal=self._signal[:self.count][order],
+                    value=self._value[:self.count][order], names=list(self.names))
+
+    def trace(self, name):
+        """(times, values) of one signal's changes."""
+        index = self.names.index(name)
+        sel = self._signal[:self.count] == index
+        return self._time[:self.count][sel], self._value[:self.count][sel]
@@ -0,0 +1,135 @@
+"""
+Precomputed tready patterns for AXISSink.start().
+
+Every generator returns a bool NumPy array with one entry per clock cycle
+(True = tready high), built in a handful of vectorized steps, so a stress
+pattern costs nothing per cycle in the testbench. The sink drives it with a
+single coroutine that only wakes when the level changes.
+
+seed=None draws the seed from Python's `random`, which cocotb seeds from
+RANDOM_SEED, so a failing run is reproduced by rerunning with the seed cocotb
+logged. Pass an explicit seed to pin one pattern across DUTs (e.g. the same
+backpressure on the FIR, the CORDIC and the skid buffer).
+
+named() builds a pattern from a short text spec, for picking the stress
+pattern from an environment variable:
+
+    always                  bernoulli:p=0.7
+    periodic:on=3,off=1     bursty:on=8,off=4
+    runs:lo=1,hi=10         trace:path/to/ready.npy
+
+from_env() does that for the sinks of the backpressure tests:
+AXIS_READY_PATTERN overrides their default spec and AXIS_READY_SEED pins the
+seed.
+"""
+import os
+import random
+
+import numpy as np
+
+
+def _rng(seed):
+    return np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+
+
+def always(cycles):
+    """tready held high."""
+    return np.ones(cycles, dtype=bool)
+
+
+def bernoulli(cycles, p=0.5, seed=None):
+    """tready high on each cycle independently with probability p."""
+    return _rng(seed).random(cycles) < p
+
+
+def periodic(cycles, on=1, off=1, phase=0):
+    """`on` cycles high then `off` cycles low, repeated, starting `phase` cycles into the period."""
+    period = np.concatenate((np.ones(on, dtype=bool), np.zeros(off, dtype=bool)))
+    return np.resize(np.roll(period, -phase), cycles)
+
+
+def _alternate(cycles, first, draw):
+    """Alternating high/low runs with lengths from draw(k), starting at level `first`."""
+    pattern = np.empty(0, dtype=bool)
+    level = first
+    while len(pattern) < cycles:
+        # Draw a batch of run lengths at a time, ~enough to finish in one go.
+        lengths = draw(max(16, cycles // 4))
+        levels = (np.arange(len(lengths)) + (0 if level else 1)) % 2 == 0
+        pattern = np.concatenate((pattern, np.repeat(levels, lengths)))
+        level = level if len(lengths) % 2 == 0 else not level
+    return pattern[:cycles]
+
+
+def bursty(cycles, on=8, off=8, seed=None):
+    """
+    Two-state Markov on/off pattern: runs of tready high and low with
+    geometric lengths averaging `on` and `off` cycles.
+    """
+    rng = _rng(seed)
+    first = bool(rng.random() < on / (on + off))
+
+    def draw(k):
+        lengths = np.empty(k, dtype=np.int64)
+        lengths[0::2] = rng.geometric(1 / on if first else 1 / off, (k + 1) // 2)
+        lengths[1::2] = rng.geometric(1 / off if first else 1 / on, k // 2)
+        return lengths
+
+    # Even batch sizes keep every batch starting at `first`, which draw() assumes.
+    return _alternate(cycles, first, lambda k: draw(k + k % 2))
+
+
+def random_runs(cycles, lo=1, hi=10, seed=None):
+    """
+    Alternating ready/pause runs of lo..hi cycles each (uniform), starting
+    with ready: the pattern the old testbenches built as read/pause dicts
+    with random.randint(1, 10) durations.
+    """
+    rng = _rng(seed)
+    return _alternate(cycles, True, lambda k: rng.integers(lo, hi + 1, k + k % 2))
+
+
+def replay(trace, cycles=None):
+    """
+    tready from a recorded trace: a bool/0-1 array, a .npy file, or a text
+    file of 0/1 characters (whitespace ignored). With `cycles`, the trace is
+    repeated or cut to that length.
+    """
+    if isinstance(trace, str):
+        if trace.endswith(".npy"):
+            trace = np.load(trace)
+        else:
+            with open(trace) as f:
+                text = "".join(f.read().split())
+            trace = np.frombuffer(text.encode(), dtype=np.uint8) == ord("1")
+    trace = np.asarray(trace).astype(bool)
+    return trace if cycles is None else np.resize(trace, cycles)
+
+
+GENERATORS = dict(always=always, bernoulli=bernoulli, periodic=periodic, bursty=bursty,
+                  runs=random_runs, trace=replay)
+
+
+def named(spec, cycles, seed=None):
+    """
+    Pattern from a spec such as 'bernoulli:p=0.7' or 'trace:ready.txt' (see
+    the module docstring); numeric parameters may be ints or floats.
+    """
+    kind, _, args = spec.partition(":")
+    if kind not in GENERATORS:
+        raise ValueError(f"unknown ready pattern {kind!r}, expected one of {sorted(GENERATORS)}")
+    if kind == "trace":
+        return replay(args, cycles)
+    kwargs = {}
+    for item in filter(None, args.split(",")):
+        key, _, value = item.partition("=")
+        kwargs[key.strip()] = float(value) if "." in value else int(value)
+    if kind in ("bernoulli", "bursty", "runs"):
+        kwargs["seed"] = seed
+    return GENERATORS[kind](cycles, **kwargs)
+
+
+def from_env(cycles, default="runs:lo=1,hi=10"):
+    """named($AXIS_READY_PATTERN or `default`, cycles, $AXIS_READY_SEED or None)."""
+    seed = os.getenv("AXIS_READY_SEED")
+    return named(os.getenv("AXIS_READY_PATTERN", default), cycles, None if seed is None else int(seed))
@@ -0,0 +1,161 @@
+"""
+AXI-stream performance probe for an s00_axis -> m00_axis pair.
+
+AXISProbe samples both handshakes once per rising edge (the same values the
+DUT registers on that edge, like AXISMonitor) and classifies every cycle of
+each interface as
+
+    transfer  tvalid && tready
+    stall     tvalid && !tready   (backpressure from the consumer)
+    bubble    !tvalid && tready   (consumer waiting on the producer)
+    idle      !tvalid && !tready
+
+Beats are matched in order, the n-th output beat against the n-th input
+beat, so the latency of every beat goes into a histogram and the number of
+beats inside the DUT (occupancy) is tracked cycle by cycle. Only the input
+beats still in flight are kept, so memory does not grow with the run.
+
+    probe = AXISProbe(dut, dut.s00_axis_aclk)
+    ...
+    summary = probe.report(dut._log)   # dict, also logged as a table
+
+Latencies are in rising edges from the input transfer to the output transfer
+(0 for a combinational path), the same numbers as outm.cycle - inm.cycle.
+"""
+import collections
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+STATES = ("idle", "bubble", "stall", "transfer")  # indexed by 2 * tvalid + tready
+
+
+def _percentile(histogram, q):
+    """Nearest-rank percentile q (0..100) of a histogram list indexed by value."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = max(1, -(-total * q // 100))  # ceil(total * q / 100)
+    seen = 0
+    for value, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return value
+
+
+class AXISProbe:
+    """
+    Cycle classification, latency histogram and occupancy for one AXI-stream pair.
+
+    input/output: interface prefixes ({name}_axis_tvalid/tready); output=None
+        probes a single interface, without latency or occupancy.
+    Starts sampling immediately; stop() ends it.
+    """
+
+    def __init__(self, dut, clk, input="s00", output="m00"):
+        self.clock = clk
+        self.names = [name for name in (input, output) if name is not None]
+        self._handles = [(getattr(dut, f"{name}_axis_tvalid"), getattr(dut, f"{name}_axis_tready"))
+                         for name in self.names]
+        self.cycles = 0  # rising edges sampled
+        self.counts = {name: [0, 0, 0, 0] for name in self.names}  # per STATES entry
+        self.first = {name: None for name in self.names}  # cycle of the first transfer
+        self.latest = {name: None for name in self.names}  # cycle of the latest transfer
+        self.histogram = []  # histogram[latency] = beats
+        self.occupancy = 0  # beats accepted at the input and not yet out
+        self.max_occupancy = 0
+        self._in_flight = collections.deque()  # input transfer cycle of each beat inside the DUT
+        self._thread = cocotb.start_soon(self._sample())
+
+    def stop(self):
+        if self._thread:
+            self._thread.kill()
+            self._thread = None
+
+    async def _sample(self):
+        rising_edge = RisingEdge(self.clock)
+        paired = len(self._handles) == 2
+        in_valid, in_ready = self._handles[0]
+        out_valid, out_ready = self._handles[1] if paired else (None, None)
+        in_counts = self.counts[self.names[0]]
+        out_counts = self.counts[self.names[1]] if paired else None
+        in_flight = self._in_flight
+        histogram = self.histogram
+        while True:
+            await rising_edge
+            self.cycles += 1
+            state = 2 * bool(in_valid.value) + bool(in_ready.value)
+            in_counts[state] += 1
+            if state == 3:
+                self._transfer(self.names[0])
+                if paired:
+                    in_flight.append(self.cycles)
+            if not paired:
+                continue
+            state = 2 * bool(out_valid.value) + bool(out_ready.value)
+            out_counts[state] += 1
+            if state == 3:
+                self._transfer(self.names[1])
+                if in_flight:
+                    latency = self.cycles - in_flight.popleft()
+                    if latency >= len(histogram):
+                        histogram.extend([0] * (latency + 1 - len(histogram)))
+                    histogram[latency] += 1
+            # The DUT only ever holds the beats it has accepted but not yet sent.
+            self.occupancy = len(in_flight)
+            if self.occupancy > self.max_occupancy:
+                self.max_occupancy = self.occupancy
+
+    def _transfer(self, name):
+        if self.first[name] is None:
+            self.first[name] = self.cycles
+        self.latest[name] = self.cycles
+
+    def summary(self):
+        """Per-interface cycle counts and rates, plus latency and occupancy, as plain Python types."""
+        result = dict(cycles=self.cycles)
+        for name in self.names:
+            counts = self.counts[name]
+            beats = counts[3]
+            span = self.latest[name] - self.first[name] + 1 if beats else 0
+            stats = dict(zip(STATES, counts))
+            stats.update(
+                beats_per_cycle=beats / self.cycles if self.cycles else 0.0,
+                # Rate from the first transfer to the last, ignoring the lead-in and drain.
+                active_beats_per_cycle=beats / span if span else 0.0,
+            )
+            result[name] = stats
+        if len(self.names) == 2:
+            hist = self.histogram
+            beats = sum(hist)
+            lat = dict(beats=beats, min=None, p50=None, p99=None, max=None, mean=None,
+                       histogram={value: count for value, count in enumerate(hist) if count})
+            if beats:
+                lat.update(min=min(lat["histogram"]), p50=_percentile(hist, 50), p99=_percentile(hist, 99),
+                           max=len(hist) - 1, mean=sum(v * c for v, c in enumerate(hist)) / beats)
+            result.update(latency=lat, max_occupancy=self.max_occupancy, in_flight=self.occupancy)
+        return result
+
+    def format(self, summary=None):
+        """Text table of summary()."""
+        s = summary or self.summary()
+        lines = [f"{'':>6} {'transfer':>9} {'stall':>9} {'bubble':>9} {'idle':>9} {'beats/cyc':>9} {'active':>9}"]
+        for name in self.names:
+            i = s[name]
+            lines.append(f"{name:>6} {i['transfer']:>9} {i['stall']:>9} {i['bubble']:>9} {i['idle']:>9} "
+                         f"{i['beats_per_cycle']:>9.4f} {i['active_beats_per_cycle']:>9.4f}")
+        if "latency" in s:
+            lat = s["latency"]
+            if lat["beats"]:
+                lines.append(f"latency (cycles): min {lat['min']} / p50 {lat['p50']} / p99 {lat['p99']} / "
+                             f"max {lat['max']} / mean {lat['mean']:.2f} over {lat['beats']} beats")
+                lines.append("latency histogram: " + " ".join(f"{v}:{c}" for v, c in lat["histogram"].items()))
+            lines.append(f"occupancy: max {s['max_occupancy']} beats, {s['in_flight']} still in flight")
+        return f"{s['cycles']} cycles\n" + "\n".join(lines)
+
+    def report(self, log=None):
+        """Return summary() and, given a logger, log it as a table."""
+        s = self.summary()
+        if log is not None:
+            log.info("AXIS probe: " + self.format(s))
+        return s
@@ -0,0 +1,204 @@
+"""
+Which testbench code a simulation's Python time goes to.
+
+Profiler is a PythonTime (simlib/pytime.py) that also times every coroutine
+cocotb resumes. It wraps Task._advance, the one call that resumes a task up
+to its next await, and runs it under sys.setprofile, so every Python call
+made while the task runs is timed from entry to return. Nothing is sampled:
+a 20 us monitor callback is booked as 20 us wherever it falls.
+
+Stacks are rooted at the running cocotb test and start at the coroutine that
+was resumed (the scheduler frames above it are dropped), so time in the FIR
+reference model reads
+
+    test_axis_fir_basic;axis:AXISMonitor._monitor_recv;monitors:Monitor._recv;scoreboard:StreamScoreboard.observe;...;fir_model:FIRModel.pull
+
+Two more stacks complete the run's wall time: [simulator] for time outside
+cocotb's scheduler, and [cocotb] for scheduler work that belongs to no
+testbench frame (trigger bookkeeping, resuming tasks). Calls into C
+(NumPy, the simulator's handles) count towards the Python function making
+them.
+
+A simulation opts in with SIMLIB_PROFILE=<prefix> (relative to the
+simulator's working directory, the test's build directory for the runners):
+
+    SIMLIB_PROFILE=fir python test_axis_fir_15.py
+
+When the simulator exits this writes
+
+    <prefix>.folded   one "frame;frame;... microseconds" line per stack, the
+                      input of flamegraph.pl, speedscope and inferno
+    <prefix>.txt      the top SIMLIB_PROFILE_TOP (default 20) coroutines and
+                      functions by total and self time, also printed
+
+Tracing every call slows the Python side down severalfold, so the absolute
+times are inflated; the ranking is what to go by. SIMLIB_PYTIME is ignored
+while profiling: the profile has the Python share too.
+"""
+import atexit
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import cocotb
+
+from simlib.pytime import PythonTime
+
+TOP = 20
+SIMULATOR = "[simulator]"
+COCOTB = "[cocotb]"
+_COCOTB_DIR = os.path.dirname(cocotb.__file__) + os.sep
+
+_active = None  # the running Profiler; Task._advance is wrapped while it is set
+_advance = None  # the unwrapped Task._advance
+
+
+def _label(code):
+    return f"{Path(code.co_filename).stem}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _current_test():
+    """Name of the running cocotb test, None between tests."""
+    test = getattr(cocotb.regression_manager, "_test", None)
+    return getattr(test, "__qualname__", None)
+
+
+def _profiled_advance(task, outcome):
+    profiler = _active
+    if profiler is None or profiler._tracing:
+        return _advance(task, outcome)
+    return profiler._advance(task, outcome)
+
+
+class Profiler(PythonTime):
+    """PythonTime that also times the stacks of every resumed coroutine; see the module docstring."""
+
+    def __init__(self, path=None, top=TOP):
+        super().__init__(path)
+        self.top = top
+        self.stacks = Counter()  # (test, stack) -> self time in seconds
+        self.advance_time = 0.0  # seconds inside Task._advance
+        self._tracing = False
+
+    def start(self):
+        global _active, _advance
+        from cocotb.task import Task
+
+        super().start()
+        if _advance is None:
+            _advance = Task._advance
+            Task._advance = _profiled_advance
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        super().stop()
+        print(self.format_table())
+
+    def _advance(self, task, outcome):
+        clock = time.perf_counter
+        stacks = self.stacks
+        test = _current_test()
+        frames = []  # [path, start, child time] per open call
+
+        def trace(frame, event, arg):
+            if event == "call":
+                path = frames[-1][0] if frames else ()
+                code = frame.f_code
+                # Leading cocotb frames (the task machinery) stay out of the path.
+                if path or not code.co_filename.startswith(_COCOTB_DIR):
+                    path = path + (_label(code),)
+                frames.append([path, clock(), 0.0])
+            elif event == "return" and frames:
+                path, start, child = frames.pop()
+                elapsed = clock() - start
+                stacks[test, path or (COCOTB,)] += elapsed - child
+                if frames:
+                    frames[-1][2] += elapsed
+
+        self._tracing = True
+        start = clock()
+        sys.setprofile(trace)
+        try:
+            return _advance(task, outcome)
+        finally:
+            sys.setprofile(None)
+            self._tracing = False
+            now = clock()
+            while frames:  # calls still open if tracing started mid-frame
+                path, begin, child = frames.pop()
+                stacks[test, path or (COCOTB,)] += now - begin - child
+                if frames:
+                    frames[-1][2] += now - begin
+            self.advance_time += now - start
+
+    def all_stacks(self):
+        """The coroutine stacks plus [cocotb] and [simulator], completing the wall time."""
+        stacks = Counter(self.stacks)
+        stacks[None, (COCOTB,)] += max(self.python_time - self.advance_time, 0.0)
+        stacks[None, (SIMULATOR,)] += max(self.wall_time - self.python_time, 0.0)
+        return stacks
+
+    def folded(self):
+        """The stacks in collapsed ("folded") flame graph format, in microseconds."""
+        lines = []
+        for (test, stack), seconds in sorted(self.all_stacks().items(), key=lambda item: str(item[0])):
+            us = round(seconds * 1e6)
+            if us:
+                lines.append(f"{';'.join((test,) + stack if test else stack)} {us}\n")
+        return "".join(lines)
+
+    def totals(self):
+        """(by_coroutine, self_time, total_time): seconds keyed by coroutine or function label."""
+        by_coroutine, self_time, total_time = Counter(), Counter(), Counter()
+        for (_, stack), seconds in self.all_stacks().items():
+            by_coroutine[stack[0]] += seconds
+            self_time[stack[-1]] += seconds
+            for label in set(stack):
+                total_time[label] += seconds
+        return by_coroutine, self_time, total_time
+
+    def format_table(self):
+        """Top `top` coroutines and functions as text."""
+        wall = self.wall_time
+        if not wall:
+            return "simlib profile: not started"
+        by_coroutine, self_time, total_time = self.totals()
+
+        def pct(seconds): return f"{100 * seconds / wall:6.1f}"
+
+        lines = [f"simlib profile: {wall:.1f} s wall, {self.python_time / wall:.0%} in Python, "
+                 f"{self.advance_time / wall:.0%} in testbench coroutines",
+                 "", "      ms  total%  coroutine"]
+        lines += [f" {seconds * 1e3:7.0f}  {pct(seconds)}  {label}"
+                  for label, seconds in by_coroutine.most_common(self.top)]
+        lines += ["", "      ms   self%  total%  function"]
+        lines += [f" {seconds * 1e3:7.0f}  {pct(seconds)}  {pct(total_time[label])}  {label}"
+                  for label, seconds in self_time.most_common(self.top)]
+        return "\n".join(lines)
+
+    def flush(self):
+        """Write <path>.folded and <path>.txt, each replaced in one step."""
+        self._flushed = time.perf_counter()
+        if not self.path:
+            return
+        for suffix, text in ((".folded", self.folded()), (".txt", self.format_table() + "\n")):
+            tmp = f"{self.path}{suffix}.tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, f"{self.path}{suffix}")
+
+
+def start_from_env():
+    """Start a Profiler writing to $SIMLIB_PROFILE.*, if set and running inside a simulator."""
+    path = os.getenv("SIMLIB_PROFILE")
+    if not path or cocotb.SIM_NAME is None:
+        return None
+    profiler = Profiler(path, int(os.getenv("SIMLIB_PROFILE_TOP", TOP))).start()
+    atexit.register(profiler.stop)
+    return profiler
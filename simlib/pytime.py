@@ -0,0 +1,117 @@
+"""
+Where a simulation's time goes: Python or the simulator.
+
+The simulator only runs Python through cocotb's scheduler: every trigger
+that fires (a clock edge, a Timer, ReadOnly, the start of a test) calls
+Scheduler._react, which resumes the coroutines waiting on it and returns when
+they have all yielded again. PythonTime wraps that entry point and adds up
+the wall time spent inside it; python_share is that total over the wall time
+of the run. It costs two perf_counter() calls per trigger, whatever the
+callbacks do, and sees every callback however short (a sampling thread
+cannot: it only gets the GIL once the callback has returned).
+
+A simulation opts in with SIMLIB_PYTIME=<file>: importing simlib (which every
+testbench does, before cocotb primes any trigger) then starts a PythonTime
+that writes
+
+    dict(python_time, wall_time, python_share, reacts)
+
+to <file> about once a second and again when the simulator exits.
+simlib.benchsuite sets it for its workloads.
+"""
+import atexit
+import json
+import os
+import time
+
+FLUSH_INTERVAL = 1.0  # seconds between writes of the result file
+
+_active = None  # the running PythonTime; Scheduler._react is wrapped while it is set
+_react = None  # the unwrapped Scheduler._react
+
+
+def _timed_react(scheduler, trigger):
+    timer = _active
+    if timer is None or timer._depth:
+        return _react(scheduler, trigger)
+    timer._depth += 1
+    start = time.perf_counter()
+    try:
+        return timer._react(scheduler, trigger)
+    finally:
+        now = time.perf_counter()
+        timer._depth -= 1
+        timer.python_time += now - start
+        timer.reacts += 1
+        if timer.path and now - timer._flushed > FLUSH_INTERVAL:
+            timer.flush()
+
+
+class PythonTime:
+    """Times cocotb's scheduler callbacks; see the module docstring."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.python_time = 0.0  # seconds inside Scheduler._react
+        self.reacts = 0  # outermost Scheduler._react calls
+        self._start = None
+        self._stop = None
+        self._flushed = 0.0
+        self._depth = 0
+
+    def start(self):
+        global _active, _react
+        from cocotb.scheduler import Scheduler
+
+        if _active is not None:
+            raise RuntimeError("a PythonTime is already running")
+        if _react is None:
+            _react = Scheduler._react
+            Scheduler._react = _timed_react
+        _active = self
+        self._start = self._flushed = time.perf_counter()
+        return self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+            self._stop = time.perf_counter()
+        self.flush()
+
+    def _react(self, scheduler, trigger):
+        """Run the scheduler for one trigger (subclasses add their own accounting here)."""
+        return _react(scheduler, trigger)
+
+    @property
+    def wall_time(self):
+        if self._start is None:
+            return 0.0
+        return (self._stop or time.perf_counter()) - self._start
+
+    def result(self):
+        wall = self.wall_time
+        return dict(python_time=self.python_time, wall_time=wall,
+                    python_share=self.python_time / wall if wall else None, reacts=self.reacts)
+
+    def flush(self):
+        """Write result() to `path`, replacing the previous write in one step."""
+        self._flushed = time.perf_counter()
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.result(), f)
+        os.replace(tmp, self.path)
+
+
+def start_from_env():
+    """Start a PythonTime writing to $SIMLIB_PYTIME, if set and running inside a simulator."""
+    import cocotb
+
+    path = os.getenv("SIMLIB_PYTIME")
+    if not path or cocotb.SIM_NAME is None:
+        return None
+    timer = PythonTime(path).start()
+    atexit.register(timer.stop)
+    return timer
@@ -0,0 +1,342 @@
+"""
+Repo-wide parallel regression.
+
+Finds every test_*.py under the given paths (default: the whole repository)
+and reads its runner configuration straight from the file: the keyword
+arguments of the cached_build() call in its __main__ runner (sources,
+hdl_toplevel, timescale, parameters, build_args, ...), its @cocotb.test
+functions and the period of its first Clock. Nothing is imported, so
+discovery also works for testbenches whose imports only resolve inside the
+simulator.
+
+The testbenches are then built (through the build cache) on a process pool,
+and as each build finishes its testcases are queued one simulator run each,
+so a slow testbench's tests spread over the cores instead of running in
+series. Results stream to stdout as they come in:
+
+    PASSED  week04/fir/test_axis_fir_15::test_b  3.1 s  10085 ns  3.3e+05 cycles/s
+
+and can be written as a JUnit XML report (one testsuite per testbench) and a
+JSON report, both with per-testcase wall time, simulated time and simulated
+clock cycles per wall second. Each testcase runs in
+sim_build/regress/<testbench>/<testcase> next to the repository root, without
+waves.
+
+    python -m simlib.regress                         # everything
+    python -m simlib.regress week04 week05 -k fir    # a subset
+    python -m simlib.regress --junit regress.xml --json regress.json
+    python -m simlib.regress --list                  # show what was discovered
+"""
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from simlib.sweep import read_results
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_ROOT = REPO_ROOT / "sim_build" / "regress"
+SKIP_DIRS = {".git", "sim_build", ".build_cache", "__pycache__"}
+# cached_build() arguments the regression sets itself
+RUN_ARGS = {"build_dir", "waves", "always"}
+NS = dict(fs=1e-6, ps=1e-3, ns=1.0, us=1e3, ms=1e6, sec=1e9)
+SAFE_BUILTINS = dict(dict=dict, list=list, tuple=tuple, str=str, int=int, float=float, bool=bool)
+
+
+def _try_eval(node, env):
+    """Value of an expression node using only `env`, or raise."""
+    return eval(compile(ast.Expression(node), "<runner>", "eval"), {"__builtins__": SAFE_BUILTINS}, env)
+
+
+def _bind(statements, env):
+    """Add every simple `name = <expr>` in `statements` that evaluates to `env`, in order."""
+    for stmt in statements:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            try:
+                env[stmt.targets[0].id] = _try_eval(stmt.value, env)
+            except Exception:
+                env.pop(stmt.targets[0].id, None)
+
+
+def _call_name(node):
+    func = node.func
+    return func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+
+
+def _is_cocotb_test(decorator):
+    target = decorator.func if isinstance(decorator, ast.Call) else decorator
+    return isinstance(target, ast.Attribute) and target.attr == "test" and getattr(target.value, "id", "") == "cocotb"
+
+
+def discover_file(path):
+    """
+    Runner configuration of one test_*.py, as a dict:
+        name, file, module, build (the cached_build keyword arguments),
+        testcases, clock_ns (period of the first Clock, None if not found)
+    or with `error` set when the file has no cached_build() call that can be read.
+    """
+    path = Path(path).resolve()
+    bench = dict(name=str(path.relative_to(REPO_ROOT).with_suffix("")).replace("/sim/", "/"),
+                 file=str(path), module=path.stem)
+    try:
+        tree = ast.parse(path.read_text(), filename=str(path))
+    except SyntaxError as e:
+        return dict(bench, error=f"syntax error: {e}")
+
+    module_env = dict(__file__=str(path), Path=Path, os=os)
+    _bind(tree.body, module_env)
+
+    bench["testcases"] = [node.name for node in tree.body
+                          if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                          and any(_is_cocotb_test(d) for d in node.decorator_list)]
+
+    bench["clock_ns"] = None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _call_name(node) == "Clock" and len(node.args) >= 2:
+            try:
+                call, default_units = node, "step"
+                if isinstance(node.args[1], ast.Call) and _call_name(node.args[1]) == "even_period":
+                    # the nominal period; the simulator may run it a step longer
+                    call, default_units = node.args[1], "ns"
+                args = call.args[1:] if call is node else call.args
+                period = _try_eval(args[0], module_env)
+                units = _try_eval(args[1], module_env) if len(args) > 1 else next(
+                    (_try_eval(k.value, module_env) for k in call.keywords if k.arg == "units"), default_units)
+                bench["clock_ns"] = period * NS[units]
+                break
+            except Exception:
+                continue
+
+    for func in tree.body:
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        call = next((node for node in ast.walk(func)
+                     if isinstance(node, ast.Call) and _call_name(node) == "cached_build"), None)
+        if call is None:
+            continue
+        env = dict(module_env)
+        defaults = func.args.defaults
+        for arg, default in zip(func.args.args[len(func.args.args) - len(defaults):], defaults):
+            env[arg.arg] = _try_eval(default, module_env)
+        _bind(func.body, env)
+        build = {}
+        for keyword in call.keywords:
+            if keyword.arg is None or keyword.arg in RUN_ARGS:
+                continue
+            try:
+                build[keyword.arg] = _try_eval(keyword.value, env)
+            except Exception as e:
+                return dict(bench, runner=func.name, error=f"cannot read {keyword.arg}= of cached_build: {e}")
+        if not build.get("hdl_toplevel") or not build.get("sources"):
+            return dict(bench, runner=func.name, error="cached_build() without sources or hdl_toplevel")
+        return dict(bench, runner=func.name, build=build)
+    return dict(bench, error="no cached_build() runner")
+
+
+def discover(paths=None, keyword=None):
+    """discover_file() for every test_*.py under `paths` (files or directories), sorted by name."""
+    files = []
+    for p in [Path(p).resolve() for p in (paths or [REPO_ROOT])]:
+        if p.is_file():
+            files.append(p)
+            continue
+        for dirpath, dirnames, filenames in os.walk(p):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            files += [Path(dirpath) / f for f in filenames if f.startswith("test_") and f.endswith(".py")]
+    benches = [discover_file(f) for f in sorted(set(files))]
+    if keyword:
+        benches = [b for b in benches if keyword in b["name"]]
+    return benches
+
+
+_base_path = list(sys.path)
+
+
+def _use_paths(bench):
+    """sys.path (and so the simulator's PYTHONPATH) as the testbench's own runner sets it up."""
+    sim_dir = Path(bench["file"]).parent
+    sys.path[:] = _base_path + [str(REPO_ROOT), str(sim_dir), str(sim_dir / "model"), str(sim_dir.parent / "hdl")]
+
+
+def build_bench(bench, sim, root):
+    """Compile one testbench (or fetch it from the build cache); returns (build_dir, build_time)."""
+    from cocotb.runner import get_runner
+    from simlib.build_cache import cached_build
+
+    _use_paths(bench)
+    runner = get_runner(sim)
+    start = time.perf_counter()
+    cached_build(runner, build_dir=Path(root) / bench["name"] / "build", waves=False, **bench["build"])
+    return str(runner.build_dir), time.perf_counter() - start
+
+
+def run_case(bench, testcase, sim, build_dir, root, extra_env=None, seed=None):
+    """Run one testcase against a finished build; returns its result dict."""
+    from cocotb.runner import get_runner
+    from simlib.build_cache import hold
+
+    _use_paths(bench)
+    hold(build_dir)  # kept until this worker exits, so a cache entry is not evicted under the run
+    test_dir = Path(root) / bench["name"] / testcase
+    test_dir.mkdir(parents=True, exist_ok=True)
+    runner = get_runner(sim)
+    runner.build_dir = Path(build_dir)
+    case = dict(bench=bench["name"], name=testcase, classname=bench["module"], test_dir=str(test_dir))
+    start = time.perf_counter()
+    try:
+        results = runner.test(
+            hdl_toplevel=bench["build"]["hdl_toplevel"],
+            test_module=bench["module"],
+            testcase=testcase,
+            test_dir=test_dir,
+            extra_env=extra_env or {},
+            seed=seed,
+            log_file=test_dir / "sim.log",
+            waves=False
+        )
+        [result] = [r for r in read_results(results) if r["name"] == testcase] or [None]
+    except SystemExit as e:  # the runner exits on simulator errors
+        return dict(case, status="error", message=str(e), wall_time=time.perf_counter() - start)
+    wall_time = time.perf_counter() - start
+    if result is None:
+        return dict(case, status="error", message=f"no result, see {test_dir / 'sim.log'}", wall_time=wall_time)
+    cycles = result["sim_time_ns"] / bench["clock_ns"] if bench["clock_ns"] else None
+    return dict(case, status=result["status"], wall_time=wall_time, test_time=result["wall_time"],
+                sim_time_ns=result["sim_time_ns"], cycles=cycles,
+                cycles_per_second=cycles / wall_time if cycles is not None and wall_time else None)
+
+
+def format_case(case):
+    line = f"{case['status'].upper():<7} {case['bench']}::{case['name']}  {case['wall_time']:.1f} s"
+    if case["status"] == "error":
+        return f"{line}  {case['message']}"
+    line += f"  {case['sim_time_ns']:.0f} ns"
+    if case["cycles_per_second"] is not None:
+        line += f"  {case['cycles_per_second']:.3g} cycles/s"
+    return line
+
+
+def regress(benches, sim="icarus", root=DEFAULT_ROOT, workers=None, log=print):
+    """
+    Build and run every discovered testbench on a process pool, logging each
+    build and testcase as it finishes. Returns the benches, each with
+    build_time and its list of testcase results (in discovery order).
+    """
+    benches = [dict(b, results=[]) for b in benches]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        pending = {}
+        for bench in benches:
+            if "error" in bench:
+                log(f"SKIP    {bench['name']}: {bench['error']}")
+            else:
+                pending[pool.submit(build_bench, bench, sim, root)] = (bench, None)
+        while pending:
+            future = next(as_completed(pending))
+            bench, testcase = pending.pop(future)
+            if testcase is None:
+                try:
+                    build_dir, bench["build_time"] = future.result()
+                except SystemExit as e:
+                    bench["error"] = f"build failed: {e}"
+                    log(f"ERROR   {bench['name']}: {bench['error']}")
+                    continue
+                log(f"BUILT   {bench['name']} in {bench['build_time']:.1f} s")
+                for name in bench["testcases"]:
+                    pending[pool.submit(run_case, bench, name, sim, build_dir, root)] = (bench, name)
+            else:
+                case = future.result()
+                bench["results"].append(case)
+                log(format_case(case))
+    for bench in benches:
+        order = {name: i for i, name in enumerate(bench.get("testcases", []))}
+        bench["results"].sort(key=lambda case: order[case["name"]])
+    return benches
+
+
+def summary(benches):
+    cases = [case for bench in benches for case in bench["results"]]
+    counts = {s: sum(c["status"] == s for c in cases) for s in ("passed", "failed", "skipped")}
+    counts["errors"] = sum(c["status"] == "error" for c in cases)
+    counts["build_errors"] = sum("error" in bench for bench in benches)
+    return counts
+
+
+def write_junit(benches, path):
+    """JUnit XML: a testsuite per testbench; testcases carry sim_time_ns and cycles_per_second attributes."""
+    suites = ET.Element("testsuites")
+    for bench in benches:
+        cases = bench["results"]
+        suite = ET.SubElement(suites, "testsuite", name=bench["name"], tests=str(max(len(cases), 1)),
+                              failures=str(sum(c["status"] == "failed" for c in cases)),
+                              errors=str(sum(c["status"] == "error" for c in cases) + ("error" in bench)),
+                              skipped=str(sum(c["status"] == "skipped" for c in cases)),
+                              time=f"{bench.get('build_time', 0) + sum(c['wall_time'] for c in cases):.3f}")
+        if "error" in bench:
+            ET.SubElement(ET.SubElement(suite, "testcase", name="build", classname=bench["module"]),
+                          "error", message=bench["error"])
+        for case in cases:
+            attrs = dict(name=case["name"], classname=case["classname"], time=f"{case['wall_time']:.3f}")
+            if case.get("sim_time_ns") is not None:
+                attrs["sim_time_ns"] = repr(case["sim_time_ns"])
+            if case.get("cycles_per_second") is not None:
+                attrs["cycles_per_second"] = f"{case['cycles_per_second']:.1f}"
+            element = ET.SubElement(suite, "testcase", **attrs)
+            if case["status"] == "failed":
+                ET.SubElement(element, "failure", message=f"see {case['test_dir']}/sim.log")
+            elif case["status"] == "error":
+                ET.SubElement(element, "error", message=case["message"])
+            elif case["status"] == "skipped":
+                ET.SubElement(element, "skipped")
+    ET.indent(suites)
+    ET.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_json(benches, path, **info):
+    with open(path, "w") as f:
+        json.dump(dict(info, summary=summary(benches), benches=benches), f, indent=1, default=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and run every cocotb testbench in parallel.")
+    parser.add_argument("paths", nargs="*", help="directories or test files (default: the whole repository)")
+    parser.add_argument("-k", dest="keyword", help="only testbenches whose name contains this")
+    parser.add_argument("--sim", default=os.getenv("SIM", "icarus"))
+    parser.add_argument("--workers", type=int, default=None, help="simulator processes (default: one per CPU)")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="build/test directory")
+    parser.add_argument("--junit", help="write a JUnit XML report here")
+    parser.add_argument("--json", help="write a JSON report here")
+    parser.add_argument("--list", action="store_true", help="print the discovered configuration and exit")
+    args = parser.parse_args()
+
+    benches = discover(args.paths, args.keyword)
+    if args.list:
+        for bench in benches:
+            if "error" in bench:
+                print(f"{bench['name']}: {bench['error']}")
+            else:
+                build = bench["build"]
+                print(f"{bench['name']}: {build['hdl_toplevel']} from {len(build['sources'])} sources, "
+                      f"timescale {build.get('timescale')}, clock {bench['clock_ns']} ns, "
+                      f"tests {', '.join(bench['testcases'])}")
+        return
+
+    start = time.perf_counter()
+    benches = regress(benches, args.sim, args.root, args.workers)
+    wall_time = time.perf_counter() - start
+    counts = summary(benches)
+    print(", ".join(f"{n} {s.replace('_', ' ')}" for s, n in counts.items()) + f" in {wall_time:.1f} s")
+    if args.junit:
+        write_junit(benches, args.junit)
+    if args.json:
+        write_json(benches, args.json, sim=args.sim, wall_time=wall_time)
+    if counts["failed"] or counts["errors"] or counts["build_errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Streaming scoreboard for long AXI-stream runs.
+
+cocotb_bus's Scoreboard pops one Python list entry per transaction and only
+logs mismatches. StreamScoreboard instead collects the expected and actual
+streams in growable NumPy buffers and compares them a block at a time as
+beats arrive. Blocks that have been compared are dropped (apart from a little
+history kept for context), so memory stays bounded however long the run is.
+
+    sb = StreamScoreboard("m00", log=dut._log)
+    sb.attach(outm)                       # actual beats from an AXISMonitor
+    inm.add_callback(lambda x: sb.expect(model(x)))   # or sb.expect(array)
+    sb.expect_from(model.pull)            # or pull expected blocks only when needed
+    ...
+    sb.check()                            # AssertionError with context on a mismatch
+
+Options:
+    atol, rtol  |actual - expected| <= atol + rtol * |expected| counts as a match
+    latency     the actual stream may start with up to `latency` extra beats
+                (e.g. pipeline warm-up outputs); the first block picks the
+                offset that lines the streams up, and the extra beats are skipped
+    reorder     a beat also matches any expected value up to `reorder`
+                positions before or after its own
+"""
+import numpy as np
+
+BLOCK = 4096  # beats compared at a time
+CONTEXT = 4  # beats shown either side of the first mismatch
+
+
+class _Stream:
+    """Append-only buffer; `lo` is the first beat not yet compared, `base` the index of buf[0]."""
+
+    def __init__(self, dtype, capacity, keep):
+        self.buf = np.empty(capacity, dtype=dtype)
+        self.lo = 0
+        self.hi = 0
+        self.base = 0
+        self.keep = keep  # compared beats kept in front of lo
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def _room(self, n):
+        drop = max(self.lo - self.keep, 0)
+        if drop and self.hi + n > len(self.buf):
+            # Slide the live part down over the compared beats.
+            self.buf[:self.hi - drop] = self.buf[drop:self.hi]
+            self.lo -= drop
+            self.hi -= drop
+            self.base += drop
+        if self.hi + n > len(self.buf):
+            grown = np.empty(max(2 * len(self.buf), self.hi + n), dtype=self.buf.dtype)
+            grown[:self.hi] = self.buf[:self.hi]
+            self.buf = grown
+
+    def push(self, value):
+        if self.hi == len(self.buf):
+            self._room(1)
+        self.buf[self.hi] = value
+        self.hi += 1
+
+    def extend(self, values):
+        values = np.asarray(values)
+        self._room(len(values))
+        self.buf[self.hi:self.hi + len(values)] = values
+        self.hi += len(values)
+
+    def window(self, start, stop):
+        """Beats with absolute index in [start, stop) that are still buffered."""
+        lo = max(start - self.base, 0)
+        return self.buf[lo:min(max(stop - self.base, lo), self.hi)]
+
+
+class StreamScoreboard:
+    """Block-wise comparison of an expected and an actual stream; see the module docstring."""
+
+    def __init__(self, name="scoreboard", atol=0, rtol=0, latency=0, reorder=0,
+                 block=BLOCK, context=CONTEXT, dtype=np.int64, fail_immediately=False, log=None):
+        self.name = name
+        self.atol = atol
+        self.rtol = rtol
+        self.latency = latency
+        self.reorder = reorder
+        self.block = block
+        self.context = context
+        self.fail_immediately = fail_immediately
+        self.log = log
+        keep = max(context, reorder)
+        self._expected = _Stream(dtype, 2 * block, keep)
+        self._actual = _Stream(dtype, 2 * block, keep)
+        self.compared = 0  # beats compared so far
+        self.errors = 0  # mismatching beats
+        self.skipped = None  # leading actual beats dropped to line up (None until aligned)
+        self.first_mismatch = None
+        self._sources = []
+
+    def attach(self, monitor):
+        """Feed every beat a monitor receives into the actual stream."""
+        monitor.add_callback(self.observe)
+        return self
+
+    def expect(self, values):
+        """Add one expected value or an array (list, tuple) of them."""
+        self._add(self._expected, values)
+
+    def expect_from(self, source):
+        """
+        Take expected values from `source()` (returning an array of the ones
+        ready so far) instead of being handed them: it is called whenever a
+        block of actual beats is waiting for expected ones, and on flush().
+        """
+        self._sources.append(source)
+        return self
+
+    def _pull(self):
+        for source in self._sources:
+            self._expected.extend(source())
+
+    def observe(self, values):
+        """Add one actual value or an array (list, tuple) of them."""
+        self._add(self._actual, values)
+
+    def _add(self, stream, values):
+        if isinstance(values, (np.ndarray, list, tuple)):
+            stream.extend(values)
+        else:
+            stream.push(values)
+        exp, act = self._expected, self._actual
+        if act.hi - act.lo >= self.block and exp.hi - exp.lo < self.block and self._sources:
+            self._pull()
+        if act.hi - act.lo >= self.block and exp.hi - exp.lo >= self.block:
+            self._compare()
+
+    def _close(self, actual, expected):
+        if not self.atol and not self.rtol:
+            return actual == expected
+        return np.abs(actual - expected) <= self.atol + self.rtol * np.abs(expected)
+
+    def _align(self, final):
+        # Pick the number of leading actual beats to drop, 0..latency.
+        exp, act = self._expected, self._actual
+        if not final and min(len(exp), len(act) - self.latency) < self.block:
+            return False
+        n = min(len(exp), self.block)
+        e = exp.buf[exp.lo:exp.lo + n]
+        best, best_hits = 0, -1
+        for lag in range(min(self.latency, len(act)) + 1):
+            a = act.buf[act.lo + lag:min(act.lo + lag + n, act.hi)]
+            hits = int(self._close(a, e[:len(a)]).sum())
+            if hits == len(a):
+                best = lag
+                break
+            if hits > best_hits:
+                best, best_hits = lag, hits
+        act.lo += best
+        self.skipped = best
+        return True
+
+    def _compare(self, final=False):
+        if self.skipped is None:
+            if not self._align(final):
+                return
+        exp, act = self._expected, self._actual
+        # Hold back `reorder` expected beats so every actual beat sees its whole window.
+        n = min(len(act), len(exp) - (0 if final else self.reorder))
+        if n <= 0:
+            return
+        a = act.buf[act.lo:act.lo + n]
+        ok = self._close(a, exp.buf[exp.lo:exp.lo + n])
+        for d in range(1, self.reorder + 1):
+            ahead = exp.buf[exp.lo + d:min(exp.lo + d + n, exp.hi)]
+            ok[:len(ahead)] |= self._close(a[:len(ahead)], ahead)
+            behind_lo = max(exp.lo - d, 0)
+            behind = exp.buf[behind_lo:exp.lo - d + n]
+            ok[n - len(behind):] |= self._close(a[n - len(behind):], behind)
+        bad = np.flatnonzero(~ok)
+        if len(bad):
+            self.errors += len(bad)
+            if self.first_mismatch is None:
+                self._record(self.compared + int(bad[0]), exp.base + exp.lo + int(bad[0]),
+                             act.base + act.lo + int(bad[0]))
+        exp.lo += n
+        act.lo += n
+        self.compared += n
+
+    def _record(self, index, exp_at, act_at):
+        c = self.context
+        self.first_mismatch = dict(
+            index=index,
+            context_start=index - (exp_at - max(exp_at - c, self._expected.base)),
+            expected=self._expected.window(exp_at, exp_at + 1).tolist()[0],
+            actual=self._actual.window(act_at, act_at + 1).tolist()[0],
+            expected_context=self._expected.window(exp_at - c, exp_at + c + 1).tolist(),
+            actual_context=self._actual.window(act_at - c, act_at + c + 1).tolist(),
+        )
+        if self.log is not None:
+            self.log.error(self.describe())
+        if self.fail_immediately:
+            raise AssertionError(self.describe())
+
+    def flush(self):
+        """Compare everything buffered so far (call before reading results mid-run)."""
+        self._pull()
+        self._compare(final=True)
+
+    @property
+    def pending_expected(self):
+        """Expected beats not matched by an actual beat yet (outputs still in flight)."""
+        return len(self._expected)
+
+    @property
+    def pending_actual(self):
+        """Actual beats with no expected value to compare against."""
+        return len(self._actual)
+
+    def describe(self):
+        """One-paragraph summary, including the first mismatch with its surroundings."""
+        text = f"{self.name}: {self.compared} beats compared, {self.errors} mismatched"
+        if self.skipped:
+            text += f", {self.skipped} leading output beats skipped"
+        if self.pending_expected or self.pending_actual:
+            text += f", {self.pending_expected} expected and {self.pending_actual} actual beats unmatched"
+        m = self.first_mismatch
+        if m is not None:
+            text += (f"\nfirst mismatch at beat {m['index']}: expected {m['expected']}, got {m['actual']}"
+                     f"\n  expected[{m['context_start']}:]: {m['expected_context']}"
+                     f"\n  actual  [{m['context_start']}:]: {m['actual_context']}")
+        return text
+
+    def check(self, allow_pending=0):
+        """
+        Compare what is left and raise AssertionError on any mismatch.
+
+        allow_pending: expected beats that may still be in flight (not yet
+        seen at the output) when the test stops.
+        """
+        self.flush()
+        if self.log is not None:
+            self.log.info(self.describe())
+        assert self.errors == 0 and self.pending_actual == 0 and self.pending_expected <= allow_pending, \
+            self.describe()
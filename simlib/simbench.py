@@ -0,0 +1,122 @@
+"""
+Icarus vs Verilator benchmark of the lab testbenches.
+
+Runs each testbench's regression (simlib.regress) once per simulator, with the
+build cache off so every design is really compiled, and reports per
+testbench and simulator:
+
+    compile_s   wall time of the build
+    cycles      simulated clock cycles over all its testcases
+    cycles/s    simulated cycles per second of simulation (cocotb's own
+                per-test wall time, so simulator start-up is not counted)
+    wall_s      compile plus every testcase run, start-up included
+    passed      passed / run testcases (skipped ones are not counted)
+
+and the Verilator/Icarus ratio of cycles/s and wall_s. Runs are serial by
+default so the timings do not compete for cores.
+
+    python -m simlib.simbench
+    python -m simlib.simbench --sims icarus verilator -k adsb --json simbench.json
+"""
+import argparse
+import json
+import os
+import time
+
+from simlib import regress
+
+# FIR 15, j_math, CORDIC, skid buffer, data_framer, ADS-B top
+BENCHES = [
+    "week04/fir/test_axis_fir_15",
+    "week04/j_math/test_j_math_starter",
+    "week05/cordic/test_axis_cordic",
+    "week06/skid/test_skid_buffer",
+    "week05/data_framer/test_data_framer",
+    "week08/starter_code/test_adsb_decode",
+]
+SIMS = ["icarus", "verilator"]
+
+
+def bench_row(bench, sim):
+    """Summary numbers of one testbench's regression on one simulator."""
+    row = dict(bench=bench["name"], sim=sim)
+    if "error" in bench:
+        return dict(row, error=bench["error"])
+    run = [c for c in bench["results"] if c["status"] in ("passed", "failed")]
+    errors = [c for c in bench["results"] if c["status"] == "error"]
+    cycles = sum(c["cycles"] for c in run) if bench["clock_ns"] else None
+    test_time = sum(c["test_time"] for c in run)
+    row.update(compile_time=bench["build_time"], cycles=cycles,
+               cycles_per_second=cycles / test_time if cycles is not None and test_time else None,
+               wall_time=bench["build_time"] + sum(c["wall_time"] for c in bench["results"]),
+               passed=sum(c["status"] == "passed" for c in run), tests=len(run) + len(errors))
+    if errors:
+        row["error"] = f"{len(errors)} testcase(s) did not run: {errors[0]['message']}"
+    return row
+
+
+def simbench(names=BENCHES, sims=SIMS, root=regress.DEFAULT_ROOT.parent / "simbench", workers=1, log=print):
+    """Rows of bench_row() for every testbench in `names` on every simulator in `sims`."""
+    os.environ["SIMLIB_BUILD_CACHE"] = "0"  # time real compiles
+    discovered = {b["name"]: b for b in regress.discover()}
+    benches = [discovered.get(name, dict(name=name, error="testbench not found")) for name in names]
+    rows = []
+    for sim in sims:
+        log(f"INFO: {sim}")
+        start = time.perf_counter()
+        done = regress.regress(benches, sim, root / sim, workers, log=log)
+        rows += [bench_row(bench, sim) for bench in done]
+        log(f"INFO: {sim} done in {time.perf_counter() - start:.1f} s")
+    return rows
+
+
+def _num(value, fmt):
+    return "-" if value is None else format(value, fmt)
+
+
+def format_table(rows):
+    """Text table: a line per testbench and simulator, then the Verilator/Icarus ratios."""
+    header = ["testbench", "sim", "compile_s", "cycles", "cycles/s", "wall_s", "passed"]
+    lines = []
+    for row in rows:
+        line = [row["bench"], row["sim"]]
+        if "compile_time" not in row:
+            line.append("ERROR: " + row["error"])
+        else:
+            line += [f"{row['compile_time']:.1f}", _num(row["cycles"], ".0f"), _num(row["cycles_per_second"], ".3g"),
+                     f"{row['wall_time']:.1f}", f"{row['passed']}/{row['tests']}"]
+        lines.append(line)
+    by_key = {(row["bench"], row["sim"]): row for row in rows}
+    for bench in dict.fromkeys(row["bench"] for row in rows):
+        icarus, verilator = by_key.get((bench, "icarus"), {}), by_key.get((bench, "verilator"), {})
+        if icarus.get("cycles_per_second") and verilator.get("cycles_per_second"):
+            lines.append([bench, "verilator/icarus", "", "",
+                          f"{verilator['cycles_per_second'] / icarus['cycles_per_second']:.2f}x",
+                          f"{verilator['wall_time'] / icarus['wall_time']:.2f}x", ""])
+    widths = [max(len(line[i]) for line in [header] + lines if len(line) == len(header))
+              for i in range(len(header))]
+    return "\n".join("  ".join(c.ljust(w) if i < 2 else c.rjust(w) for i, (c, w) in enumerate(zip(line, widths)))
+                     for line in [header] + lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Icarus and Verilator on the lab testbenches.")
+    parser.add_argument("-k", dest="keyword", help="only testbenches whose name contains this")
+    parser.add_argument("--sims", nargs="+", default=SIMS)
+    parser.add_argument("--workers", type=int, default=1, help="simulator processes (default 1, for clean timings)")
+    parser.add_argument("--json", help="also write the rows to this JSON file")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHES if not args.keyword or args.keyword in name]
+    rows = simbench(names, args.sims, workers=args.workers)
+    print(format_table(rows))
+    for row in rows:
+        if "error" in row and "compile_time" in row:
+            print(f"{row['bench']} ({row['sim']}): {row['error']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
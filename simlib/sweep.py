@@ -0,0 +1,227 @@
+"""
+Parameter sweeps over HDL generics.
+
+A sweep runs one cocotb test module against every variant of a design in a
+grid of parameter values. Each variant is compiled (or taken from the build
+cache) and simulated in its own process and directory, one process per core,
+and its results.xml is collated into one row per variant:
+
+    parameters   the variant's parameter dict
+    tests, failed, skipped
+    sim_time_ns  simulated time summed over the testcases
+    build_time   wall seconds to compile (or fetch from the cache)
+    wall_time    wall seconds for build and simulation
+    testcases    name, status, wall time and sim time of every testcase
+    test_dir     where the variant ran (sim.log, results.xml, waves)
+    error        instead of the counts, when the build or the simulator failed
+
+The design is given by the test module's build function, which takes
+(parameters, build_dir, waves) and returns the runner, e.g. spi_build in
+week02/spi_tx/sim/test_spi_tx.py:
+
+    rows = sweep(test_spi_tx.spi_build, "spi_tx", "test_spi_tx",
+                 grid(DATA_WIDTH=[8, 16], DATA_CLK_PERIOD=[4, 10]), "sim_build/sweep")
+    print(format_table(rows))
+
+or from the command line (the build function is the module's *_build):
+
+    python -m simlib.sweep week02/spi_tx/sim/test_spi_tx.py spi_tx \\
+        -p DATA_WIDTH=8,16,24 -p DATA_CLK_PERIOD=4,10 --csv sweep.csv
+    python -m simlib.sweep week04/fir/sim/test_axis_fir_15.py axis_fir_15 -p NUM_COEFFS=7,15,31
+    python -m simlib.sweep week08/starter_code/sim/test_adsb_decode.py top \\
+        -p NUM_COEFFS_LOWPASS=31,75 -p NUM_COEFFS_PREAMBLE_DETECTOR=512 --testcase test_a
+
+Tests see their variant's parameters as JSON in $SIMLIB_SWEEP_PARAMETERS,
+though reading them from the DUT (dut.DATA_WIDTH.value, port widths) keeps a
+test working under its normal runner too.
+"""
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+COLUMNS = ["tests", "failed", "skipped", "sim_time_ns", "build_time", "wall_time", "test_dir", "error"]
+
+
+def grid(**axes):
+    """Every combination of the given parameter values, as a list of dicts (last axis varies fastest)."""
+    return [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+
+
+def variant_name(parameters):
+    """Directory name of a variant, e.g. DATA_WIDTH-8_DATA_CLK_PERIOD-4."""
+    return "_".join(f"{name}-{value}" for name, value in parameters.items()) or "default"
+
+
+def read_results(results_xml):
+    """Name, status ('passed' | 'failed' | 'skipped'), wall time and sim time of every testcase in a results.xml."""
+    cases = []
+    for case in ET.parse(results_xml).iter("testcase"):
+        if case.find("failure") is not None:
+            status = "failed"
+        elif case.find("skipped") is not None:
+            status = "skipped"
+        else:
+            status = "passed"
+        cases.append(dict(name=case.get("name"), status=status, wall_time=float(case.get("time", 0)),
+                          sim_time_ns=float(case.get("sim_time_ns", 0))))
+    return cases
+
+
+def run_variant(build, hdl_toplevel, test_module, parameters, test_dir, testcase=None, extra_env=None):
+    """Build one variant, run the test module on it in `test_dir` and return its row."""
+    test_dir = Path(test_dir)
+    test_dir.mkdir(parents=True, exist_ok=True)
+    row = dict(parameters=dict(parameters), test_dir=str(test_dir))
+    env = dict(extra_env or {}, SIMLIB_SWEEP_PARAMETERS=json.dumps(parameters))
+    start = time.perf_counter()
+    try:
+        runner = build(dict(parameters), build_dir=test_dir, waves=False)
+        row["build_time"] = time.perf_counter() - start
+        results = runner.test(
+            hdl_toplevel=hdl_toplevel,
+            test_module=test_module,
+            testcase=testcase,
+            test_dir=test_dir,
+            extra_env=env,
+            log_file=test_dir / "sim.log",
+            waves=False
+        )
+    except SystemExit as e:  # the runner exits on simulator errors
+        return dict(row, error=str(e), wall_time=time.perf_counter() - start)
+    row["wall_time"] = time.perf_counter() - start
+    if not Path(results).is_file():
+        return dict(row, error=f"no results, see {test_dir / 'sim.log'}")
+    cases = read_results(results)
+    return dict(row, testcases=cases, tests=len(cases),
+                failed=sum(c["status"] == "failed" for c in cases),
+                skipped=sum(c["status"] == "skipped" for c in cases),
+                sim_time_ns=sum(c["sim_time_ns"] for c in cases))
+
+
+def sweep(build, hdl_toplevel, test_module, variants, root, testcase=None, extra_env=None, workers=None):
+    """
+    Run `test_module` against every parameter dict in `variants` on a process
+    pool, each variant in root/<variant_name>. Rows come back in variant order.
+    """
+    root = Path(root)
+    rows = [None] * len(variants)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(run_variant, build, hdl_toplevel, test_module, parameters,
+                               root / variant_name(parameters), testcase, extra_env): i
+                   for i, parameters in enumerate(variants)}
+        for future in as_completed(futures):
+            i = futures[future]
+            rows[i] = future.result()
+            print(f"INFO: sweep variant {i + 1}/{len(variants)} ({variant_name(variants[i])}) "
+                  f"{status(rows[i])} in {rows[i]['wall_time']:.1f} s")
+    return rows
+
+
+def status(row):
+    if "error" in row:
+        return "ERROR"
+    return "FAIL" if row["failed"] else "PASS"
+
+
+def format_table(rows):
+    """Fixed-width text table with one line per variant."""
+    names = list(dict.fromkeys(name for row in rows for name in row["parameters"]))
+    header = names + ["tests", "failed", "sim_ns", "build_s", "wall_s", "status"]
+    lines = []
+    for row in rows:
+        line = [str(row["parameters"].get(name, "-")) for name in names]
+        if "error" in row:
+            line.append("ERROR: " + row["error"])
+        else:
+            line += [str(row["tests"]), str(row["failed"]), f"{row['sim_time_ns']:.0f}",
+                     f"{row['build_time']:.1f}", f"{row['wall_time']:.1f}", status(row)]
+        lines.append(line)
+    widths = [max(len(line[i]) for line in [header] + lines if len(line) == len(header))
+              for i in range(len(header))]
+    return "\n".join("  ".join(c.rjust(w) for c, w in zip(line, widths)) for line in [header] + lines)
+
+
+def write_csv(rows, path):
+    """One line per variant: the parameters, then COLUMNS."""
+    names = list(dict.fromkeys(name for row in rows for name in row["parameters"]))
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=names + COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(dict(row, **row["parameters"]) for row in rows)
+
+
+def write_json(rows, path):
+    """The full rows, per-testcase results included."""
+    with open(path, "w") as f:
+        json.dump(rows, f, indent=1)
+
+
+def load_build(test_file, name=None):
+    """
+    Import a test module from its path and return (module, build function);
+    the build function is `name`, or the module's only function ending in _build.
+    """
+    test_file = Path(test_file).resolve()
+    sys.path.insert(0, str(test_file.parent))
+    module = importlib.import_module(test_file.stem)
+    if name is None:
+        builds = [n for n, f in vars(module).items()
+                  if n.endswith("_build") and callable(f) and f.__module__ == module.__name__]
+        if len(builds) != 1:
+            raise SystemExit(f"ERROR: {test_file.name} has build functions {builds}; pick one with --build")
+        name = builds[0]
+    return module, getattr(module, name)
+
+
+def _value(text):
+    try:
+        return int(text, 0)
+    except ValueError:
+        return text
+
+
+def parse_axis(text):
+    """'NAME=1,2,3' -> ('NAME', [1, 2, 3])"""
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=value[,value...], got {text!r}")
+    return name, [_value(v) for v in values.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a cocotb test module against a grid of HDL parameter values.")
+    parser.add_argument("test_file", help="test_*.py with a *_build(parameters, build_dir, waves) function")
+    parser.add_argument("hdl_toplevel")
+    parser.add_argument("-p", "--param", type=parse_axis, action="append", default=[], metavar="NAME=V1,V2",
+                        help="parameter axis; repeat for a grid")
+    parser.add_argument("--build", help="build function name (default: the module's *_build)")
+    parser.add_argument("--testcase", nargs="+", help="only run these tests")
+    parser.add_argument("--root", help="directory for the variants (default: sim_build/sweep next to the test)")
+    parser.add_argument("--workers", type=int, default=None, help="simulator processes (default: one per CPU)")
+    parser.add_argument("--csv", help="also write the table to this CSV file")
+    parser.add_argument("--json", help="also write the full results, per testcase, to this JSON file")
+    args = parser.parse_args()
+
+    module, build = load_build(args.test_file, args.build)
+    root = Path(args.root) if args.root else Path(args.test_file).resolve().parent / "sim_build" / "sweep"
+    rows = sweep(build, args.hdl_toplevel, module.__name__, grid(**dict(args.param)), root,
+                 testcase=args.testcase, workers=args.workers)
+    print(format_table(rows))
+    if args.csv:
+        write_csv(rows, args.csv)
+    if args.json:
+        write_json(rows, args.json)
+    if any(status(row) != "PASS" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Packing arrays into wide buses and back.
+
+Coefficient ports (coeffs, preamble_coeffs, lowpass_coeffs) are NUM_COEFFS
+fields of 8 bits in one vector; squitter outputs are 112 bit words. pack()
+turns an array of signed or unsigned fields of any width (1 to 64 bits) into
+the one integer such a vector holds, element 0 in the lowest bits, with NumPy
+bit operations rather than a Python shift loop, so a port is loaded with a
+single handle write:
+
+    write(dut.coeffs, taps, 8)                 # dut.coeffs.value = pack(taps, 8)
+    dut.coeffs.value = pack_logic_array(taps, 8)
+
+unpack() goes the other way, for one wide value or a sequence of them (ints,
+or handle values such as LogicArray/BinaryValue that convert with int()):
+
+    unpack(squitter, 8, 14)                    # the 14 bytes, least significant first
+    unpack(squitters, 8, 14)[:, ::-1]          # (N, 14), big-endian like crc24.to_bytes
+    fields(squitters, [5, 3, 24, 56, 24])      # DF, CA, ICAO, ME, PI columns, MSB first
+
+Fields are masked to their width on the way in (so -1 packs as all ones);
+values may be NumPy integers or Python ints of any size (an object array such
+as AXISMonitor.data of a wide bus). They come out as int64, sign-extended
+when signed=True, except unsigned 64 bit fields, which come out as uint64.
+The docstring examples are checked with `python -m doctest simlib/widebus.py`.
+"""
+import numpy as np
+from cocotb.types import LogicArray, Range
+
+
+def _check_width(width):
+    if not 1 <= width <= 64:
+        raise ValueError(f"field width must be 1..64 bits, got {width}")
+
+
+def _to_words(values, width):
+    """uint64 array of each value's low `width` bits (two's complement for negative values)."""
+    values = np.asarray(values)
+    if values.dtype == object:  # Python ints, possibly >= 2**63 or wider than 64 bits
+        mask = (1 << width) - 1
+        return np.array([int(v) & mask for v in values.reshape(-1)], dtype=np.uint64)
+    if values.dtype.kind == "u":
+        return values.astype(np.uint64).reshape(-1)
+    return values.astype(np.int64).view(np.uint64).reshape(-1)
+
+
+def _to_bits(values, width):
+    """(N, width) uint8 bits of each value's low `width` bits, least significant first."""
+    words = _to_words(values, width)
+    bits = np.unpackbits(words.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    return bits[:, :width]
+
+
+def _from_bits(bits, signed=False):
+    """Value of each row of least-significant-first bits (at most 64 per row): int64, uint64 for 64 unsigned."""
+    n, width = bits.shape
+    padded = np.zeros((n, 64), dtype=np.uint8)
+    padded[:, :width] = bits
+    values = np.packbits(padded, axis=1, bitorder="little").view("<u8").reshape(n)
+    if width == 64:
+        return values.view(np.int64) if signed else values.astype(np.uint64)
+    values = values.view(np.int64)
+    if signed:
+        sign = np.int64(1) << (width - 1)
+        values = (values ^ sign) - sign
+    return values
+
+
+def pack(values, width):
+    """
+    One integer holding `values` as `width` bit fields, values[0] in bits [width-1:0].
+
+    >>> hex(pack([-1, 2, 3], 4))
+    '0x32f'
+    >>> words = np.array([2**64 - 1, 2**63, 5], dtype=object)
+    >>> unpack(pack(words, 64), 64, 3).tolist() == words.tolist()
+    True
+    """
+    _check_width(width)
+    bits = _to_bits(values, width).reshape(-1)
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+def pack_logic_array(values, width):
+    """pack() as a LogicArray of exactly len(values) * width bits."""
+    return LogicArray(pack(values, width), Range(len(values) * width - 1, "downto", 0))
+
+
+def write(handle, values, width):
+    """Load a packed port with one assignment; values beyond the port's width raise ValueError."""
+    if len(values) * width > len(handle):
+        raise ValueError(f"{len(values)} fields of {width} bits do not fit the {len(handle)} bit {handle._name}")
+    handle.value = pack(values, width)
+
+
+def _bits_of(values, nbits):
+    """(N, nbits) bits, least significant first, of one wide value or a sequence of them."""
+    nbytes = (nbits + 7) // 8
+    blob = b"".join(int(v).to_bytes(nbytes, "little") for v in values)
+    bits = np.unpackbits(np.frombuffer(blob, dtype=np.uint8).reshape(len(values), nbytes), axis=1,
+                         bitorder="little")
+    return bits[:, :nbits]
+
+
+def _is_single(value):
+    return not isinstance(value, (list, tuple, np.ndarray))
+
+
+def unpack(value, width, count, signed=False):
+    """
+    The `count` fields of `width` bits in a wide value, element 0 from the
+    lowest bits: an int64 array (uint64 for unsigned 64 bit fields), or
+    (N, count) for a sequence of N values.
+    """
+    _check_width(width)
+    values = [value] if _is_single(value) else value
+    bits = _bits_of(values, width * count).reshape(-1, width)
+    fields = _from_bits(bits, signed).reshape(len(values), count)
+    return fields[0] if _is_single(value) else fields
+
+
+def fields(value, widths, signed=False):
+    """
+    Fields of the given widths, first field in the most significant bits
+    (the order of a bit-field diagram), from one wide value or a sequence of N
+    (then an (N, len(widths)) array).
+    """
+    for width in widths:
+        _check_width(width)
+    values = [value] if _is_single(value) else value
+    bits = _bits_of(values, sum(widths))
+    dtype = np.uint64 if not signed and 64 in widths else np.int64
+    out = np.empty((len(values), len(widths)), dtype=dtype)
+    hi = bits.shape[1]
+    for i, width in enumerate(widths):
+        out[:, i] = _from_bits(bits[:, hi - width:hi], signed)
+        hi -= width
+    return out[0] if _is_single(value) else out
@@ -8,6 +8,8 @@ from generate_clock import generate_clock
 from cocotb.triggers import Timer, RisingEdge, FallingEdge, ClockCycles, ReadOnly
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+from simlib.build_cache import cached_build
  
 #cheap way to get the name of current file for runner:
 test_file = os.path.basename(__file__).replace(".py","")
@@ -93,10 +95,10 @@ def counter_runner():
     parameters = {}
     sys.path.append(str(proj_path / "sim"))
     runner = get_runner(sim)
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel,
-        always=True,
         build_args=build_test_args,
         parameters=parameters,
         timescale = ('1ns','1ps'),
@@ -107,6 +109,7 @@ def counter_runner():
         hdl_toplevel=hdl_toplevel,
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
  
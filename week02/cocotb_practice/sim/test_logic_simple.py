@@ -10,6 +10,8 @@ from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge
 from cocotb.triggers import ReadOnly,with_timeout, Edge, ReadWrite, NextTimeStep
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+from simlib.build_cache import cached_build
 test_file = os.path.basename(__file__).replace(".py","")
 
 
@@ -59,10 +61,10 @@ def test_runner():
     sys.path.append(str(proj_path / "sim"))
     hdl_toplevel = "simple_logic"
     runner = get_runner(sim)
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel,
-        always=True,
         build_args=build_test_args,
         parameters={},
         timescale = ('1ns','1ps'),
@@ -73,6 +75,7 @@ def test_runner():
         hdl_toplevel=hdl_toplevel,
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
  
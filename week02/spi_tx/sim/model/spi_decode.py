@@ -0,0 +1,102 @@
+"""
+Offline SPI (mode 0, MSB first) decoder for EdgeRecorder captures of spi_tx.
+
+decode() works on the whole capture at once: every dclk rising edge while cs
+is low samples copi as it was just before that edge, the edges are grouped
+into messages by the cs low periods around them, and each message's bits are
+folded into an integer. Nothing is done per bit in Python, so half a million
+messages decode in well under a second.
+
+Times are whatever units the capture used (sim steps by default); pass
+clk_period in the same units to get dclk periods in clk cycles.
+"""
+import numpy as np
+
+
+def _changes(events, name):
+    index = events["names"].index(name)
+    sel = events["signal"] == index
+    return events["time"][sel], events["value"][sel]
+
+
+def _value_before(times, values, at):
+    """Value of a signal (given by its change times/values) just before each time in `at`."""
+    i = np.searchsorted(times, at, side="left") - 1
+    return np.where(i >= 0, values[np.maximum(i, 0)], -1)
+
+
+def _edges(times, values, rising):
+    """Times at which the signal goes 0 -> 1 (rising) or 1 -> 0."""
+    before = np.concatenate(([-1], values[:-1]))
+    want = (before == 0) & (values == 1) if rising else (before == 1) & (values == 0)
+    return times[want]
+
+
+def decode(events, cs="cs", dclk="dclk", copi="copi", clk_period=None):
+    """
+    Messages in an EdgeRecorder.events() capture.
+
+    Returns a dict:
+        messages    int value of every complete message (cs low, then high again)
+        bits        number of dclk rising edges in each message
+        start, end  cs falling and rising time of each message
+        period      times between consecutive dclk rising edges within a
+                    message
+        period_cycles   the same in clk cycles, when clk_period is given
+        unknown     messages with an x/z copi sample (their value is -1)
+    """
+    cs_t, cs_v = _changes(events, cs)
+    dclk_t, dclk_v = _changes(events, dclk)
+    copi_t, copi_v = _changes(events, copi)
+
+    start = _edges(cs_t, cs_v, rising=False)
+    end = _edges(cs_t, cs_v, rising=True)
+    # Pair every cs fall with the first cs rise after it; an unfinished message is dropped.
+    j = np.searchsorted(end, start, side="right")
+    done = j < len(end)
+    start, end = start[done], end[j[done]]
+
+    rise = _edges(dclk_t, dclk_v, rising=True)
+    frame = np.searchsorted(start, rise, side="right") - 1
+    inside = (frame >= 0) & (rise < end[np.maximum(frame, 0)])
+    rise, frame = rise[inside], frame[inside]
+    bit = _value_before(copi_t, copi_v, rise)
+
+    bits = np.bincount(frame, minlength=len(start))
+    first = np.concatenate(([0], np.cumsum(bits)[:-1]))
+    position = bits[frame] - 1 - (np.arange(len(frame)) - first[frame])  # MSB first
+    unknown = np.zeros(len(start), dtype=bool)
+    np.logical_or.at(unknown, frame, bit < 0)
+    if bits.max(initial=0) < 63:
+        messages = np.zeros(len(start), dtype=np.int64)
+        np.add.at(messages, frame, np.maximum(bit, 0).astype(np.int64) << position)
+    else:
+        messages = np.zeros(len(start), dtype=object)
+        for f, b, p in zip(frame.tolist(), np.maximum(bit, 0).tolist(), position.tolist()):
+            messages[f] += b << p
+    messages[unknown] = -1
+
+    same = frame[1:] == frame[:-1]
+    period = np.diff(rise)[same]
+    result = dict(messages=messages, bits=bits, start=start, end=end, period=period, unknown=unknown)
+    if clk_period is not None:
+        result["period_cycles"] = period / clk_period
+    return result
+
+
+def throughput(decoded, span, time_per_second):
+    """
+    Message rate and bus utilization over `span` time units.
+
+    time_per_second converts the capture's time units (e.g. 1e12 for ps).
+    utilization is the fraction of the span with cs low, and gap the median
+    cs-high time between consecutive messages, in time units.
+    """
+    n = len(decoded["messages"])
+    busy = float((decoded["end"] - decoded["start"]).sum())
+    gaps = decoded["start"][1:] - decoded["end"][:-1]
+    seconds = span / time_per_second if span else 0.0
+    return dict(messages=n, messages_per_second=n / seconds if seconds else 0.0,
+                bits_per_second=float(decoded["bits"].sum()) / seconds if seconds else 0.0,
+                utilization=busy / span if span else 0.0,
+                gap=float(np.median(gaps)) if len(gaps) else None)
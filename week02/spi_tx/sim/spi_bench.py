@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+SPI throughput benchmark of spi_tx over a DATA_WIDTH x DATA_CLK_PERIOD grid.
+
+Every grid point is its own spi_tx variant, run by simlib.sweep: it is
+compiled (or taken from the build cache) and simulated in its own process and
+directory, one process per core. Each point runs bench_point from test_spi_tx.py, which streams
+--messages random messages back to back, records cs/dclk/copi edges and
+decodes them offline (model/spi_decode.py). The table reports, at the 100 MHz
+testbench clock:
+
+    msg/s        messages per second of sim time
+    Mbit/s       payload bits per second
+    utilization  fraction of the time cs is low
+    gap          clk cycles cs spends high between back-to-back messages
+    dclk         measured dclk period in clk cycles
+    wall_s       wall time of the point (build + simulation)
+
+Example:
+    ./spi_bench.py --width 8 16 24 --period 4 10 100 --messages 500 --csv spi_bench.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+proj_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(proj_path / "sim"))
+import test_spi_tx
+from simlib import sweep
+
+BENCH_DIR = proj_path / "sim" / "sim_build" / "bench"  # one build/test directory per point
+RESULT_FILE = "bench_point.json"
+COLUMNS = ["DATA_WIDTH", "DATA_CLK_PERIOD", "messages", "messages_per_second", "bits_per_second",
+           "utilization", "gap_cycles", "dclk_period_cycles", "decoded_ok", "sim_time_ns", "wall_time"]
+
+
+def bench_row(row):
+    """Benchmark row of one sweep variant: the numbers bench_point wrote, or the error."""
+    point = dict(row["parameters"], wall_time=row["wall_time"])
+    if "error" in row:
+        return dict(point, error=row["error"])
+    result_file = Path(row["test_dir"]) / RESULT_FILE
+    if row["failed"] or not result_file.exists():
+        return dict(point, error=f"bench_point failed, see {Path(row['test_dir']) / 'sim.log'}")
+    with open(result_file) as f:
+        return dict(json.load(f), **point)
+
+
+def bench(widths, periods, messages=500, workers=None):
+    """Run every (width, period) point on a process pool; rows come back in grid order."""
+    rows = sweep.sweep(
+        test_spi_tx.spi_build, "spi_tx", test_spi_tx.test_file,
+        sweep.grid(DATA_WIDTH=widths, DATA_CLK_PERIOD=periods), BENCH_DIR,
+        testcase="bench_point",
+        # relative to the variant's test_dir, where the simulator runs
+        extra_env=dict(SPI_BENCH_POINT=json.dumps(dict(messages=messages)), SPI_BENCH_RESULT=RESULT_FILE),
+        workers=workers)
+    return [bench_row(row) for row in rows]
+
+
+def format_table(rows):
+    """Fixed-width text table of benchmark rows."""
+    header = ["width", "period", "messages", "msg/s", "Mbit/s", "utilization", "gap", "dclk", "ok", "wall_s"]
+    lines = []
+    for row in rows:
+        line = [str(row["DATA_WIDTH"]), str(row["DATA_CLK_PERIOD"])]
+        if "error" in row:
+            line.append("ERROR: " + row["error"])
+        else:
+            line += [str(row["messages"]), f"{row['messages_per_second']:.0f}", f"{row['bits_per_second'] / 1e6:.2f}",
+                     f"{row['utilization']:.3f}", "-" if row["gap_cycles"] is None else f"{row['gap_cycles']:g}",
+                     "-" if row["dclk_period_cycles"] is None else f"{row['dclk_period_cycles']:g}",
+                     "ok" if row["decoded_ok"] else "MISMATCH", f"{row['wall_time']:.1f}"]
+        lines.append(line)
+    widths = [max(len(line[i]) for line in [header] + lines if len(line) == len(header))
+              for i in range(len(header))]
+    return "\n".join("  ".join(c.rjust(w) for c, w in zip(line, widths)) for line in [header] + lines)
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS + ["error"], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--width", type=int, nargs="+", default=[8, 16, 24], help="DATA_WIDTH values")
+    parser.add_argument("--period", type=int, nargs="+", default=[4, 10, 100],
+                        help="DATA_CLK_PERIOD values (even, in clk cycles)")
+    parser.add_argument("--messages", type=int, default=500, help="messages per point")
+    parser.add_argument("--workers", type=int, default=None, help="simulator processes (default: one per CPU)")
+    parser.add_argument("--csv", help="also write the table to this CSV file")
+    args = parser.parse_args()
+
+    rows = bench(args.width, args.period, args.messages, args.workers)
+    print(format_table(rows))
+    if args.csv:
+        write_csv(rows, args.csv)
+    if any("error" in row or not row["decoded_ok"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
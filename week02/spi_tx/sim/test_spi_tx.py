@@ -2,25 +2,27 @@ import cocotb
 import os
 import sys
 import random
+import json
 from math import log
 import logging
 #import numpy as np
 from pathlib import Path
 from cocotb.clock import Clock
-from cocotb.triggers import First, Timer, RisingEdge, FallingEdge, ClockCycles
+from cocotb.triggers import Timer, RisingEdge, FallingEdge, ClockCycles
 from cocotb.triggers import ReadOnly, with_timeout, Edge, ReadWrite, NextTimeStep
 from cocotb.utils import get_sim_time as gst
+from cocotb.utils import get_sim_steps
 from cocotb.runner import get_runner
+sys.path.append(str(Path(__file__).resolve().parent / "model"))
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+import spi_decode
+from simlib.build_cache import cached_build
+from simlib.edges import EdgeRecorder
 
 test_file = os.path.basename(__file__).replace(".py","")
+CLK_PERIOD_NS = 10
 
 
-def binary_list_to_int(message):
-    val = 0
-    for bit in message:
-        val = (val<<1) | bit
-    return val
-
 async def drive_data_in(dut, value):
     """ Sends data in on a rising edge when busy is low """
     while True:
@@ -43,44 +45,27 @@ async def reset(clk_wire,rst_wire):
     await ClockCycles(clk_wire,2)
     rst_wire.value = 0
 
-async def model_spi_device(dut, received_messages):
-    while True:
-        message = []
-        await FallingEdge(dut.cs) # signals start of transmission
-        while True:
-            await First(RisingEdge(dut.cs), RisingEdge(dut.dclk))
-            await ReadOnly()
-            #dut._log.info(f"cs: {dut.cs.value}, dclk: {dut.dclk.value}")
-            #dut._log.info(f"copi: {dut.copi.value}\n")
-            if not dut.cs.value:
-                message.append(dut.copi.value)
-            else:
-                assert len(message)==dut.DATA_WIDTH.value
-                received_messages.append(message)
-                break
+async def send_stream(dut, messages):
+    """ Sends messages back to back: trigger stays high with the next message on data_in """
+    busy_rise = RisingEdge(dut.busy)
+    for message in messages:
+        dut.data_in.value = int(message)
+        dut.trigger.value = 1
+        await busy_rise  # taken; spi_tx starts the next one the cycle after this one ends
+    dut.trigger.value = 0
+    await FallingEdge(dut.busy)
+    await ClockCycles(dut.clk, 1)
 
-async def assert_spi_clock(dut):
-    dclk_period = dut.DATA_CLK_PERIOD.value
-    while True:
-        count = 0
-        last_dclk = 1
-        await FallingEdge(dut.cs)
-        await RisingEdge(dut.dclk)
-        await ReadOnly()
-        #dut._log.info(f"Sim time at cs fall: {gst('ns')} ns")
-        while True:
-            await RisingEdge(dut.clk)
-            await ReadOnly()
-            #dut._log.info(f"last dclk: {last_dclk}; curr dclk: {dut.dclk.value}")
-            count += 1
-            if not last_dclk and dut.dclk.value:
-                #dut._log.info(f"Counted Period: {count}\n Expected period: {dclk_period}")
-                if not dut.rst.value: 
-                    assert count == dclk_period
-                count = 0
-            last_dclk = dut.dclk.value
-            if dut.cs.value:
-                break
+def check_capture(dut, recorder, messages):
+    """ Decodes the recorded cs/dclk/copi edges and checks messages, lengths and dclk period """
+    decoded = spi_decode.decode(recorder.events(), clk_period=get_sim_steps(CLK_PERIOD_NS, "ns"))
+    width = int(dut.DATA_WIDTH.value)
+    dclk_period = int(dut.DATA_CLK_PERIOD.value)
+    assert (decoded["bits"] == width).all(), f"message lengths {set(decoded['bits'].tolist())}, expected {width}"
+    assert (decoded["period_cycles"] == dclk_period).all(), \
+        f"dclk periods {set(decoded['period_cycles'].tolist())} clk cycles, expected {dclk_period}"
+    assert list(decoded["messages"]) == [int(m) for m in messages]
+    return decoded
 
 async def check_message(dut, message):
     await drive_data_in(dut, message)
@@ -95,48 +80,73 @@ async def check_message(dut, message):
 @cocotb.test()
 async def send_one_message(dut):
     message = 0xAB
-    received_messages = []
 
-    cocotb.start_soon( Clock(dut.clk, 10, units='ns').start(start_high=False ) )
+    cocotb.start_soon( Clock(dut.clk, CLK_PERIOD_NS, units='ns').start(start_high=False ) )
     #dut.DATA_WIDTH = 
     #dut.DATA_CLK_PERIOD = 
     await reset(dut.clk,dut.rst)
     
-    cocotb.start_soon( model_spi_device(dut,received_messages) )
-    cocotb.start_soon( assert_spi_clock(dut) )
-    await drive_data_in(dut, message)
-    await ReadOnly()
-    #dut._log.info(f"Data driven in: {dut.data_in.value}")
-    #dut._log.info(f"BUSY: {dut.busy.value}.. transmission started")
-    await FallingEdge(dut.busy)
-    #dut._log.info(f"BUSY: {dut.busy.value}.. transmission complete")
-    await ClockCycles(dut.clk, 1)
-    await ReadOnly()
-    #assert int(message)==int(''.join(str(bit) for bit in received_messages[0]),2)
-    assert message == binary_list_to_int(received_messages[0])
-    dut._log.info(f"Message sent: {hex(message)}\nMessage received: {hex(binary_list_to_int(received_messages[0]))}")
+    recorder = EdgeRecorder(dut.cs, dut.dclk, dut.copi)
+    await check_message(dut, message)
+    decoded = check_capture(dut, recorder, [message])
+    dut._log.info(f"Message sent: {hex(message)}\nMessage received: {hex(decoded['messages'][0])}")
    
 
 @cocotb.test()
 async def send_many_messages(dut):
-    messages = [random.randint(0,0xFF) for _ in range(500)]
-    received_messages = []
-    cocotb.start_soon( Clock(dut.clk, 10, units='ns').start(start_high=False)  )
+    width = int(dut.DATA_WIDTH.value)
+    messages = [random.getrandbits(width) for _ in range(500)]
+    cocotb.start_soon( Clock(dut.clk, CLK_PERIOD_NS, units='ns').start(start_high=False)  )
+    await reset(dut.clk,dut.rst)
+    recorder = EdgeRecorder(dut.cs, dut.dclk, dut.copi)
+    for message in messages:
+        await check_message(dut, message)
+    decoded = check_capture(dut, recorder, messages)
+    dut._log.info(f"{len(decoded['messages'])} messages sent one at a time and received")
+
+@cocotb.test()
+async def send_stream_messages(dut):
+    """ 500 messages back to back (trigger held high), checked like send_many_messages """
+    width = int(dut.DATA_WIDTH.value)
+    messages = [random.getrandbits(width) for _ in range(500)]
+    cocotb.start_soon( Clock(dut.clk, CLK_PERIOD_NS, units='ns').start(start_high=False)  )
     await reset(dut.clk,dut.rst)
-    cocotb.start_soon( model_spi_device(dut, received_messages) )
-    cocotb.start_soon( assert_spi_clock(dut) )
-    for i, message in enumerate(messages):
-        #dut._log.info(f"message to be driven in: {hex(message)}")
-        await check_message(dut,message)
-        assert message == binary_list_to_int(received_messages[i])
-        dut._log.info(f"Message sent: {hex(message)}\nMessage received: {received_messages[i]}\n")
+    recorder = EdgeRecorder(dut.cs, dut.dclk, dut.copi)
+    start = gst("step")
+    await send_stream(dut, messages)
+    decoded = check_capture(dut, recorder, messages)
+    rate = spi_decode.throughput(decoded, gst("step") - start, get_sim_steps(1, "sec"))
+    dut._log.info(f"{rate['messages']} messages: {rate['messages_per_second']:.0f} messages/s, "
+                  f"bus utilization {rate['utilization']:.3f}")
+
+@cocotb.test(skip=os.getenv("SPI_BENCH_POINT") is None)
+async def bench_point(dut):
+    """ One point of a spi_bench.py run: $SPI_BENCH_POINT messages back to back, results to $SPI_BENCH_RESULT """
+    point = json.loads(os.environ["SPI_BENCH_POINT"])
+    width = int(dut.DATA_WIDTH.value)
+    messages = [random.getrandbits(width) for _ in range(point["messages"])]
+    cocotb.start_soon( Clock(dut.clk, CLK_PERIOD_NS, units='ns').start(start_high=False)  )
+    await reset(dut.clk,dut.rst)
+    recorder = EdgeRecorder(dut.cs, dut.dclk, dut.copi)
+    start = gst("step")
+    await send_stream(dut, messages)
+    span = gst("step") - start
+    decoded = spi_decode.decode(recorder.events(), clk_period=get_sim_steps(CLK_PERIOD_NS, "ns"))
+    rate = spi_decode.throughput(decoded, span, get_sim_steps(1, "sec"))
+    clk_steps = get_sim_steps(CLK_PERIOD_NS, "ns")
+    result = dict(point, **rate, sim_time_ns=span / get_sim_steps(1, "ns"), clk_mhz=1e3 / CLK_PERIOD_NS,
+                  gap_cycles=None if rate["gap"] is None else rate["gap"] / clk_steps,
+                  dclk_period_cycles=float(decoded["period_cycles"].mean()) if len(decoded["period"]) else None,
+                  decoded_ok=list(decoded["messages"]) == messages)
+    with open(os.environ["SPI_BENCH_RESULT"], "w") as f:
+        json.dump(result, f)
 
 """
 the code below should largely remain unchanged in structure, though the specific files and things
 specified should get updated for different simulations.
 """
-def sv_runner():
-    """Simulate the counter using the Python runner."""
+def spi_build(parameters=None, build_dir="sim_build", waves=True):
+    """Compile spi_tx with `parameters` (or reuse a cached build) and return the runner."""
     hdl_toplevel_lang = os.getenv("HDL_TOPLEVEL_LANG", "verilog")
     sim = os.getenv("SIM", "icarus")
     proj_path = Path(__file__).resolve().parent.parent
@@ -144,23 +154,29 @@ def sv_runner():
     sources = [proj_path / "hdl" / "spi_tx.sv"] #grow/modify this as needed. CHANGE THIS
     hdl_toplevel = "spi_tx" # CHANGE THIS CHANGE THIS
     build_test_args = ["-Wall"]#,"COCOTB_RESOLVE_X=ZEROS"]
-    parameters = {}
     sys.path.append(str(proj_path / "sim"))
     runner = get_runner(sim)
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel,
-        always=True,
+        build_dir=build_dir,
         build_args=build_test_args,
-        parameters=parameters,
+        parameters=dict(parameters or {}),
         timescale = ('1ns','1ps'),
-        waves=True
+        waves=waves
     )
+    return runner
+
+def sv_runner():
+    """Simulate the counter using the Python runner."""
+    runner = spi_build()
     run_test_args = []
     runner.test(
-        hdl_toplevel=hdl_toplevel,
+        hdl_toplevel="spi_tx",
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
 
@@ -14,6 +14,9 @@ from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, First
 from cocotb.triggers import ReadOnly, with_timeout, Edge, ReadWrite, NextTimeStep
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+from simlib.build_cache import cached_build
+from simlib import widebus
 test_file = os.path.basename(__file__).replace(".py","")
 from scipy.signal import lfilter
 
@@ -135,9 +138,8 @@ async def test_filter(dut):
         await rising_edge
         await falling_edge
         
-        for a in range(15):
-            for b in range(8):
-                dut.coeffs[b+8*a].value = ((coeff_set[a] + 256 if (coeff_set[a] < 0) else coeff_set[a])>>b)&0x1
+        # One write of the whole packed vector: not every simulator exposes its bits as handles
+        widebus.write(dut.coeffs, coeff_set, 8)
         
         cocotb.start_soon( gather_output(dut,verilog_output) )
          
@@ -190,10 +192,10 @@ def sv_runner():
     parameters = {}
     sys.path.append(str(proj_path / "sim"))
     runner = get_runner(sim)
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel,
-        always=True,
         build_args=build_test_args,
         parameters=parameters,
         timescale = ('1ns','1ps'),
@@ -204,6 +206,7 @@ def sv_runner():
         hdl_toplevel=hdl_toplevel,
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
 
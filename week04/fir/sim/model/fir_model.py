@@ -0,0 +1,77 @@
+"""
+Bit-exact, block-based model of hdl/axis_fir_15.sv.
+
+axis_fir_15 is a transposed-form FIR: every input beat adds x * coeffs[k] into
+a chain of 32 bit signed registers, so output n is
+
+    y[n] = sum(coeffs[k] * x[n - k])    wrapped to 32 bits
+
+FIRModel keeps that running state per instance. Input beats are only
+buffered as they arrive (push() is an append); the outputs for everything
+buffered are computed in one integer convolution when they are asked for
+(pull()), with the last NUM_COEFFS - 1 inputs carried over to the next
+block. A StreamScoreboard pulls them as it needs them:
+
+    model = FIRModel(taps)
+    inm = AXISMonitor(dut, 's00', clk, callback=model.push, signed=True)
+    scoreboard.expect_from(model.pull)
+
+Several instances (one per DUT, or per test) never share state.
+"""
+import numpy as np
+
+ACC_WIDTH = 32  # intmdt_term and m00_axis_tdata_reg width in the RTL
+
+
+def wrap(values, width=ACC_WIDTH):
+    """Integers wrapped to `width` bit two's complement, like the RTL's registers."""
+    half = 1 << (width - 1)
+    return (np.asarray(values, dtype=np.int64) + half) % (1 << width) - half
+
+
+class FIRModel:
+    """Streaming FIR with integer taps; see the module docstring."""
+
+    def __init__(self, taps, width=ACC_WIDTH):
+        self.taps = np.asarray(taps, dtype=np.int64)
+        self.width = width
+        self.inputs = 0  # beats pushed so far
+        self.outputs = 0  # outputs pulled so far
+        self._history = np.zeros(len(self.taps) - 1, dtype=np.int64)
+        self._pending = []
+
+    def reset(self):
+        """Clear the filter state and the beat counters, as the DUT's reset does."""
+        self._history[:] = 0
+        self._pending = []
+        self.inputs = 0
+        self.outputs = 0
+
+    def push(self, value):
+        """Buffer one input beat."""
+        self._pending.append(value)
+        self.inputs += 1
+
+    def extend(self, values):
+        """Buffer an array of input beats."""
+        self._pending.extend(np.asarray(values, dtype=np.int64).tolist())
+        self.inputs += len(values)
+
+    def pull(self):
+        """Outputs for every input buffered since the last pull, as an int64 array."""
+        if not self._pending:
+            return np.empty(0, dtype=np.int64)
+        x = np.concatenate((self._history, np.asarray(self._pending, dtype=np.int64)))
+        self._pending = []
+        n = len(self._history)
+        # int8 samples times int8 taps: far from int64 overflow before the wrap
+        y = np.convolve(x, self.taps)[n:len(x)]
+        if n:
+            self._history = x[-n:]
+        self.outputs += len(y)
+        return wrap(y, self.width)
+
+    def filter(self, values):
+        """Push `values` and return their outputs."""
+        self.extend(values)
+        return self.pull()
@@ -7,139 +7,18 @@ import numpy
 import logging
 from pathlib import Path
 from cocotb.clock import Clock
-from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnly,with_timeout
+from cocotb.triggers import Timer, ClockCycles,with_timeout
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
-from cocotb_bus.bus import Bus
-from cocotb_bus.drivers import BusDriver
-from cocotb_bus.monitors import Monitor
-from cocotb_bus.monitors import BusMonitor
-from cocotb_bus.scoreboard import Scoreboard
 import numpy as np
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+from simlib.axis import AXISMonitor, AXISSink, AXISSource, gap_pattern
+from simlib import patterns
+from simlib.build_cache import cached_build
+from simlib.completion import until_done
+from simlib.scoreboard import StreamScoreboard
 test_file = os.path.basename(__file__).replace(".py","")
 
-class AXIS_Monitor(BusMonitor):
-    """
-    monitors axi streaming bus
-    """
-    transactions = 0 #use this variable to track good ready/valid handshakes
-    def __init__(self, dut, name, clk, callback=None):
-        self._signals = ['axis_tvalid','axis_tready','axis_tlast','axis_tdata','axis_tstrb']
-        BusMonitor.__init__(self, dut, name, clk, callback=callback)
-        self.clock = clk
-        self.transactions = 0
-        self.dut = dut
-    async def _monitor_recv(self):
-        """
-        Monitor receiver
-        """
-        rising_edge = RisingEdge(self.clock) # make these coroutines once and reuse
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly() #This is
-        while True:
-            #await rising_edge #can either wait for just edge...
-            #or you can also wait for falling edge/read_only (see note in lab)
-            await falling_edge #sometimes see in AXI shit
-            await read_only  #readonly (the postline)
-            valid = self.bus.axis_tvalid.value
-            ready = self.bus.axis_tready.value
-            last = self.bus.axis_tlast.value
-            data = self.bus.axis_tdata.value #.signed_integer
-            if valid and ready:
-                self.transactions+=1
-                thing = dict(data=data.signed_integer,last=last,
-                             name=self.name,count=self.transactions)
-                self.dut._log.info(f"{self.name}: {thing}")
-                self._recv(data.signed_integer)
-
-class AXIS_Driver(BusDriver):
-    def __init__(self, dut, name, clk, role="M"):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata','axis_tstrb']
-        BusDriver.__init__(self, dut, name, clk)
-        self.clock = clk
-        self.dut = dut
-
-class M_AXIS_Driver(AXIS_Driver):
-    def __init__(self, dut, name, clk):
-        super().__init__(dut,name,clk)
-        self.bus.axis_tdata.value = 0
-        self.bus.axis_tstrb.value = 0xF
-        self.bus.axis_tlast.value = 0
-        self.bus.axis_tvalid.value = 0
-
-    async def _driver_send(self, value, sync=True):
-        rising_edge = RisingEdge(self.clock) # make these coroutines once and reuse
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly() #This is
-        if value.get("type") == "pause":
-            await falling_edge
-            self.bus.axis_tvalid.value = 0 #set to 0 and be done.
-            self.bus.axis_tlast.value = 0 #set to 0 and be done.
-            for i in range(value.get("duration",1)):
-                await rising_edge
-        elif value.get("type") == "write_single":
-            await falling_edge
-            self.bus.axis_tvalid.value = 1
-            self.bus.axis_tlast.value = value.get("contents").get("last")
-            self.bus.axis_tdata.value = int(value.get("contents").get("data"))
-            while True:
-                await rising_edge
-                await read_only
-                if self.bus.axis_tready.value:
-                    break
-            await falling_edge
-            self.bus.axis_tvalid.value = 0
-            self.bus.axis_tlast.value = 0
-            await rising_edge
-        elif value.get("type") == "write_burst":
-            data_list = value.get("contents").get("data")
-            for i, data in enumerate(data_list):
-                await falling_edge
-                self.bus.axis_tdata.value = int(data)
-                self.bus.axis_tlast.value = 1 if i == len(data_list) - 1 else 0
-                self.bus.axis_tvalid.value = 1
-                while True:
-                    await rising_edge
-                    await read_only
-                    if self.bus.axis_tready.value:
-                        break
-            # await falling_edge
-            # self.bus.axis_tvalid.value = 0
-            # self.bus.axis_tlast.value = 0
-            # await rising_edge
-        else:
-            pass
-
-class S_AXIS_Driver(BusDriver):
-    def __init__(self, dut, name, clk):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata','axis_tstrb']
-        AXIS_Driver.__init__(self, dut, name, clk)
-        self.bus.axis_tready.value = 0
-
-    async def _driver_send(self, value, sync=True):
-        rising_edge = RisingEdge(self.clock) # make these coroutines once and reuse
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly() #This is
-        if value.get("type") == "pause":
-            await falling_edge
-            self.bus.axis_tready.value = 0 #set to 0 and be done.
-            for i in range(value.get("duration",1)):
-                await rising_edge
-        elif value.get("type") == "read":
-            await falling_edge
-            self.bus.axis_tready.value = 1
-            for _ in range(value.get("duration", 1)):
-                while True:
-                    await rising_edge
-                    await ReadOnly()
-                    if self.bus.axis_tvalid.value:
-                        break
-            # await falling_edge
-            # self.bus.axis_tready.value = 0
-            # await rising_edge
-        else:
-            pass
-
 async def reset(clk,rst, cycles_held = 3,polarity=1):
     rst.value = polarity
     await ClockCycles(clk, cycles_held)
@@ -152,67 +31,63 @@ def j_math_model(val):
     sig_in.append(val)
     result = 3*val + 10000
     sig_out_exp.append(result)
+    return result
 
 
 @cocotb.test()
 async def test_a(dut):
     """cocotb test for AXIS j math no backpressure"""
 
-    inm = AXIS_Monitor(dut,'s00',dut.s00_axis_aclk,callback=j_math_model)
-    outm = AXIS_Monitor(dut,'m00',dut.s00_axis_aclk,callback=lambda x: sig_out_act.append(x))
-    ind = M_AXIS_Driver(dut,'s00',dut.s00_axis_aclk) #M driver for S port
-    outd = S_AXIS_Driver(dut,'m00',dut.s00_axis_aclk) #S driver for M port
-
-    # Create a scoreboard on the stream_out bus
-    scoreboard = Scoreboard(dut,fail_immediately=False)
-    scoreboard.add_interface(outm, sig_out_exp)
+    # Create a scoreboard on the stream_out bus, fed by the model as inputs go in
+    scoreboard = StreamScoreboard('m00', log=dut._log)
+    inm = AXISMonitor(dut,'s00',dut.s00_axis_aclk,callback=lambda x: scoreboard.expect(j_math_model(x)),signed=True)
+    outm = AXISMonitor(dut,'m00',dut.s00_axis_aclk,callback=lambda x: sig_out_act.append(x),signed=True)
+    ind = AXISSource(dut,'s00',dut.s00_axis_aclk) #M driver for S port
+    outd = AXISSink(dut,'m00',dut.s00_axis_aclk) #S driver for M port
+    scoreboard.attach(outm)
     cocotb.start_soon(Clock(dut.s00_axis_aclk, 10, units="ns").start())
     await reset(dut.s00_axis_aclk, dut.s00_axis_aresetn,2,0)
 
-    #feed the driver on the M Side:
-    for i in range(50):
-        ind.append({'type':'write_single', "contents":{"data": random.randint(1,255),"last":0}})
-        ind.append({"type":"pause","duration":random.randint(1,6)})
-    ind.append({'type':'write_burst', "contents": {"data": np.array(list(range(150)))}})
-    ind.append({'type':'pause','duration':2}) #end with pause
+    #feed the driver on the M Side: 50 spaced out singles then a 150 beat burst
+    singles = [random.randint(1,255) for i in range(50)]
+    gaps = [random.randint(1,6) for i in range(50)]
+    pattern = np.concatenate((gap_pattern(gaps), np.ones(150, dtype=bool)))
+    feed = ind.start(np.concatenate((singles, np.arange(150))), valid_pattern=pattern)
 
     #feed the driver on the S Side:
     #always be ready to receive data:
     outd.append({'type':'read', "duration":1000})
 
-    await ClockCycles(dut.s00_axis_aclk, 500)
+    # All 200 out, or quiet for 20 cycles once the input is in (the last beat may stay inside)
+    await until_done(outm, beats=200, source=feed, idle=20, timeout=500, budget=500, log=dut._log)
     assert inm.transactions==outm.transactions or inm.transactions-outm.transactions==1, \
         f"Transaction Count doesn't match! :-/"
+    scoreboard.check(allow_pending=1)
 
 @cocotb.test()
 async def test_b(dut):
    """cocotb test for AXIS j_math with sporadic backpressure"""
 
-   inm = AXIS_Monitor(dut,'s00',dut.s00_axis_aclk,callback=j_math_model)
-   outm = AXIS_Monitor(dut,'m00',dut.s00_axis_aclk,callback=lambda x: sig_out_act.append(x))
-   ind = M_AXIS_Driver(dut,'s00',dut.s00_axis_aclk) #M driver for S port
-   outd = S_AXIS_Driver(dut,'m00',dut.s00_axis_aclk) #S driver for M port
-
-   # Create a scoreboard on the stream_out bus
-   scoreboard = Scoreboard(dut,fail_immediately=False)
-   scoreboard.add_interface(outm, sig_out_exp)
+   # Create a scoreboard on the stream_out bus, fed by the model as inputs go in
+   scoreboard = StreamScoreboard('m00', log=dut._log)
+   inm = AXISMonitor(dut,'s00',dut.s00_axis_aclk,callback=lambda x: scoreboard.expect(j_math_model(x)),signed=True)
+   outm = AXISMonitor(dut,'m00',dut.s00_axis_aclk,callback=lambda x: sig_out_act.append(x),signed=True)
+   ind = AXISSource(dut,'s00',dut.s00_axis_aclk) #M driver for S port
+   outd = AXISSink(dut,'m00',dut.s00_axis_aclk) #S driver for M port
+   scoreboard.attach(outm)
    cocotb.start_soon(Clock(dut.s00_axis_aclk, 10, units="ns").start())
    await reset(dut.s00_axis_aclk, dut.s00_axis_aresetn,2,0)
 
-   #feed the driver on the M Side:
-   for i in range(50):
-       data = {'type':'write_single', "contents":{"data": random.randint(1,255),"last":0}}
-       ind.append(data)
-       pause = {"type":"pause","duration":random.randint(1,6)}
-       ind.append(pause)
-   ind.append({'type':'write_burst', "contents": {"data": np.array(list(range(150)))}})
-   ind.append({'type':'pause','duration':2}) #end with pause
+   #feed the driver on the M Side: 50 spaced out singles then a 150 beat burst
+   singles = [random.randint(1,255) for i in range(50)]
+   gaps = [random.randint(1,6) for i in range(50)]
+   pattern = np.concatenate((gap_pattern(gaps), np.ones(150, dtype=bool)))
+   feed = ind.start(np.concatenate((singles, np.arange(150))), valid_pattern=pattern)
    #feed the driver on the S Side with on/off backpressure!
-   for i in range(50):
-       outd.append({'type':'read', "duration":random.randint(1,10)})
-       outd.append({'type':'pause', "duration":random.randint(1,10)})
-   await ClockCycles(dut.s00_axis_aclk, 500)
+   outd.start(patterns.from_env(500))
+   await until_done(outm, beats=200, source=feed, idle=20, timeout=500, budget=500, log=dut._log)
    assert inm.transactions==outm.transactions or inm.transactions-outm.transactions==1, f"Transaction Count doesn't match! :/"
+   scoreboard.check(allow_pending=1)
 
 def fir_runner():
     """Simulate the AXIS FIR 15 using the Python runner."""
@@ -228,10 +103,10 @@ def fir_runner():
     sys.path.append(str(proj_path / "sim"))
     runner = get_runner(sim)
     hdl_toplevel = "j_math"
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel, #fir_15
-        always=True,
         build_args=build_test_args,
         parameters=parameters,
         timescale = ('1ns','1ps'),
@@ -242,6 +117,7 @@ def fir_runner():
         hdl_toplevel=hdl_toplevel, #fir_15
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
 if __name__ == "__main__":
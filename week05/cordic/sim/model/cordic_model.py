@@ -0,0 +1,222 @@
+"""
+Bit-exact NumPy model of hdl/axis_cordic.sv.
+
+axis_cordic takes {y, x} as two Q1.15 halves of a 32 bit word and returns
+{angle, magnitude}: a 16 bit angle code (0x10000 is a full turn) and the
+16 bit magnitude |(x, y)| in the same units as x and y. cordic() runs whole
+arrays of packed words through the same fixed-point steps as the RTL, one
+NumPy pass per iteration, so millions of vectors take well under a second.
+
+RTL steps, per vector:
+    fold    x < 0 negates both halves, so the vector lands in quadrant I/IV
+    stage 0 rotate by -/+45 degrees (shift 0), z = -/+atan_lut(0)
+    stage i rotate by atan(2**-i) towards y = 0, with y >>> i and x >>> i
+    output  magnitude = clamp((x * K_INV) >>> 16, 0, 0xFFFF)
+            angle = -z, plus/minus 180 degrees when the input was folded
+All registers are DATA_WIDTH + 2 bits wide and wrap like the RTL's.
+"""
+import math
+
+import numpy as np
+
+ITERATIONS = 16  # NUM_STAGES
+DATA_WIDTH = 16
+ANGLE_WIDTH = 16
+K_INV = 0x09B75  # 1/gain in Q1.16, as hard-coded in the RTL
+LATENCY = 16  # clock edges from an input transfer to its output transfer, with tready held high
+ROUNDING = ("floor", "zero", "nearest")
+
+
+def atan_table(iterations=ITERATIONS, angle_width=ANGLE_WIDTH):
+    """atan(2**-i) as angle codes, rounded to nearest (atan_lut in the RTL)."""
+    scale = (1 << angle_width) / (2 * math.pi)
+    return [int(round(math.atan(2.0 ** -i) * scale)) for i in range(iterations)]
+
+
+def gain_inverse(iterations=ITERATIONS, frac_bits=16):
+    """1 / CORDIC gain for `iterations` rotations, in Q1.frac_bits (0x9B75 for 16)."""
+    gain = math.prod(math.sqrt(1 + 2.0 ** (-2 * i)) for i in range(iterations))
+    return int(round((1 << frac_bits) / gain))
+
+
+def wrap(values, bits):
+    """Reinterpret int64 values as `bits`-wide two's complement."""
+    half = 1 << (bits - 1)
+    return ((values + half) & ((1 << bits) - 1)) - half
+
+
+def pack(x, y, width=DATA_WIDTH):
+    """{y, x} input words from signed x and y."""
+    mask = (1 << width) - 1
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    return ((y & mask) << width) | (x & mask)
+
+
+def unpack(words, width=DATA_WIDTH):
+    """Signed (x, y) halves of {y, x} input words."""
+    words = np.asarray(words, dtype=np.int64)
+    mask = (1 << width) - 1
+    return wrap(words & mask, width), wrap((words >> width) & mask, width)
+
+
+def _shift(v, i, rounding):
+    if i == 0 or rounding == "floor":
+        return v >> i  # >>> in the RTL
+    if rounding == "zero":
+        return (v + ((v >> 63) & ((1 << i) - 1))) >> i
+    return (v + (1 << (i - 1))) >> i  # nearest, ties up
+
+
+def cordic(words, iterations=ITERATIONS, width=DATA_WIDTH, angle_width=ANGLE_WIDTH,
+           rounding="floor", k_inv=K_INV, trace=False):
+    """
+    axis_cordic outputs for an array of packed {y, x} input words.
+
+    iterations: NUM_STAGES (stage 0 counts as the first iteration)
+    width: DATA_WIDTH of each input half; registers are width + 2 bits
+    rounding: how y >>> i and x >>> i round, 'floor' (the RTL), 'zero' or
+        'nearest', for trying out alternative datapaths
+    k_inv: 1/gain in Q1.16 applied to the final x; gain_inverse(iterations)
+        gives the matching constant for other iteration counts
+    trace: also return the x, y and z registers after every stage, as
+        (iterations, n) arrays
+
+    Returns a dict with magnitude, angle and tdata ({angle, magnitude}, the
+    m00_axis_tdata word), plus x, y, z when tracing.
+    """
+    if rounding not in ROUNDING:
+        raise ValueError(f"rounding must be one of {ROUNDING}")
+    reg = width + 2
+    x_in, y_in = unpack(words, width)
+    folded = x_in < 0
+    y_neg = y_in < 0
+    # x_start/y_start: the negation happens in the 18 bit register, so -(-32768) does not wrap.
+    x = np.where(folded, -x_in, x_in)
+    y = np.where(folded, -y_in, y_in)
+    z = np.zeros_like(x)
+    atan = atan_table(iterations, angle_width)
+    if trace:
+        xs = np.empty((iterations, len(x)), dtype=np.int64)
+        ys = np.empty_like(xs)
+        zs = np.empty_like(xs)
+    for i in range(iterations):
+        # sign is -1 where y < 0 and 0 elsewhere; (d ^ sign) - sign negates d there.
+        sign = y >> 63
+        dx = _shift(y, i, rounding)
+        dy = _shift(x, i, rounding)
+        x = wrap(x + ((dx ^ sign) - sign), reg)
+        y = wrap(y - ((dy ^ sign) - sign), reg)
+        z = wrap(z - ((atan[i] ^ sign) - sign), reg)
+        if trace:
+            xs[i], ys[i], zs[i] = x, y, z
+
+    # (x * K_INV) >>> 16 in a width + 17 bit product, then clamp to 16 bits.
+    scaled = wrap(x * k_inv, width + 17) >> 16
+    magnitude = np.clip(scaled, 0, (1 << width) - 1)
+    half_turn = 1 << (angle_width - 1)
+    offset = np.where(folded, np.where(y_neg, -half_turn, half_turn), 0)
+    angle = (offset - z) & ((1 << angle_width) - 1)
+    result = dict(magnitude=magnitude, angle=angle, tdata=(angle << width) | magnitude)
+    if trace:
+        result.update(x=xs, y=ys, z=zs)
+    return result
+
+
+def ideal(words, width=DATA_WIDTH, angle_width=ANGLE_WIDTH):
+    """Exact magnitude (input LSBs) and angle (codes in [0, 2**angle_width)) as floats."""
+    x, y = unpack(words, width)
+    magnitude = np.hypot(x, y)
+    angle = np.mod(np.arctan2(y, x) * ((1 << angle_width) / (2 * np.pi)), 1 << angle_width)
+    return magnitude, angle
+
+
+QUADRANTS = ("I", "II", "III", "IV")
+
+
+def angle_sweep(magnitudes, angles=1 << ANGLE_WIDTH, width=DATA_WIDTH):
+    """Packed words for `angles` evenly spaced angles on a circle of each magnitude, in order."""
+    theta = 2 * np.pi * np.arange(angles) / angles
+    lo, hi = -(1 << (width - 1)), (1 << (width - 1)) - 1
+    x = np.concatenate([np.clip(np.rint(m * np.cos(theta)), lo, hi) for m in magnitudes])
+    y = np.concatenate([np.clip(np.rint(m * np.sin(theta)), lo, hi) for m in magnitudes])
+    return pack(x.astype(np.int64), y.astype(np.int64), width)
+
+
+def grid_sweep(step, width=DATA_WIDTH):
+    """Packed words for every (x, y) on a grid with spacing `step` over the whole input range."""
+    axis = np.arange(-(1 << (width - 1)), 1 << (width - 1), step, dtype=np.int64)
+    x, y = np.meshgrid(axis, axis)
+    return pack(x.ravel(), y.ravel(), width)
+
+
+def random_vectors(n, seed=1, width=DATA_WIDTH):
+    """Packed words for n (x, y) pairs drawn uniformly over the whole input range."""
+    rng = np.random.default_rng(seed)
+    x, y = rng.integers(-(1 << (width - 1)), 1 << (width - 1), size=(2, n), dtype=np.int64)
+    return pack(x, y, width)
+
+
+def quadrant(words, width=DATA_WIDTH):
+    """Quadrant index (0..3 for I..IV) of each input vector; the axes count as x >= 0, y >= 0."""
+    x, y = unpack(words, width)
+    return np.where(y >= 0, np.where(x >= 0, 0, 1), np.where(x < 0, 2, 3))
+
+
+def _stats(err):
+    if len(err) == 0:
+        return dict(min=0.0, max=0.0, mean=0.0, rms=0.0, worst=0.0)
+    return dict(min=float(err.min()), max=float(err.max()), mean=float(err.mean()),
+                rms=float(np.sqrt(np.mean(err * err))), worst=float(np.abs(err).max()))
+
+
+def _histogram(err):
+    values, counts = np.unique(np.rint(err).astype(np.int64), return_counts=True)
+    return dict(zip(values.tolist(), counts.tolist()))
+
+
+def error_surface(words, tdata, width=DATA_WIDTH, angle_width=ANGLE_WIDTH, angle_min_magnitude=1):
+    """
+    Magnitude and angle error of axis_cordic outputs against ideal(), per input quadrant.
+
+    Errors are output minus ideal, in output LSBs (magnitude) and angle codes
+    (wrapped to +/- half a turn). The histograms bin them to the nearest whole
+    LSB/code, as {error: count}. The angle of a short vector is mostly
+    quantization noise (and undefined at 0), so angle errors only count inputs
+    with |(x, y)| >= angle_min_magnitude. Returns one dict per quadrant.
+    """
+    words = np.asarray(words, dtype=np.int64)
+    tdata = np.asarray(tdata, dtype=np.int64)
+    magnitude = tdata & ((1 << width) - 1)
+    angle = (tdata >> width) & ((1 << angle_width) - 1)
+    ideal_mag, ideal_ang = ideal(words, width, angle_width)
+    turn = 1 << angle_width
+    mag_err = magnitude - ideal_mag
+    ang_err = np.mod(angle - ideal_ang + turn / 2, turn) - turn / 2
+    quad = quadrant(words, width)
+    long_enough = ideal_mag >= angle_min_magnitude
+    report = []
+    for q, name in enumerate(QUADRANTS):
+        sel = quad == q
+        ang_sel = sel & long_enough
+        report.append(dict(quadrant=name, count=int(sel.sum()),
+                           magnitude=_stats(mag_err[sel]), angle=_stats(ang_err[ang_sel]),
+                           magnitude_histogram=_histogram(mag_err[sel]),
+                           angle_histogram=_histogram(ang_err[ang_sel])))
+    return report
+
+
+def format_error_surface(report, max_bins=12):
+    """Text table of an error_surface() report; each histogram shows its most populated bins."""
+    lines = [f"{'quad':>4} {'count':>8} {'mag min':>8} {'mag max':>8} {'mag rms':>8} "
+             f"{'ang min':>8} {'ang max':>8} {'ang rms':>8}"]
+    for r in report:
+        m, a = r["magnitude"], r["angle"]
+        lines.append(f"{r['quadrant']:>4} {r['count']:>8} {m['min']:>8.2f} {m['max']:>8.2f} {m['rms']:>8.2f} "
+                     f"{a['min']:>8.2f} {a['max']:>8.2f} {a['rms']:>8.2f}")
+    for r in report:
+        for kind in ("magnitude", "angle"):
+            hist = r[f"{kind}_histogram"]
+            top = sorted(sorted(hist.items(), key=lambda kv: -kv[1])[:max_bins])
+            lines.append(f"{r['quadrant']:>4} {kind} error: " + " ".join(f"{e:+d}:{c}" for e, c in top))
+    return "\n".join(lines)
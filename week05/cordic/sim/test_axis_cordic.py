@@ -1,4 +1,5 @@
 import cocotb
+import json
 import os
 import random
 import sys
@@ -7,139 +8,25 @@ import numpy
 import logging
 from pathlib import Path
 from cocotb.clock import Clock
-from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnly, with_timeout
+from cocotb.triggers import Timer, ClockCycles, with_timeout
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
-from cocotb_bus.bus import Bus
-from cocotb_bus.drivers import BusDriver
-from cocotb_bus.monitors import BusMonitor
-from cocotb_bus.scoreboard import Scoreboard
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
 from scipy.signal import lfilter
 
-test_file = os.path.basename(__file__).replace(".py", "")
-
-class AXIS_Monitor(BusMonitor):
-    """
-    monitors axi streaming bus
-    """
-    transactions = 0  # use this variable to track good ready/valid handshakes
-    
-    def __init__(self, dut, name, clk, callback=None):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-        BusMonitor.__init__(self, dut, name, clk, callback=callback)
-        self.clock = clk
-        self.transactions = 0
-        self.dut = dut
-        
-    async def _monitor_recv(self):
-        """
-        Monitor receiver
-        """
-        rising_edge = RisingEdge(self.clock)
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly()
-        
-        while True:
-            await falling_edge
-            await read_only
-            valid = self.bus.axis_tvalid.value
-            ready = self.bus.axis_tready.value
-            last = self.bus.axis_tlast.value
-            data = self.bus.axis_tdata.value
-        
-            if valid and ready:
-                self.transactions += 1
-                thing = dict(data=data.signed_integer, last=last,
-                             name=self.name, count=self.transactions)
-                self.dut._log.info(f"{self.name}: {thing}")
-                self._recv(data.signed_integer)
-
-class AXIS_Driver(BusDriver):
-    def __init__(self, dut, name, clk, role="M"):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-        BusDriver.__init__(self, dut, name, clk)
-        self.clock = clk
-        self.dut = dut
-
-class M_AXIS_Driver(AXIS_Driver):
-    def __init__(self, dut, name, clk):
-        super().__init__(dut, name, clk)
-        self.bus.axis_tdata.value = 0
-        self.bus.axis_tstrb.value = 0xF
-        self.bus.axis_tlast.value = 0
-        self.bus.axis_tvalid.value = 0
-
-    async def _driver_send(self, value, sync=True):
-        rising_edge = RisingEdge(self.clock)
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly()
-        
-        if value.get("type") == "pause":
-            await falling_edge
-            self.bus.axis_tvalid.value = 0
-            self.bus.axis_tlast.value = 0
-            for i in range(value.get("duration", 1)):
-                await rising_edge
-        elif value.get("type") == "write_single":
-            await falling_edge
-            self.bus.axis_tvalid.value = 1
-            self.bus.axis_tlast.value = value.get("contents").get("last")
-            self.bus.axis_tdata.value = int(value.get("contents").get("data"))
-            while True:
-                await rising_edge
-                await read_only
-                if self.bus.axis_tready.value:
-                    break
-            await falling_edge
-            self.bus.axis_tvalid.value = 0
-            self.bus.axis_tlast.value = 0
-            await rising_edge
-        elif value.get("type") == "write_burst":
-            data_list = value.get("contents").get("data")   
-            for i, data in enumerate(data_list):
-                await falling_edge
-                self.bus.axis_tdata.value = int(data)
-                self.bus.axis_tlast.value = 1 if i == len(data_list) - 1 else 0
-                self.bus.axis_tvalid.value = 1
-                while True:
-                    await rising_edge
-                    await read_only
-                    if self.bus.axis_tready.value:
-                        break
-            await falling_edge
-            self.bus.axis_tvalid.value = 0
-            self.bus.axis_tlast.value = 0
-            await rising_edge
-        else:
-            pass
-
-class S_AXIS_Driver(BusDriver):
-    def __init__(self, dut, name, clk):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-        BusDriver.__init__(self, dut, name, clk)
-        self.bus.axis_tready.value = 0
+sys.path.append(str(Path(__file__).resolve().parent / "model"))
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+import cordic_model
+from simlib.axis import AXISMonitor, AXISSink, AXISSource, gap_pattern
+from simlib import patterns
+from simlib.build_cache import cached_build
+from simlib.completion import until_done
+from simlib.probe import AXISProbe
 
-    async def _driver_send(self, value, sync=True):
-        rising_edge = RisingEdge(self.clock)
-        falling_edge = FallingEdge(self.clock)
-        
-        if value.get("type") == "pause":
-            await falling_edge
-            self.bus.axis_tready.value = 0
-            for i in range(value.get("duration", 1)):
-                await rising_edge
-        elif value.get("type") == "read":
-            await falling_edge
-            self.bus.axis_tready.value = 1
-            for _ in range(value.get("duration", 1)):
-                while True:
-                    await rising_edge
-        else:
-            pass
+test_file = os.path.basename(__file__).replace(".py", "")
 
 async def reset(clk, rst, cycles_held=3, polarity=1):
     rst.value = polarity
@@ -149,21 +36,6 @@ async def reset(clk, rst, cycles_held=3, polarity=1):
 """
 Driver Functions Above and General
 """
-sig_out_act = []
-sig_out_exp = []
-
-cordic_angles = [math.atan(2**(-i)) for i in range(16)]
-CORDIC_GAIN = 0.607252935
-
-def u16_to_s16(value: int) -> int:
-    """Convert unsigned 16-bit to signed value without NumPy overflow warnings."""
-    value &= 0xFFFF
-    return value - 0x10000 if value & 0x8000 else value
-
-def s16_to_float(value: int) -> float:
-    """Convert Q1.15 two's complement into float."""
-    return float(u16_to_s16(value)) / 32768.0
-
 def pack_normalised_vector(x: float, y: float):
     """Normalise (x,y) to unit length and pack into {y,x} Q1.15."""
     norm = float(np.hypot(x, y))
@@ -179,45 +51,6 @@ def pack_normalised_vector(x: float, y: float):
     to_dut = (y_s16<<16) | x_s16
     return to_dut, norm
 
-def cordic_model(val):
-    """CORDIC software model for a packed 32-bit {y,x} input sample"""
-    x_raw = val & 0xFFFF
-    y_raw = (val >> 16) & 0xFFFF
-
-    x = s16_to_float(x_raw)
-    y = s16_to_float(y_raw)
-    z = 0.0
-
-    rotated = x < 0.0
-    y_neg = y < 0.0
-
-    if rotated:
-        x = -x
-        y = -y
-
-    steps = [((x, y), z)]
-
-    for i in range(16):
-        if y >= 0:
-            xn = x + (y / (2**i))
-            yn = y - (x / (2**i))
-            zn = z - cordic_angles[i]
-        else:
-            xn = x - (y / (2**i))
-            yn = y + (x / (2**i))
-            zn = z + cordic_angles[i]
-
-        steps.append(((xn, yn), zn))
-        x, y, z = xn, yn, zn
-
-    angle_val = -z
-    if rotated:
-        angle_val += math.pi if not y_neg else -math.pi
-
-    angle_val = (angle_val + 2 * math.pi) % (2 * math.pi)
-    steps.append(((x, y), angle_val))
-    sig_out_exp.append(steps)
-
 @cocotb.test()
 async def test_axis_cordic_basic(dut):
     """Basic AXI-stream CORDIC test"""
@@ -236,10 +69,11 @@ async def test_axis_cordic_basic(dut):
         vec_norms.append(norm)
     
     # Create monitors and drivers after I multiply 
-    inm = AXIS_Monitor(dut, 's00', dut.s00_axis_aclk, callback=cordic_model)
-    outm = AXIS_Monitor(dut, 'm00', dut.s00_axis_aclk, callback=lambda x: sig_out_act.append(x))
-    ind = M_AXIS_Driver(dut, 's00', dut.s00_axis_aclk)
-    outd = S_AXIS_Driver(dut, 'm00', dut.s00_axis_aclk)
+    inm = AXISMonitor(dut, 's00', dut.s00_axis_aclk)
+    outm = AXISMonitor(dut, 'm00', dut.s00_axis_aclk)
+    ind = AXISSource(dut, 's00', dut.s00_axis_aclk)
+    outd = AXISSink(dut, 'm00', dut.s00_axis_aclk)
+    probe = AXISProbe(dut, dut.s00_axis_aclk)
     
     # Start clock and reset
     cocotb.start_soon(Clock(dut.s00_axis_aclk, 10, units="ns").start())
@@ -249,55 +83,108 @@ async def test_axis_cordic_basic(dut):
     # ind.append({'type': 'write_burst', "contents": {"data": packed_vecs}})
     # ind.append({'type':'pause','duration':2}) #end with pause
     
-    for idx, data in enumerate(packed_vecs):
-        ind.append({'type':"write_single","contents": {"data": data, "last": 1 if idx == len(packed_vecs) - 1 else 0}})
-        ind.append({'type':'pause', "duration":random.randint(1,10)})
-    ind.append({'type':'pause', "duration":2})
-    for _ in range(50):
-        outd.append({'type':'read', "duration":random.randint(1,10)})
-        outd.append({'type':'pause', "duration":random.randint(1,10)})
+    gaps = [random.randint(1,10) for _ in packed_vecs]
+    ind.start(packed_vecs, valid_pattern=gap_pattern(gaps))
+    outd.start(patterns.from_env(1000))
     
-    await ClockCycles(dut.s00_axis_aclk, 1000)  # Much longer than needed
+    await until_done(outm, beats=len(packed_vecs), timeout=1000, budget=1000, log=dut._log)
 
     assert inm.transactions == outm.transactions, \
         f"Transaction count mismatch: in={inm.transactions}, out={outm.transactions}"
+    probe.report(dut._log)
     
-    mag_tolerance = .0001  # one LSB of Q1.15
-    ang_tolerance = .001  # one LSB of Q0.16
-
-    num_samples = min(len(sig_out_act), len(sig_out_exp), len(packed_vecs))
-
-    for idx in range(num_samples):
-        dut_word = sig_out_act[idx]
-        hist = sig_out_exp[idx]
-        packed_vec = packed_vecs[idx]
-        x_raw = packed_vec & 0xFFFF
-        y_raw = (packed_vec >> 16) & 0xFFFF
-        norm = vec_norms[idx]
-
-        (xn, yn), z = hist[-1]
-        model_mag = norm * abs(xn) * CORDIC_GAIN
-        model_ang = z % (2 * math.pi)
-
-        dut_mag_code = dut_word & 0xFFFF
-        dut_ang_code = (dut_word >> 16) & 0xFFFF
-
-        dut_mag = (dut_mag_code / 32768.0) * norm
-        dut_ang = (dut_ang_code / 65536.0) * 2 * math.pi
-        x_int = u16_to_s16(x_raw)
-        y_int = u16_to_s16(y_raw)
-
+    # Bit-exact check of every output word against the fixed-point model
+    expected = cordic_model.cordic(inm.data)
+    ideal_mag, ideal_ang = cordic_model.ideal(inm.data)
+    x_in, y_in = cordic_model.unpack(inm.data)
+    for idx in range(outm.transactions):
         dut._log.info(
-            "xraw={0:+6d} yraw={1:+6d}\nmag: model={2:.6f} dut={3:.6f}\nang: model={4:.6f} dut={5:.6f}\n"
-            .format(x_int, y_int, model_mag, dut_mag, model_ang, dut_ang)
+            "xraw={0:+6d} yraw={1:+6d}\nmag: ideal={2:.2f} model={3} dut={4}\nang: ideal={5:.2f} model={6} dut={7}\n"
+            .format(x_in[idx], y_in[idx], ideal_mag[idx], expected["magnitude"][idx], outm.data[idx] & 0xFFFF,
+                    ideal_ang[idx], expected["angle"][idx], outm.data[idx] >> 16)
         )
-
-        assert abs(dut_mag - model_mag) <= 0.0001, \
-            f"magnitude mismatch for input {idx}: model={model_mag}, dut={dut_mag}"
-        assert abs((dut_ang - model_ang + math.pi) % (2 * math.pi) - math.pi) <= ang_tolerance, \
-            f"angle mismatch for input {idx}: model={model_ang}, dut={dut_ang}"
+    bad = np.flatnonzero(outm.data != expected["tdata"])
+    assert len(bad) == 0, \
+        f"{len(bad)} outputs differ from cordic_model, first at input {bad[0]}: " \
+        f"model={expected['tdata'][bad[0]]:#010x}, dut={outm.data[bad[0]]:#010x}"
 
     
+SWEEP_VARS = ("CORDIC_SWEEP_MAGNITUDES", "CORDIC_SWEEP_GRID_STEP", "CORDIC_SWEEP_RANDOM")
+
+@cocotb.test(skip=not any(os.getenv(var) for var in SWEEP_VARS))
+async def test_axis_cordic_sweep(dut):
+    """Exhaustive sweep streamed back to back: bit-exact check, throughput, latency and error surface
+
+    Skipped unless one of SWEEP_VARS picks the stimulus, since a full sweep is
+    hundreds of thousands of vectors: all 65536 angles on circles of radius
+    $CORDIC_SWEEP_MAGNITUDES (e.g. 32767,8192,512), every point of a grid with
+    spacing $CORDIC_SWEEP_GRID_STEP over the whole Q1.15 input space, or
+    $CORDIC_SWEEP_RANDOM uniformly random vectors seeded by $CORDIC_SWEEP_SEED
+    (the benchmark workload).
+    m00 tready follows $AXIS_READY_PATTERN, by default high with probability
+    $CORDIC_SWEEP_READY (default 1, i.e. no backpressure).
+    """
+    step = os.getenv("CORDIC_SWEEP_GRID_STEP")
+    count = os.getenv("CORDIC_SWEEP_RANDOM")
+    seed = int(os.getenv("CORDIC_SWEEP_SEED", "1"))
+    if step:
+        words = cordic_model.grid_sweep(int(step))
+    elif count:
+        words = cordic_model.random_vectors(int(count), seed)
+    else:
+        magnitudes = [int(m) for m in os.environ["CORDIC_SWEEP_MAGNITUDES"].split(",")]
+        words = cordic_model.angle_sweep(magnitudes)
+    ready = float(os.getenv("CORDIC_SWEEP_READY", "1"))
+    if not 0 < ready <= 1:
+        raise ValueError(f"CORDIC_SWEEP_READY must be in (0, 1], got {ready}")
+    n = len(words)
+    # tready stays high once the pattern ends, so every output is out within its length plus n beats
+    default = "always" if ready == 1 else f"bernoulli:p={ready:f}"
+    ready_pattern = patterns.from_env(int(n / ready) + 1000, default=default)
+    full_rate = bool(ready_pattern.all())
+
+    inm = AXISMonitor(dut, 's00', dut.s00_axis_aclk, capacity=n)
+    outm = AXISMonitor(dut, 'm00', dut.s00_axis_aclk, capacity=n)
+    ind = AXISSource(dut, 's00', dut.s00_axis_aclk)
+    outd = AXISSink(dut, 'm00', dut.s00_axis_aclk)
+
+    cocotb.start_soon(Clock(dut.s00_axis_aclk, 10, units="ns").start())
+    await reset(dut.s00_axis_aclk, dut.s00_axis_aresetn, 2, 0)
+
+    outd.start(ready_pattern)
+    ind.start(words)
+    limit = len(ready_pattern) + n + 10 * cordic_model.LATENCY + 1000
+    await until_done(outm, beats=n, timeout=limit, log=dut._log)
+
+    assert outm.transactions == n, f"only {outm.transactions} of {n} outputs after {outm.cycles} cycles"
+    assert (inm.data == words).all(), "inputs were not taken in order"
+
+    # Throughput over the span of transfers, latency per beat (outputs come back in order)
+    in_rate = n / (inm.cycle[-1] - inm.cycle[0] + 1)
+    out_rate = n / (outm.cycle[-1] - outm.cycle[0] + 1)
+    latency = outm.cycle - inm.cycle
+    ready = float(ready_pattern.mean())
+    dut._log.info(f"{n} vectors, ready={ready:.3f}: input {in_rate:.4f} beats/cycle, output {out_rate:.4f} beats/cycle, "
+                  f"latency min {latency.min()} / mean {latency.mean():.2f} / max {latency.max()} cycles")
+
+    expected = cordic_model.cordic(words)["tdata"]
+    bad = np.flatnonzero(outm.data != expected)
+    report = cordic_model.error_surface(words, outm.data)
+    dut._log.info("error vs ideal, per input quadrant (LSBs / angle codes):\n"
+                  + cordic_model.format_error_surface(report))
+    with open("cordic_sweep.json", "w") as f:
+        json.dump(dict(vectors=n, ready=ready, input_rate=in_rate, output_rate=out_rate,
+                       latency=dict(min=int(latency.min()), mean=float(latency.mean()), max=int(latency.max())),
+                       mismatches=len(bad), quadrants=report), f, indent=1)
+
+    assert len(bad) == 0, \
+        f"{len(bad)} outputs differ from cordic_model, first at input {bad[0]} ({words[bad[0]]:#010x}): " \
+        f"model={expected[bad[0]]:#010x}, dut={outm.data[bad[0]]:#010x}"
+    if full_rate:
+        assert in_rate == 1.0 and out_rate == 1.0, "pipeline did not sustain one beat per cycle"
+        assert (latency == cordic_model.LATENCY).all(), \
+            f"latency {latency.min()}..{latency.max()} cycles, expected {cordic_model.LATENCY}"
+
 def axis_runner():
     """Simulate the AXI-stream FIR 15 using the Python runner."""
     hdl_toplevel_lang = os.getenv("HDL_TOPLEVEL_LANG", "verilog")
@@ -314,10 +201,10 @@ def axis_runner():
     runner = get_runner(sim)
     hdl_toplevel = "axis_cordic"
     
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel,
-        always=True,
         build_args=build_test_args,
         parameters=parameters,
         timescale=('1ns', '1ps'),
@@ -329,6 +216,7 @@ def axis_runner():
         hdl_toplevel=hdl_toplevel,
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
 
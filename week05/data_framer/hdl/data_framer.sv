@@ -1,6 +1,7 @@
 module data_framer #
 	(
-		parameter integer C_M00_AXIS_TDATA_WIDTH	= 32
+		parameter integer C_M00_AXIS_TDATA_WIDTH	= 32,
+		parameter integer BURST_LENGTH = 65536 // beats per TLAST-framed burst
 	)
 	(
         input  wire                         pixel_clk,
@@ -20,7 +21,11 @@ module data_framer #
     logic [7:0] debounce_cycles = 8'h0;
     logic trigger_debounced = 1'b0;
 
-    logic [15:0] samples     = 16'h0;
+    // $clog2(1) is 0: keep at least one counter bit so BURST_LENGTH = 1 still elaborates
+    localparam integer SAMPLE_WIDTH = (BURST_LENGTH > 1) ? $clog2(BURST_LENGTH) : 1;
+    localparam [SAMPLE_WIDTH-1:0] LAST_SAMPLE = BURST_LENGTH - 1;
+
+    logic [SAMPLE_WIDTH-1:0] samples = '0;
     logic        transmitting    = 1'b0;
 
     wire  handshake;
@@ -38,16 +43,23 @@ module data_framer #
         end
 
         trigger_debounced <= trigger_sync[1] && (debounce_cycles == 8'hFE);
-        transmitting <= (trigger_debounced) ? 1'b1 : (transmitting && handshake && (samples==16'hFFFF)) ? 1'b0 : transmitting;
-        samples <= (!transmitting) ? 16'b0 : (!handshake) ? samples : (samples==16'hFFFF) ? 16'b0 : samples + 1;
+        transmitting <= (trigger_debounced) ? 1'b1 : (transmitting && handshake && (samples==LAST_SAMPLE)) ? 1'b0 : transmitting;
+        samples <= (!transmitting) ? '0 : (!handshake) ? samples : (samples==LAST_SAMPLE) ? '0 : samples + 1;
         // transmitting <= tx_state;
     end
 
+    // tvalid and tlast come straight from the counter state, so the bus handshake
+    // is exactly the one samples counts and tlast marks beat BURST_LENGTH of each frame
+    assign m00_axis_tvalid = transmitting;
+    assign m00_axis_tlast  = transmitting && (samples == LAST_SAMPLE);
+
+    // tdata only takes a new pixel once the beat on the bus has been taken
+    // (or there is none), so it holds while tvalid && !tready
     always_ff @(posedge pixel_clk) begin
-        m00_axis_tvalid <= transmitting;
-        m00_axis_tlast  <= transmitting && (samples == 16'hFFFF);
-        m00_axis_tdata  <= {8'b0, pixel_data};
-        m00_axis_tstrb  <= 4'b111;
+        if (!m00_axis_tvalid || m00_axis_tready) begin
+            m00_axis_tdata  <= {8'b0, pixel_data};
+        end
+        m00_axis_tstrb  <= {(C_M00_AXIS_TDATA_WIDTH/8){1'b1}};
     end
 
 endmodule
@@ -1,6 +1,7 @@
 module data_framer_w #
 	(
-		parameter integer C_M00_AXIS_TDATA_WIDTH	= 32
+		parameter integer C_M00_AXIS_TDATA_WIDTH	= 32,
+		parameter integer BURST_LENGTH = 65536
 	)
 	(
         input wire pixel_clk, //driven by video pixel clock
@@ -14,7 +15,7 @@ module data_framer_w #
 		output wire [(C_M00_AXIS_TDATA_WIDTH/8)-1: 0] m00_axis_tstrb
 	);
  
-    data_framer mdf
+    data_framer #(.BURST_LENGTH(BURST_LENGTH)) mdf
     (   .pixel_clk(pixel_clk),
         .pixel_data(pixel_data),
         .trigger(trigger),
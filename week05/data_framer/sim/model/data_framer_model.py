@@ -0,0 +1,130 @@
+"""
+Cycle-accurate NumPy model of hdl/data_framer.sv.
+
+Inputs are arrays with one entry per rising edge: trigger[i], tready[i] and
+pixel_data[i] are the values the DUT samples on edge i (driven half a cycle
+before it). The model assumes the registers start settled: trigger_sync,
+debounce_cycles, trigger_debounced, transmitting and samples all 0, which is
+where the DUT is after a few edges with trigger low.
+
+RTL behaviour, per edge i (registers named as in the RTL):
+    debounce     trigger goes through two sync flops, then debounce_cycles
+                 counts consecutive high cycles; trigger_debounced pulses for
+                 one cycle when the synchronized trigger has been high for
+                 exactly 255 cycles, so holding trigger high fires it once
+    transmitting set the edge after that pulse; cleared on the handshake
+                 (transmitting && tready) that takes samples to
+                 burst_length - 1, unless the pulse comes on the same edge
+    samples      counts handshakes while transmitting, wrapping at the end
+                 of a frame
+    outputs      tvalid = transmitting,
+                 tlast = transmitting && samples == burst_length - 1,
+                 tdata <= pixel_data on edges where !tvalid || tready, so it
+                 holds while a beat waits for tready,
+                 tstrb = all ones
+
+tvalid and tlast are the counter state itself, so the bus handshake
+(tvalid && tready) is the one samples counts: every frame is burst_length
+beats with tlast on the last, and frame_lengths() of the transfers is
+[burst_length, ..., burst_length, <partial frame>]. Frames are found with a
+cumulative sum over tready, so a run of a million cycles takes a few
+milliseconds.
+"""
+import numpy as np
+
+BURST_LENGTH = 65536  # beats per frame (BURST_LENGTH in the RTL)
+DEBOUNCE = 255  # synchronized trigger-high cycles before trigger_debounced pulses
+SYNC_STAGES = 2
+PIXEL_WIDTH = 24
+
+
+def _run_lengths(bits):
+    """Number of consecutive ones ending at each index (0 where bits is 0)."""
+    bits = np.asarray(bits, dtype=bool)
+    idx = np.arange(len(bits))
+    last_zero = np.maximum.accumulate(np.where(bits, -1, idx))
+    return idx - last_zero
+
+
+def debounced(trigger):
+    """trigger_debounced after every edge."""
+    trigger = np.asarray(trigger, dtype=bool)
+    pulse = np.zeros(len(trigger), dtype=bool)
+    # After edge i it reflects trigger_sync[1] = trigger[i - 2] with 255 highs up to and including it.
+    delay = SYNC_STAGES
+    pulse[delay:] = _run_lengths(trigger)[:len(trigger) - delay] == DEBOUNCE
+    return pulse
+
+
+def data_framer(trigger, tready, pixel_data, burst_length=BURST_LENGTH):
+    """
+    Simulate data_framer over len(trigger) edges.
+
+    Returns a dict of per-edge register and output values (after each edge):
+        transmitting, samples, tvalid, tlast, tdata
+    and of the bus transfers (tvalid && tready sampled on an edge, as an
+    AXISMonitor sees them):
+        cycle   edge index + 1 of each transfer (AXISMonitor.cycle when the
+                monitor starts sampling at edge 0)
+        data, last
+    plus frames, a list of (start, end) edges: transmitting rises after
+    `start` and the frame's last counted handshake is on `end` (None if the
+    run ends first).
+    """
+    trigger = np.asarray(trigger, dtype=bool)
+    ready = np.asarray(tready, dtype=bool)
+    pixel_data = np.asarray(pixel_data, dtype=np.int64)
+    n = len(trigger)
+    pulse = debounced(trigger)
+    pulse_at = np.flatnonzero(pulse)
+    handshakes = np.cumsum(ready)  # handshakes[i]: tready highs on edges 0..i
+
+    transmitting = np.zeros(n, dtype=bool)
+    samples = np.zeros(n, dtype=np.int64)
+    frames = []
+    first = 0  # earliest edge whose trigger_debounced can start the next frame
+    while True:
+        k = np.searchsorted(pulse_at, first)
+        if k == len(pulse_at) or pulse_at[k] + 1 >= n:
+            break
+        start = int(pulse_at[k]) + 1  # transmitting and samples=0 after this edge
+        # The frame ends on the burst_length-th tready after `start`.
+        end = int(np.searchsorted(handshakes, handshakes[start] + burst_length))
+        stop = min(end, n)
+        transmitting[start:stop] = True
+        samples[start:stop] = handshakes[start:stop] - handshakes[start]
+        if end >= n:
+            frames.append((start, None))
+            break
+        frames.append((start, end))
+        # After `end` transmitting is trigger_debounced from edge end-1 (samples wraps to 0 either way).
+        first = end - 1
+
+    tvalid = transmitting
+    tlast = transmitting & (samples == burst_length - 1)
+    # tdata loads on edge i unless a beat was waiting (tvalid after edge i-1) and tready[i] is low.
+    load = ~np.concatenate(([False], tvalid[:-1])) | ready
+    loaded = np.maximum.accumulate(np.where(load, np.arange(n), 0))
+    tdata = pixel_data[loaded] & ((1 << PIXEL_WIDTH) - 1)
+
+    # Edge i sees the outputs after edge i-1 together with tready[i].
+    edge = np.flatnonzero(tvalid[:-1] & ready[1:]) + 1
+    return dict(transmitting=transmitting, samples=samples, tvalid=tvalid, tlast=tlast, tdata=tdata,
+                cycle=edge + 1, data=tdata[edge - 1], last=tlast[edge - 1], frames=frames)
+
+
+def frame_lengths(last):
+    """Beats in each tlast-terminated frame of a transfer stream, then the beats after the final tlast."""
+    ends = np.flatnonzero(np.asarray(last, dtype=bool)) + 1
+    return np.diff(np.concatenate(([0], ends, [len(last)]))).tolist()
+
+
+def trigger_pattern(cycles, high=DEBOUNCE + 45, low=20, lead=0):
+    """
+    Trigger input that is low for `lead` cycles, then high for `high` and low
+    for `low`, repeated. Any high run of at least DEBOUNCE + SYNC_STAGES
+    cycles fires trigger_debounced once, so frames restart within
+    high + low cycles of the previous one ending.
+    """
+    period = np.concatenate((np.ones(high, dtype=bool), np.zeros(low, dtype=bool)))
+    return np.concatenate((np.zeros(lead, dtype=bool), np.resize(period, max(cycles - lead, 0))))
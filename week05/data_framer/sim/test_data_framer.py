@@ -7,203 +7,95 @@ import numpy
 import logging
 from pathlib import Path
 from cocotb.clock import Clock
-from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnly, with_timeout
+from cocotb.triggers import Timer, ClockCycles, FallingEdge, with_timeout
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
-from cocotb_bus.bus import Bus
-from cocotb_bus.drivers import BusDriver
-from cocotb_bus.monitors import BusMonitor
-from cocotb_bus.scoreboard import Scoreboard
+sys.path.append(str(Path(__file__).resolve().parent / "model"))
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+import data_framer_model
+from simlib import patterns
+from simlib.axis import AXISMonitor
+from simlib.build_cache import cached_build
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
 
 test_file = os.path.basename(__file__).replace(".py", "")
+READY = "bernoulli:p=0.8"  # default tready pattern of test_data_framer
 
-class AXIS_Monitor(BusMonitor):
-    """
-    monitors axi streaming bus
-    """
-    transactions = 0  # use this variable to track good ready/valid handshakes
-    
-    def __init__(self, dut, name, clk, callback=None):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-        BusMonitor.__init__(self, dut, name, clk, callback=callback)
-        self.clock = clk
-        self.transactions = 0
-        self.dut = dut
-        
-    async def _monitor_recv(self):
-        """
-        Monitor receiver
-        """
-        rising_edge = RisingEdge(self.clock)
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly()
-        
-        while True:
-            await falling_edge
-            await read_only
-            valid = self.bus.axis_tvalid.value
-            ready = self.bus.axis_tready.value
-            last = self.bus.axis_tlast.value
-            data = self.bus.axis_tdata.value
-        
-            if valid and ready:
-                self.transactions += 1
-                thing = dict(data=data.signed_integer, last=last,
-                             name=self.name, count=self.transactions)
-                self.dut._log.info(f"{self.name}: {thing}")
-                self._recv(data.signed_integer)
-
-# class AXIS_Driver(BusDriver):
-#     def __init__(self, dut, name, clk, role="M"):
-#         self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-#         BusDriver.__init__(self, dut, name, clk)
-#         self.clock = clk
-#         self.dut = dut
-
-# class M_AXIS_Driver(AXIS_Driver):
-#     def __init__(self, dut, name, clk):
-#         super().__init__(dut, name, clk)
-#         self.bus.axis_tdata.value = 0
-#         self.bus.axis_tstrb.value = 0xF
-#         self.bus.axis_tlast.value = 0
-#         self.bus.axis_tvalid.value = 0
-
-#     async def _driver_send(self, value, sync=True):
-#         rising_edge = RisingEdge(self.clock)
-#         falling_edge = FallingEdge(self.clock)
-#         read_only = ReadOnly()
-        
-#         if value.get("type") == "pause":
-#             await falling_edge
-#             self.bus.axis_tvalid.value = 0
-#             self.bus.axis_tlast.value = 0
-#             for i in range(value.get("duration", 1)):
-#                 await rising_edge
-#         elif value.get("type") == "write_single":
-#             await falling_edge
-#             self.bus.axis_tvalid.value = 1
-#             self.bus.axis_tlast.value = value.get("contents").get("last")
-#             self.bus.axis_tdata.value = int(value.get("contents").get("data"))
-#             while True:
-#                 await rising_edge
-#                 await read_only
-#                 if self.bus.axis_tready.value:
-#                     break
-#             await falling_edge
-#             self.bus.axis_tvalid.value = 0
-#             self.bus.axis_tlast.value = 0
-#             await rising_edge
-#         elif value.get("type") == "write_burst":
-#             data_list = value.get("contents").get("data")   
-#             for i, data in enumerate(data_list):
-#                 await falling_edge
-#                 self.bus.axis_tdata.value = int(data)
-#                 self.bus.axis_tlast.value = 1 if i == len(data_list) - 1 else 0
-#                 self.bus.axis_tvalid.value = 1
-#                 while True:
-#                     await rising_edge
-#                     await read_only
-#                     if self.bus.axis_tready.value:
-#                         break
-#             await falling_edge
-#             self.bus.axis_tvalid.value = 0
-#             self.bus.axis_tlast.value = 0
-#             await rising_edge
-#         else:
-#             pass
-
-# class S_AXIS_Driver(BusDriver):
-#     def __init__(self, dut, name, clk):
-#         self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-#         BusDriver.__init__(self, dut, name, clk)
-#         self.bus.axis_tready.value = 0
-
-#     async def _driver_send(self, value, sync=True):
-#         rising_edge = RisingEdge(self.clock)
-#         falling_edge = FallingEdge(self.clock)
-        
-#         if value.get("type") == "pause":
-#             await falling_edge
-#             self.bus.axis_tready.value = 0
-#             for i in range(value.get("duration", 1)):
-#                 await rising_edge
-#         elif value.get("type") == "read":
-#             await falling_edge
-#             self.bus.axis_tready.value = 1
-#             for _ in range(value.get("duration", 1)):
-#                 await rising_edge
-#             await falling_edge
-#             self.bus.axis_tready.value = 0
-#             await rising_edge
-#         else:
-#             pass
-
-"""
-Monitor/Driver Functions Above and General
-"""
+async def drive(dut, trigger, ready, pixel_data):
+    """Apply one entry of each stimulus array per cycle, on the falling edges; returns after the last edge"""
+    falling_edge = FallingEdge(dut.pixel_clk)
+    pixel, trig, tready = dut.pixel_data, dut.trigger, dut.m00_axis_tready
+    t_prev = r_prev = None
+    for t, r, p in zip(trigger.tolist(), ready.tolist(), pixel_data.tolist()):
+        pixel.value = p
+        if t != t_prev:
+            trig.value = t_prev = t
+        if r != r_prev:
+            tready.value = r_prev = r
+        await falling_edge
 
 @cocotb.test()
 async def test_data_framer(dut):
-    rising_edge = RisingEdge(dut.pixel_clk)
-    falling_edge = FallingEdge(dut.pixel_clk)
-    readonly = ReadOnly()
-    burst_length = 65536
-    debounce_cycles = 256
-    transactions = 0
+    """Every beat of $DATA_FRAMER_FRAMES (default 1) back-to-back frames against data_framer_model
 
-    # inm = AXIS_Monitor(dut, 's00', dut.pixel_clk)
-    # outm = AXIS_Monitor(dut, 'm00', dut.pixel_clk)
-    # ind = M_AXIS_Driver(dut, 's00', dut.pixel_clk)
-    # outd = S_AXIS_Driver(dut, 'm00', dut.pixel_clk)
+    The default run is one BURST_LENGTH frame (and the start of the next) at
+    80% ready, about 85k cycles; longer runs come from DATA_FRAMER_FRAMES and
+    DATA_FRAMER_BURST_LENGTH. pixel_data, tready (READY or $AXIS_READY_PATTERN)
+    and a trigger that re-arms every 320 cycles are precomputed for the whole
+    run; each transfer's tdata, tlast and cycle must match the model (so
+    tdata must hold while tready is low), and every tlast-terminated frame
+    must be exactly BURST_LENGTH beats.
+    """
+    falling_edge = FallingEdge(dut.pixel_clk)
+    burst_length = int(os.getenv("DATA_FRAMER_BURST_LENGTH", str(data_framer_model.BURST_LENGTH)))
+    frames = int(os.getenv("DATA_FRAMER_FRAMES", "1"))
+    rng = np.random.default_rng(random.getrandbits(32))
     
-    # Start clock and reset
+    # Enough cycles for every frame at the pattern's ready rate, plus a re-trigger between frames
+    rate = max(patterns.from_env(10000, default=READY).mean(), 0.01)
+    cycles = int(frames * (burst_length / rate + 400)) + 2000
+    trigger = data_framer_model.trigger_pattern(cycles, lead=4)
+    ready = patterns.from_env(cycles, default=READY)
+    pixel_data = rng.integers(0, 1 << data_framer_model.PIXEL_WIDTH, cycles)
+    expected = data_framer_model.data_framer(trigger, ready, pixel_data, burst_length)
+    dut._log.info(f"{cycles} cycles, frames at edges {expected['frames']}")
+    
+    # Settle the synchronizer and debounce registers with trigger low
     cocotb.start_soon(Clock(dut.pixel_clk, 10, units="ns").start())
-    await rising_edge
-    await falling_edge
     dut.pixel_data.value = 0
     dut.trigger.value = 0
     dut.m00_axis_tready.value = 0
-    await rising_edge
+    await ClockCycles(dut.pixel_clk, 4)
     await falling_edge
-    dut.trigger.value = 1
-    await ClockCycles(dut.pixel_clk, debounce_cycles+4)
-    dut.trigger.value = 0
-    await rising_edge
-    await ReadOnly()
-    
-    # dut._log.info(f"transmitting: {dut.transmitting.value}")
-    assert int(dut.transmitting.value)==1
     
-    for _ in range(180000):
-        await falling_edge
-        ready = random.randint(1,5) <= 2
-        pixel_data = random.randint(0,2**24-1)
-        dut.m00_axis_tready.value = ready
-        dut.pixel_data.value = pixel_data
-        # dut._log.info(f"Setting: ready={ready}, pixel_data={pixel_data}")
-        await rising_edge
-        await ReadOnly()
-        # drive m_ready and pixel data and wait for rising edge for them to show up
-        valid = bool(dut.m00_axis_tvalid.value)
-        ready = bool(dut.m00_axis_tready.value)
-        if valid and ready: 
-            transactions = transactions+1
-            if transactions==65536:
-                dut._log.info(f"got tlast={int(dut.m00_axis_tlast.value)} after {transactions} handshakes")
-            else:
-                assert not int(dut.m00_axis_tlast.value)
+    # The monitor's first sample is edge 0 of the stimulus, as in the model
+    outm = AXISMonitor(dut, 'm00', dut.pixel_clk, capacity=len(expected["cycle"]) + 1)
+    await drive(dut, trigger, ready, pixel_data)
     
-    assert burst_length == transactions, \
-        f"Transaction count mismatch: expected={burst_length}, actual={transactions}"
-    
-    # assert sig_out_act == sig_out_exp, "Data mismatch between input and output stream"
+    assert int(dut.transmitting.value) == expected["transmitting"][-1]
+    assert int(dut.m00_axis_tstrb.value) == (1 << len(dut.m00_axis_tstrb)) - 1, \
+        f"tstrb={dut.m00_axis_tstrb.value}, expected every byte lane"
+    lengths = data_framer_model.frame_lengths(outm.last)
+    dut._log.info(f"{outm.transactions} beats, tlast-framed lengths {lengths}")
+    assert len(lengths) > 1, "no tlast-terminated frame"
+    assert all(n == burst_length for n in lengths[:-1]), \
+        f"tlast-framed lengths {lengths[:-1]} are not all {burst_length} beats"
+    assert lengths[-1] < burst_length, f"{lengths[-1]} beats after the last tlast"
     
+    assert outm.transactions == len(expected["cycle"]), \
+        f"Transaction count mismatch: expected={len(expected['cycle'])}, actual={outm.transactions}"
+    bad = np.flatnonzero((outm.cycle != expected["cycle"]) | (outm.data != expected["data"])
+                         | (outm.last != expected["last"]))
+    assert len(bad) == 0, \
+        f"{len(bad)} beats differ from the model, first is beat {bad[0]}: expected tdata={expected['data'][bad[0]]:#08x} " \
+        f"tlast={int(expected['last'][bad[0]])} at cycle {expected['cycle'][bad[0]]}, got " \
+        f"tdata={outm.data[bad[0]]:#08x} tlast={int(outm.last[bad[0]])} at cycle {outm.cycle[bad[0]]}"
+
 def axis_runner():
-    """Simulate the AXI-stream FIR 15 using the Python runner."""
+    """Simulate data_framer (BURST_LENGTH from $DATA_FRAMER_BURST_LENGTH) using the Python runner."""
     hdl_toplevel_lang = os.getenv("HDL_TOPLEVEL_LANG", "verilog")
     sim = os.getenv("SIM", "icarus")
     proj_path = Path(__file__).resolve().parent.parent
@@ -213,15 +105,17 @@ def axis_runner():
     sources = [proj_path / "hdl" / "data_framer.sv"]
     build_test_args = ["-Wall"]
     parameters = {}
+    if os.getenv("DATA_FRAMER_BURST_LENGTH"):
+        parameters["BURST_LENGTH"] = int(os.environ["DATA_FRAMER_BURST_LENGTH"])
     
     sys.path.append(str(proj_path / "sim"))
     runner = get_runner(sim)
     hdl_toplevel = "data_framer"
     
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel,
-        always=True,
         build_args=build_test_args,
         parameters=parameters,
         timescale=('1ns', '1ps'),
@@ -233,6 +127,7 @@ def axis_runner():
         hdl_toplevel=hdl_toplevel,
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
 
@@ -10,9 +10,12 @@ from cocotb.clock import Clock
 from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnly, with_timeout
 from cocotb.utils import get_sim_time as gst
 from cocotb.runner import get_runner
-from cocotb_bus.bus import Bus
-from cocotb_bus.drivers import BusDriver
-from cocotb_bus.monitors import BusMonitor
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # repo root, for simlib
+from simlib.axis import AXISMonitor, AXISSink, AXISSource, gap_pattern
+from simlib import patterns
+from simlib.build_cache import cached_build
+from simlib.completion import until_done
+from simlib.probe import AXISProbe
 from cocotb_bus.scoreboard import Scoreboard
 import numpy as np
 import matplotlib
@@ -21,127 +24,6 @@ import matplotlib.pyplot as plt
 
 test_file = os.path.basename(__file__).replace(".py", "")
 
-class AXIS_Monitor(BusMonitor):
-    """
-    monitors axi streaming bus
-    """
-    transactions = 0  # use this variable to track good ready/valid handshakes
-    
-    def __init__(self, dut, name, clk, callback=None):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-        BusMonitor.__init__(self, dut, name, clk, callback=callback)
-        self.clock = clk
-        self.transactions = 0
-        self.dut = dut
-        
-    async def _monitor_recv(self):
-        """
-        Monitor receiver
-        """
-        rising_edge = RisingEdge(self.clock)
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly()
-        
-        while True:
-            await falling_edge
-            await read_only
-            valid = self.bus.axis_tvalid.value
-            ready = self.bus.axis_tready.value
-            last = self.bus.axis_tlast.value
-            data = self.bus.axis_tdata.value
-        
-            if valid and ready:
-                self.transactions += 1
-                thing = dict(data=data.signed_integer, last=last,
-                             name=self.name, count=self.transactions)
-                self.dut._log.info(f"{self.name}: {thing}")
-                self._recv(data.signed_integer)
-
-class AXIS_Driver(BusDriver):
-    def __init__(self, dut, name, clk, role="M"):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-        BusDriver.__init__(self, dut, name, clk)
-        self.clock = clk
-        self.dut = dut
-
-class M_AXIS_Driver(AXIS_Driver):
-    def __init__(self, dut, name, clk):
-        super().__init__(dut, name, clk)
-        self.bus.axis_tdata.value = 0
-        self.bus.axis_tstrb.value = 0xF
-        self.bus.axis_tlast.value = 0
-        self.bus.axis_tvalid.value = 0
-
-    async def _driver_send(self, value, sync=True):
-        rising_edge = RisingEdge(self.clock)
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly()
-        
-        if value.get("type") == "pause":
-            await falling_edge
-            self.bus.axis_tvalid.value = 0
-            self.bus.axis_tlast.value = 0
-            for i in range(value.get("duration", 1)):
-                await rising_edge
-        elif value.get("type") == "write_single":
-            await falling_edge
-            self.bus.axis_tvalid.value = 1
-            self.bus.axis_tlast.value = value.get("contents").get("last")
-            self.bus.axis_tdata.value = int(value.get("contents").get("data"))
-            while True:
-                await rising_edge
-                await read_only
-                if self.bus.axis_tready.value:
-                    break
-            await falling_edge
-            self.bus.axis_tvalid.value = 0
-            self.bus.axis_tlast.value = 0
-            await rising_edge
-        elif value.get("type") == "write_burst":
-            data_list = value.get("contents").get("data")   
-            for i, data in enumerate(data_list):
-                await falling_edge
-                self.bus.axis_tdata.value = int(data)
-                self.bus.axis_tlast.value = 1 if i == len(data_list) - 1 else 0
-                self.bus.axis_tvalid.value = 1
-                while True:
-                    await rising_edge
-                    await read_only
-                    if self.bus.axis_tready.value:
-                        break
-            await falling_edge
-            self.bus.axis_tvalid.value = 0
-            self.bus.axis_tlast.value = 0
-            await rising_edge
-        else:
-            pass
-
-class S_AXIS_Driver(BusDriver):
-    def __init__(self, dut, name, clk):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata', 'axis_tstrb']
-        BusDriver.__init__(self, dut, name, clk)
-        self.bus.axis_tready.value = 0
-
-    async def _driver_send(self, value, sync=True):
-        rising_edge = RisingEdge(self.clock)
-        falling_edge = FallingEdge(self.clock)
-        
-        if value.get("type") == "pause":
-            await falling_edge
-            self.bus.axis_tready.value = 0
-            for i in range(value.get("duration", 1)):
-                await rising_edge
-        elif value.get("type") == "read":
-            await falling_edge
-            self.bus.axis_tready.value = 1
-            for _ in range(value.get("duration", 1)):
-                await rising_edge
-            await falling_edge
-            self.bus.axis_tready.value = 0
-            await rising_edge
-        else:
-            pass
-
 async def reset(clk, rst, cycles_held=3, polarity=1):
     rst.value = polarity
     await ClockCycles(clk, cycles_held)
@@ -165,7 +47,13 @@ def next_state_ref(cur, insert, remove):
         return FULL
     return EMPTY
 
-async def goto_state(dut, ind, outd, target):
+def drive(dut, valid, ready, data=0):
+    """Set s00 tvalid/tdata and m00 tready; call on a falling edge, they hold until changed."""
+    dut.s00_axis_tvalid.value = valid
+    dut.s00_axis_tdata.value = data
+    dut.m00_axis_tready.value = ready
+
+async def goto_state(dut, target):
     while True:
         await ReadOnly()
         cur = int(dut.state.value)
@@ -175,21 +63,19 @@ async def goto_state(dut, ind, outd, target):
 
         if cur == EMPTY:
             # LOAD: write one beat, don't read
-            ind.append({"type":"write_single", "contents":{"data":0x1, "last":0}})
-            outd.append({"type":"pause", "duration":1})
+            valid, ready, data = 1, 0, 0x1
         elif cur == BUSY:
             if target == FULL:
                 # FILL
-                ind.append({"type":"write_single", "contents":{"data":0x2, "last":0}})
-                outd.append({"type":"pause", "duration":1})
+                valid, ready, data = 1, 0, 0x2
             else:
                 # UNLOAD
-                outd.append({"type":"read", "duration":1})
-                ind.append({"type":"pause", "duration":1})
-        elif cur == FULL:
+                valid, ready, data = 0, 1, 0
+        else:
             # FLUSH
-            outd.append({"type":"read", "duration":1})
-            ind.append({"type":"pause", "duration":1})
+            valid, ready, data = 0, 1, 0
+        await FallingEdge(dut.s00_axis_aclk)
+        drive(dut, valid, ready, data)
         await RisingEdge(dut.s00_axis_aclk)
 
 @cocotb.test()
@@ -199,11 +85,12 @@ async def test_skid_buffer_transitions(dut):
     falling_edge = FallingEdge(dut.s00_axis_aclk)
     readonly = ReadOnly()
     
-    # Create monitors and drivers
-    inm = AXIS_Monitor(dut, 's00', dut.s00_axis_aclk)
-    outm = AXIS_Monitor(dut, 'm00', dut.s00_axis_aclk)
-    ind = M_AXIS_Driver(dut, 's00', dut.s00_axis_aclk)
-    outd = S_AXIS_Driver(dut, 'm00', dut.s00_axis_aclk)
+    # Create monitors; both sides are driven directly, one cycle at a time
+    inm = AXISMonitor(dut, 's00', dut.s00_axis_aclk)
+    outm = AXISMonitor(dut, 'm00', dut.s00_axis_aclk)
+    dut.s00_axis_tlast.value = 0
+    dut.s00_axis_tstrb.value = 0xF
+    drive(dut, 0, 0)
     
     # Start clock and reset
     cocotb.start_soon(Clock(dut.s00_axis_aclk, 10, units="ns").start())
@@ -214,9 +101,8 @@ async def test_skid_buffer_transitions(dut):
 
     async def idle_cycle():
         """Drive both interfaces idle for one beat so ready/valid settle."""
-        ind.append({"type":"pause", "duration":1})
-        outd.append({"type":"pause", "duration":1})
         await falling_edge
+        drive(dut, 0, 0)
         await rising_edge
         await readonly
     
@@ -224,17 +110,16 @@ async def test_skid_buffer_transitions(dut):
         
         for (sv, mr) in combos:
             dut._log.info(f"\n\nDRIVING TO: {"EMPTY" if not start else "BUSY" if start==1 else "FULL"}")
-            await goto_state(dut, ind, outd, start) # go to starting state
+            await goto_state(dut, start) # go to starting state
             await idle_cycle()
             cur = int(dut.state.value)
             dut._log.info(f"starting state: {cur}")
             assert start == cur
             
-            outd.append({"type":"read", "duration":1} if mr else {"type":"pause", "duration":1})
-            ind.append({"type":"write_single", "contents":{"data":seq & 0xFFFFFFFF, "last":0}} if sv else {"type":"pause", "duration":1})  
             dut._log.info(f"Trying: s_valid={sv}, m_ready={mr}")
 
             await falling_edge
+            drive(dut, sv, mr, seq & 0xFFFFFFFF)
             await readonly
 
             state_sample = int(dut.state.value)
@@ -277,12 +162,10 @@ async def test_skid_buffer_transitions(dut):
             await idle_cycle()
             # ind.append({"type":"pause", "duration":1})
             
-    await goto_state(dut, ind, outd, EMPTY)
+    await goto_state(dut, EMPTY)
     await rising_edge
     await readonly
         
-    ind.append({'type':'pause', "duration":2})
-    outd.append({'type':'pause', "duration":2})
     assert inm.transactions == outm.transactions, \
         f"in/out transaction count mismatch. i  n transactions: {inm.transactions}, out: {outm.transactions}"    
     
@@ -293,23 +176,12 @@ async def test_skid_buffer_latency(dut):
     falling_edge = FallingEdge(dut.s00_axis_aclk)
     readonly = ReadOnly()
     
-    # Create monitors and drivers
-    sig_out_exp = []
-    sig_out_act = []
-    in_cycles = []
-    out_cycles = []
-    clk_period = 10  # ns, matches Clock configuration
-
-    def make_cb(store, cycle_store):
-        def _cb(value):
-            store.append(value)
-            cycle_store.append(int(gst(units="ns") // clk_period))
-        return _cb
-
-    inm = AXIS_Monitor(dut, 's00', dut.s00_axis_aclk, callback=make_cb(sig_out_exp, in_cycles))
-    outm = AXIS_Monitor(dut, 'm00', dut.s00_axis_aclk, callback=make_cb(sig_out_act, out_cycles))
-    ind = M_AXIS_Driver(dut, 's00', dut.s00_axis_aclk)
-    outd = S_AXIS_Driver(dut, 'm00', dut.s00_axis_aclk)
+    # Create monitors and drivers; the probe times every beat from s00 to m00
+    inm = AXISMonitor(dut, 's00', dut.s00_axis_aclk)
+    outm = AXISMonitor(dut, 'm00', dut.s00_axis_aclk)
+    probe = AXISProbe(dut, dut.s00_axis_aclk)
+    ind = AXISSource(dut, 's00', dut.s00_axis_aclk)
+    outd = AXISSink(dut, 'm00', dut.s00_axis_aclk)
     
     # Start clock and reset
     cocotb.start_soon(Clock(dut.s00_axis_aclk, 10, units="ns").start())
@@ -317,23 +189,20 @@ async def test_skid_buffer_latency(dut):
     
     data = list(range(50))
     
-    ind.append({"type": "write_burst", "contents": {"data": data}})
-    ind.append({"type": "pause", "duration": 2})
-    outd.append({"type": "read", "duration": len(data) + 5})
+    ind.start(data)
+    outd.hold(1, len(data) + 5)
 
-    await ClockCycles(dut.s00_axis_aclk, 100)
+    await until_done(outm, beats=len(data), timeout=100, budget=100, log=dut._log)
     await readonly
-    # while outm.transactions < len(data):
-    #     await rising_edge
-    #     await readonly
     
     assert inm.transactions == outm.transactions, \
         f"Transaction count mismatch: in={inm.transactions}, out={outm.transactions}"
     
-    assert sig_out_act == sig_out_exp, "Data mismatch between input and output stream"
+    assert (outm.data == inm.data).all(), "Data mismatch between input and output stream"
 
-    latencies = [out_cycles[i] - in_cycles[i] for i in range(len(data))]
-    assert all(lat in (0, 1) for lat in latencies), f"Unexpected latency values: {latencies}"
+    perf = probe.report(dut._log)
+    assert set(perf["latency"]["histogram"]) <= {0, 1}, f"Unexpected latency values: {perf['latency']['histogram']}"
+    assert perf["max_occupancy"] <= 2, f"skid buffer held {perf['max_occupancy']} beats"
 
 @cocotb.test()
 async def test_skid_buffer_backpressure(dut):
@@ -344,33 +213,28 @@ async def test_skid_buffer_backpressure(dut):
     
     sig_out_exp = []
     sig_out_act = []
-    inm = AXIS_Monitor(dut, 's00', dut.s00_axis_aclk, callback=lambda x: sig_out_exp.append(x))
-    outm = AXIS_Monitor(dut, 'm00', dut.s00_axis_aclk, callback=lambda x: sig_out_act.append(x))
-    ind = M_AXIS_Driver(dut, 's00', dut.s00_axis_aclk)
-    outd = S_AXIS_Driver(dut, 'm00', dut.s00_axis_aclk)
+    inm = AXISMonitor(dut, 's00', dut.s00_axis_aclk, callback=lambda x: sig_out_exp.append(x))
+    outm = AXISMonitor(dut, 'm00', dut.s00_axis_aclk, callback=lambda x: sig_out_act.append(x))
+    ind = AXISSource(dut, 's00', dut.s00_axis_aclk)
+    outd = AXISSink(dut, 'm00', dut.s00_axis_aclk)
+    probe = AXISProbe(dut, dut.s00_axis_aclk)
     
     cocotb.start_soon(Clock(dut.s00_axis_aclk, 10, units="ns").start())
     await reset(dut.s00_axis_aclk, dut.s00_axis_aresetn, 2, 0)
     
-    for data in range(0,50):
-        data = {'type': 'write_single', "contents": {"data": data & 0xFFFFFFFF, "last": 0}}
-        ind.append(data)
-        pause = {'type': 'pause', 'duration': random.randint(1, 6)}
-        ind.append(pause)
-    ind.append({'type': 'write_single', "contents": {"data": 50 & 0xFFFFFFFF, "last": 1}})
-    ind.append(pause)
+    # 51 beats, each followed by 1-6 idle cycles; tlast rides on the final one
+    gaps = [random.randint(1, 6) for _ in range(51)]
+    ind.start(np.arange(51), valid_pattern=gap_pattern(gaps))
     
-    for _ in range(50//2):  # Create backpressure every ~10 samples
-        outd.append({'type': 'read', "duration": random.randint(1, 10)})
-        outd.append({'type': 'pause', "duration": random.randint(1, 10)})
+    outd.start(patterns.from_env(275))  # ~25 read/pause pairs of 1-10 cycles, then always ready
         
-    while outm.transactions < 51:
-        outd.append({'type': 'read', "duration": 1})
-        await rising_edge
-        await readonly
+    await until_done(outm, beats=51, timeout=2000, log=dut._log)
+    await readonly
     
     assert inm.transactions == outm.transactions or inm.transactions-outm.transactions==1, \
         f"Transaction count mismatch: in={inm.transactions}, out={outm.transactions}"
+    perf = probe.report(dut._log)
+    assert perf["max_occupancy"] <= 2, f"skid buffer held {perf['max_occupancy']} beats"
     
 def axis_runner():
     """Simulate the AXI-stream FIR 15 using the Python runner."""
@@ -388,10 +252,10 @@ def axis_runner():
     runner = get_runner(sim)
     hdl_toplevel = "axis_skid_buffer"
     
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
         hdl_toplevel=hdl_toplevel,
-        always=True,
         build_args=build_test_args,
         parameters=parameters,
         timescale=('1ns', '1ps'),
@@ -403,6 +267,7 @@ def axis_runner():
         hdl_toplevel=hdl_toplevel,
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
 
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Parallel threshold/SNR sweep of the ADS-B receiver (top.sv).
+
+top is compiled once (or taken from the build cache), then every sweep point
+runs test_sweep_point from test_adsb_decode.py in its own simulator process
+and test directory, one process per core. Each point writes the squitters top
+produced to a JSON file, which is scored here into one table:
+
+    detection rate      sent squitters that came out intact / squitters sent
+    false-trigger rate  outputs that are not a sent squitter / outputs
+    CRC-pass rate       outputs without x bits and with valid parity / outputs
+    corrected           outputs that pass CRC after a 1 or 2 bit repair
+    recovered           sent squitters that only came out right after repair
+
+Captures without ground truth have no detection rate, and their false
+triggers are the outputs that fail CRC.
+
+Example:
+    ./adsb_sweep.py --preamble-threshold 6000 8000 10000 --decoder-threshold 30 40 --snr 8 12 16 20
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+proj_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(proj_path / "sim" / "model"))
+sys.path.append(str(proj_path / "hdl"))
+sys.path.append(str(proj_path / "sim"))
+import adsb_traffic
+import crc24
+import test_adsb_decode
+from cocotb.runner import get_runner
+
+SWEEP_DIR = proj_path / "sim" / "sim_build" / "sweep"  # one test directory per point
+COLUMNS = ["preamble_detector_threshold", "decoder_threshold", "stimulus", "sent", "outputs",
+           "detection_rate", "false_trigger_rate", "crc_pass_rate", "corrected", "recovered",
+           "model_match", "sim_cycles", "skipped_cycles", "wall_time"]
+
+
+def _stimulus_name(point):
+    if point.get("capture"):
+        return Path(point["capture"]).name
+    return f"snr {point['traffic']['snr_db']:g} dB"
+
+
+def sweep_points(preamble_thresholds, decoder_thresholds, snrs=(), captures=(), traffic=None,
+                 windowed=False):
+    """
+    Grid of sweep points: every threshold pair against every stimulus.
+
+    Stimuli are the given captures, or else one synthetic corpus per SNR made
+    with adsb_traffic.cached_traffic(**traffic, snr_db=snr). With windowed,
+    each point only simulates the windows around its triggers (adsb_windows).
+    """
+    if captures:
+        stimuli = [dict(capture=str(Path(c).resolve())) for c in captures]
+    else:
+        stimuli = [dict(traffic=dict(traffic or {}, snr_db=float(snr))) for snr in snrs]
+    return [dict(stimulus, preamble_detector_threshold=int(p), decoder_threshold=int(d), windowed=windowed)
+            for p, d, stimulus in itertools.product(preamble_thresholds, decoder_thresholds, stimuli)]
+
+
+def score(received, truth=None):
+    """Detection, false-trigger and CRC-pass rates of the binstrs top produced."""
+    intact = [int(s, 2) for s in received if not s.strip("01")]
+    crc_pass = int(crc24.crc_ok(intact).sum())
+    repaired, flipped = crc24.correct(intact)
+    outputs = len(received)
+    row = dict(outputs=outputs, crc_pass_rate=crc_pass / outputs if outputs else None,
+               corrected=int((flipped > 0).sum()))
+    if truth is None:
+        row.update(sent=None, detection_rate=None, recovered=None,
+                   false_trigger_rate=(outputs - crc_pass) / outputs if outputs else None)
+        return row
+    truth = {int(t, 16) for t in truth}
+    hits = sum(s in truth for s in intact)
+    row.update(sent=len(truth), detection_rate=len(truth & set(intact)) / len(truth) if truth else None,
+               recovered=len(truth & set(repaired) - set(intact)),
+               false_trigger_rate=(outputs - hits) / outputs if outputs else None)
+    return row
+
+
+def run_point(index, point, build_dir):
+    """Simulate one sweep point against the shared build and score it."""
+    test_dir = SWEEP_DIR / f"point_{index:03d}"
+    test_dir.mkdir(parents=True, exist_ok=True)
+    result_file = test_dir / "sweep_point.json"
+    result_file.unlink(missing_ok=True)
+    runner = get_runner(os.getenv("SIM", "icarus"))
+    start = time.perf_counter()
+    try:
+        runner.test(
+            hdl_toplevel="top",
+            test_module=test_adsb_decode.test_file,
+            testcase="test_sweep_point",
+            build_dir=build_dir,
+            test_dir=test_dir,
+            extra_env=dict(ADSB_SWEEP_POINT=json.dumps(point), ADSB_SWEEP_RESULT=str(result_file)),
+            log_file=test_dir / "sim.log",
+            waves=False
+        )
+    except SystemExit as e:  # the runner exits on simulator errors
+        return dict(point, error=str(e), wall_time=time.perf_counter() - start)
+    wall_time = time.perf_counter() - start
+    if not result_file.exists():
+        return dict(point, error=f"no result, see {test_dir / 'sim.log'}", wall_time=wall_time)
+    with open(result_file) as f:
+        result = json.load(f)
+    row = dict(point, **score(result["received"], result["truth"]))
+    row.update(model_match=result["received"] == result["expected"], sim_cycles=result["sim_cycles"],
+               skipped_cycles=result["skipped_cycles"], wall_time=wall_time)
+    return row
+
+
+def sweep(points, workers=None):
+    """
+    Build top once, then run every point on a pool of `workers` processes
+    (default: one per CPU). Returns the scored rows in the order of `points`.
+    """
+    # Generate synthetic corpora up front so workers only ever read the cache.
+    for point in points:
+        if "traffic" in point:
+            adsb_traffic.cached_traffic(**point["traffic"])
+    build_dir = test_adsb_decode.adsb_build(build_dir=SWEEP_DIR, waves=False).build_dir
+    rows = [None] * len(points)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(run_point, i, p, build_dir): i for i, p in enumerate(points)}
+        for future in as_completed(futures):
+            i = futures[future]
+            rows[i] = future.result()
+            print(f"INFO: sweep point {i + 1}/{len(points)} done in {rows[i]['wall_time']:.1f} s")
+    return rows
+
+
+def _cell(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def format_table(rows):
+    """Fixed-width text table of scored rows."""
+    header = ["preamble_thr", "decoder_thr", "stimulus", "sent", "outputs",
+              "detect", "false_trig", "crc_pass", "corrected", "recovered", "model", "sim_cycles", "wall_s"]
+    lines = []
+    for row in rows:
+        line = [_cell(row["preamble_detector_threshold"]), _cell(row["decoder_threshold"]), _stimulus_name(row)]
+        if "error" in row:
+            line.append("ERROR: " + row["error"])
+        else:
+            line += [_cell(row["sent"]), _cell(row["outputs"]), _cell(row["detection_rate"]),
+                     _cell(row["false_trigger_rate"]), _cell(row["crc_pass_rate"]),
+                     _cell(row["corrected"]), _cell(row["recovered"]),
+                     "ok" if row["model_match"] else "MISMATCH", _cell(row["sim_cycles"]),
+                     f"{row['wall_time']:.1f}"]
+        lines.append(line)
+    widths = [max(len(line[i]) for line in [header] + lines if len(line) == len(header))
+              for i in range(len(header))]
+    return "\n".join("  ".join(c.rjust(w) for c, w in zip(line, widths)) for line in [header] + lines)
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS + ["error"], extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, stimulus=_stimulus_name(row)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--preamble-threshold", type=int, nargs="+", default=[8000])
+    parser.add_argument("--decoder-threshold", type=int, nargs="+", default=[40])
+    parser.add_argument("--snr", type=float, nargs="+", default=[20.0],
+                        help="SNRs (dB) of the synthetic corpora; ignored with --capture")
+    parser.add_argument("--capture", nargs="+", default=[], help="IQ captures to sweep instead of synthetic traffic")
+    parser.add_argument("--squitters", type=int, default=12)
+    parser.add_argument("--samples", type=int, default=1 << 17)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--windowed", action="store_true",
+                        help="simulate only the windows around triggers (see adsb_windows.py)")
+    parser.add_argument("--workers", type=int, default=None, help="simulator processes (default: one per CPU)")
+    parser.add_argument("--csv", help="also write the table to this CSV file")
+    args = parser.parse_args()
+
+    traffic = dict(num_squitters=args.squitters, num_samples=args.samples, seed=args.seed)
+    points = sweep_points(args.preamble_threshold, args.decoder_threshold, args.snr, args.capture, traffic,
+                          args.windowed)
+    rows = sweep(points, workers=args.workers)
+    print(format_table(rows))
+    if args.csv:
+        write_csv(rows, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Synthetic 64 MSPS ADS-B traffic for stressing preamble_detector and adsb_decoder.
+
+generate_traffic() returns an IQ capture in the same format as
+adsb_squitters_fake_50dbm_64MSPS_iq.np (complex128 holding int16 values) plus
+the ground-truth list of DF17 squitters in it. Squitters carry a valid CRC-24,
+random or given ICAOs and payloads, and land at random times (optionally
+overlapping) with per-message SNR, carrier offset and phase noise.
+
+cached_traffic() keeps generated corpora on disk keyed by their parameters, so
+regressions that reuse a corpus only pay the generation cost once.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+import adsb_model
+import crc24
+
+GENERATOR_VERSION = 1  # bump when the synthesis changes so old cache entries are ignored
+SAMPLE_RATE = adsb_model.SAMPLE_RATE
+SAMPLES_PER_BIT = 2 * adsb_model.BIT_LENGTH  # 1 us data bit = 64 samples
+PREAMBLE_SAMPLES = 512
+FRAME_SAMPLES = PREAMBLE_SAMPLES + adsb_model.SQUITTER_LENGTH * SAMPLES_PER_BIT
+
+DEFAULT_CACHE = Path(__file__).resolve().parent / "corpus_cache"
+
+
+def make_squitter(icao, me, ca=5):
+    """112 bit DF17 extended squitter: DF | CA | ICAO | ME | PI."""
+    head = (17 << 83) | ((ca & 0x7) << 80) | ((icao & 0xFFFFFF) << 56) | (me & ((1 << 56) - 1))
+    return (head << 24) | crc24.parity(head)
+
+
+def random_squitters(n, rng, icaos=None):
+    """n DF17 squitters with random payloads; ICAOs drawn from `icaos` or at random."""
+    if icaos is None:
+        icao = rng.integers(0, 1 << 24, n)
+    else:
+        icao = rng.choice(np.asarray(icaos, dtype=np.int64), n)
+    me_hi = rng.integers(0, 1 << 28, n)
+    me_lo = rng.integers(0, 1 << 28, n)
+    return [make_squitter(int(a), (int(h) << 28) | int(l)) for a, h, l in zip(icao, me_hi, me_lo)]
+
+
+def modulate(squitter):
+    """0/1 pulse envelope of one frame (preamble + 112 PPM bits) at 64 MSPS."""
+    bits = np.array([(squitter >> (adsb_model.SQUITTER_LENGTH - 1 - i)) & 1
+                     for i in range(adsb_model.SQUITTER_LENGTH)], dtype=np.int8)
+    half = adsb_model.BIT_LENGTH
+    # bit 1 -> pulse in the first half, bit 0 -> pulse in the second half
+    chips = np.stack((bits, 1 - bits), axis=1).repeat(half, axis=1).ravel()
+    return np.concatenate((np.asarray(adsb_model.preamble_coeffs(SAMPLE_RATE), dtype=np.int8), chips))
+
+
+def _arrivals(n, num_samples, overlap, min_spacing, rng):
+    span = num_samples - FRAME_SAMPLES
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if overlap:
+        if span < 0:
+            raise ValueError("capture is shorter than one frame")
+        return np.sort(rng.integers(0, span + 1, n))
+    # Spread the leftover slack randomly between frames that are min_spacing apart.
+    slack = span - (n - 1) * min_spacing
+    if slack < 0:
+        raise ValueError(f"{n} non-overlapping squitters need at least "
+                         f"{(n - 1) * min_spacing + FRAME_SAMPLES} samples")
+    return np.sort(rng.integers(0, slack + 1, n)) + np.arange(n) * min_spacing
+
+
+def generate_traffic(num_squitters, num_samples, snr_db=25.0, snr_spread_db=0.0,
+                     noise_rms=3.5, carrier_offset=0.0, phase_noise=0.0, overlap=True,
+                     min_spacing=None, icaos=None, seed=0):
+    """
+    Synthesize a capture of num_samples IQ samples containing num_squitters frames.
+
+    snr_db: peak pulse power over complex noise power (2 * noise_rms**2), per
+        message drawn uniformly from snr_db +/- snr_spread_db.
+    noise_rms: standard deviation of each of I and Q noise, in ADC codes.
+    carrier_offset: residual carrier frequency in Hz (each message gets a random
+        initial phase).
+    phase_noise: std-dev in radians of the per-sample phase random walk.
+    overlap: allow frames to collide; otherwise frames start at least
+        min_spacing samples apart. The default leaves room for the decoder to
+        retrigger on the tail of one frame and still be idle for the next.
+    icaos: optional pool of aircraft addresses to draw from.
+
+    Returns (iq, messages). iq is complex128 rounded and clipped to int16, and
+    messages is a list of dicts sorted by start sample with the squitter
+    `data`, `icao`, `start` (first preamble sample), `snr_db` and `amplitude`.
+    """
+    rng = np.random.default_rng(seed)
+    if min_spacing is None:
+        min_spacing = 2 * FRAME_SAMPLES + PREAMBLE_SAMPLES
+    squitters = random_squitters(num_squitters, rng, icaos)
+    starts = _arrivals(num_squitters, num_samples, overlap, min_spacing, rng)
+    snrs = snr_db + rng.uniform(-snr_spread_db, snr_spread_db, num_squitters)
+    noise_power = 2 * noise_rms ** 2
+    amplitudes = np.sqrt(noise_power * 10 ** (snrs / 10))
+
+    t = np.arange(FRAME_SAMPLES)
+    iq = np.zeros(num_samples, dtype=np.complex128)
+    for squitter, start, amplitude in zip(squitters, starts, amplitudes):
+        phase = rng.uniform(0, 2 * np.pi) + 2 * np.pi * carrier_offset / SAMPLE_RATE * t
+        if phase_noise:
+            phase = phase + np.cumsum(rng.normal(0, phase_noise, FRAME_SAMPLES))
+        iq[start:start + FRAME_SAMPLES] += amplitude * modulate(squitter) * np.exp(1j * phase)
+
+    iq += rng.normal(0, noise_rms, num_samples) + 1j * rng.normal(0, noise_rms, num_samples)
+    iq = np.clip(np.round(iq.real), -32768, 32767) + 1j * np.clip(np.round(iq.imag), -32768, 32767)
+
+    messages = [dict(data=squitter, icao=(squitter >> 80) & 0xFFFFFF, start=int(start),
+                     snr_db=float(snr), amplitude=float(amplitude))
+                for squitter, start, snr, amplitude in zip(squitters, starts, snrs, amplitudes)]
+    return iq, messages
+
+
+def _cache_key(params):
+    blob = json.dumps(dict(params, version=GENERATOR_VERSION), sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def cached_traffic(num_squitters, num_samples, cache_dir=None, **params):
+    """
+    generate_traffic() with an on-disk cache.
+
+    Corpora live in cache_dir (default $ADSB_CORPUS_CACHE or sim/corpus_cache)
+    as an .npy capture plus a JSON ground-truth file per parameter set. The IQ
+    comes back memory-mapped, so large corpora are not read in full.
+    """
+    cache_dir = Path(cache_dir or os.getenv("ADSB_CORPUS_CACHE", DEFAULT_CACHE))
+    key = _cache_key(dict(params, num_squitters=num_squitters, num_samples=num_samples))
+    iq_path = cache_dir / f"traffic_{key}_iq.npy"
+    truth_path = cache_dir / f"traffic_{key}_truth.json"
+    if iq_path.exists() and truth_path.exists():
+        with open(truth_path) as f:
+            messages = json.load(f)
+        for m in messages:
+            m["data"] = int(m["data"], 16)
+        return np.load(iq_path, mmap_mode="r"), messages
+
+    iq, messages = generate_traffic(num_squitters, num_samples, **params)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write to temporary names first so parallel workers never see half a corpus.
+    tmp_iq = iq_path.with_name(f"{iq_path.stem}.{os.getpid()}.tmp.npy")
+    tmp_truth = truth_path.with_name(f"{truth_path.name}.{os.getpid()}.tmp")
+    np.save(tmp_iq, iq)
+    with open(tmp_truth, "w") as f:
+        json.dump([dict(m, data=f"{m['data']:028x}") for m in messages], f, indent=1)
+    os.replace(tmp_iq, iq_path)
+    os.replace(tmp_truth, truth_path)
+    return iq, messages
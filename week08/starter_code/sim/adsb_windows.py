@@ -0,0 +1,82 @@
+"""
+Windowed simulation plans for sparse ADS-B captures.
+
+Most of a real 1090 MHz capture is noise, and pushing it through icarus only
+shows the decoder sitting in IDLE. plan_windows() scans the capture with the
+bit-exact model in adsb_model, finds every sample where top would trigger,
+and keeps only a window around each of those:
+
+    [centre - pre_roll, centre + TRIGGER_DELAY + SQUITTER_CYCLES + TAIL)
+
+axis_fir has no reset on its taps, so a reset cannot clear the pipeline
+between windows. Each window is flushed instead: it starts pre_roll samples
+early, so the lowpass, cordic and matched filter are refilled with the real
+history of the capture by the time the first candidate reaches the detector.
+The testbench holds preamble_detector_threshold at its maximum during that
+pre-roll (see test_adsb_decode.run_windows), so the mix of old and new
+samples cannot trigger the decoder.
+
+Windows that overlap are merged. Skipped samples never hold a trigger, so
+the decoder is idle there, and the windowed run produces the same squitters
+as a full run.
+"""
+import numpy as np
+
+import adsb_model
+
+TAIL = 4  # samples fed after the last decoded bit, so tvalid is seen with data still flowing
+THRESHOLD_MASK = 0xFFFFFFFF  # preamble_detector_threshold that no matched filter output reaches
+
+
+def pre_roll(lowpass_coeffs, preamble_coeffs):
+    """Samples needed to refill the pipeline: both FIRs plus the cordic, with a little slack."""
+    return len(lowpass_coeffs) + len(preamble_coeffs) + adsb_model.CORDIC_LATENCY + 4
+
+
+def plan_windows(iq, lowpass_coeffs, preamble_coeffs, preamble_detector_threshold,
+                 decoder_threshold, margin=None):
+    """
+    Pick the sample windows worth simulating in a capture.
+
+    By default the candidates are the exact triggers the decoder acts on.
+    With margin (e.g. 0.8), every local maximum of the matched filter above
+    margin * preamble_detector_threshold is a candidate. This gives a
+    conservative superset for captures where the scan is only a rough guide.
+
+    Returns a dict with:
+        windows    list of dict(start, stop, lead), where lead is the offset
+                   from start to the first candidate centre
+        squitters  model squitters whose window fits in the capture
+        truncated  candidates dropped because their frame runs off the end
+        simulated  samples inside windows
+        skipped    samples outside them
+        model      the full adsb_model result
+    """
+    model = adsb_model.adsb_model(iq, lowpass_coeffs, preamble_coeffs,
+                                  preamble_detector_threshold, decoder_threshold)
+    n = len(model["magnitude"])
+    if margin is None:
+        centres = [s["trigger_cycle"] - adsb_model.TRIGGER_DELAY for s in model["squitters"]]
+    else:
+        threshold = int(margin * preamble_detector_threshold)
+        centres = np.flatnonzero(adsb_model.preamble_detector(model["matched"], threshold)).tolist()
+
+    fill = pre_roll(lowpass_coeffs, preamble_coeffs)
+    span = adsb_model.TRIGGER_DELAY + adsb_model.SQUITTER_CYCLES + TAIL
+    windows = []
+    truncated = 0
+    for c in centres:
+        if c + span > n:
+            truncated += 1
+            continue
+        start = max(0, c - fill)
+        if windows and start <= windows[-1]["stop"]:
+            windows[-1]["stop"] = c + span
+        else:
+            windows.append(dict(start=start, stop=c + span, lead=c - start))
+
+    squitters = [s for s in model["squitters"]
+                 if any(w["start"] <= s["trigger_cycle"] - adsb_model.TRIGGER_DELAY < w["stop"] for w in windows)]
+    simulated = sum(w["stop"] - w["start"] for w in windows)
+    return dict(windows=windows, squitters=squitters, truncated=truncated,
+                simulated=simulated, skipped=n - simulated, model=model)
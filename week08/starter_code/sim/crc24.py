@@ -0,0 +1,124 @@
+"""
+Mode S CRC-24: parity, batch checking and 1-2 bit error correction.
+
+Everything is byte-table driven. The batch functions take many 112 bit
+squitters at once, either as Python ints or as an (N, 14) uint8 array of
+big-endian bytes, and run one vectorized table lookup per message byte
+instead of a Python loop per message bit.
+
+The syndrome (computed parity XOR received parity) depends only on which bits
+were flipped, not on the message. A table of the syndromes of every 1 and 2 bit
+error pattern over the 112 bits therefore turns correction into a lookup.
+"""
+import itertools
+
+import numpy as np
+
+POLY = 0xFFF409  # Mode S generator polynomial (without the x^24 term)
+SQUITTER_BYTES = 14
+DATA_BYTES = 11  # 88 bits covered by the 24 parity bits
+
+
+def _make_table():
+    table = np.zeros(256, dtype=np.uint32)
+    for byte in range(256):
+        reg = byte << 16
+        for _ in range(8):
+            reg = (reg << 1) ^ (POLY if reg & 0x800000 else 0)
+        table[byte] = reg & 0xFFFFFF
+    return table
+
+
+TABLE = _make_table()
+_TABLE = TABLE.tolist()
+
+
+def parity(data, nbits=88):
+    """CRC-24 of the nbits (multiple of 8) data bits of an int, MSB first."""
+    reg = 0
+    for byte in data.to_bytes(nbits // 8, "big"):
+        reg = ((reg << 8) & 0xFFFFFF) ^ _TABLE[(reg >> 16) ^ byte]
+    return reg
+
+
+def to_bytes(squitters):
+    """(N, 14) uint8 big-endian view of squitters given as ints or a uint8 array."""
+    if isinstance(squitters, np.ndarray) and squitters.dtype == np.uint8:
+        return squitters.reshape(-1, SQUITTER_BYTES)
+    blob = b"".join(int(s).to_bytes(SQUITTER_BYTES, "big") for s in squitters)
+    return np.frombuffer(blob, dtype=np.uint8).reshape(-1, SQUITTER_BYTES)
+
+
+def from_bytes(msgs):
+    """Inverse of to_bytes: list of 112 bit ints."""
+    raw = np.ascontiguousarray(msgs, dtype=np.uint8).tobytes()
+    return [int.from_bytes(raw[i:i + SQUITTER_BYTES], "big") for i in range(0, len(raw), SQUITTER_BYTES)]
+
+
+def from_dma(buffers):
+    """
+    Squitter bytes from the 16 byte DMA buffers the ADSB notebook reads.
+
+    The decoder's 112 bit tdata lands little-endian in bytes 0..13 of each buffer.
+    """
+    buffers = np.asarray(buffers, dtype=np.uint8).reshape(-1, 16)
+    return np.ascontiguousarray(buffers[:, SQUITTER_BYTES - 1::-1])
+
+
+def syndromes(squitters):
+    """uint32 syndrome per squitter; 0 means the parity checks out."""
+    msgs = to_bytes(squitters)
+    reg = np.zeros(len(msgs), dtype=np.uint32)
+    for k in range(DATA_BYTES):
+        reg = ((reg << 8) & 0xFFFFFF) ^ TABLE[(reg >> 16) ^ msgs[:, k]]
+    received = (msgs[:, 11].astype(np.uint32) << 16) | (msgs[:, 12].astype(np.uint32) << 8) | msgs[:, 13]
+    return reg ^ received
+
+
+def crc_ok(squitters):
+    """Bool array: which squitters have a valid CRC."""
+    return syndromes(squitters) == 0
+
+
+def _make_syndrome_table():
+    bits = 8 * SQUITTER_BYTES
+    single = np.zeros((bits, SQUITTER_BYTES), dtype=np.uint8)
+    single[np.arange(bits), np.arange(bits) // 8] = 0x80 >> (np.arange(bits) % 8)
+    pairs = np.array(list(itertools.combinations(range(bits), 2)))
+    masks = np.concatenate((single, single[pairs[:, 0]] | single[pairs[:, 1]]))
+    weights = np.concatenate((np.ones(bits, dtype=np.int8), np.full(len(pairs), 2, dtype=np.int8)))
+    syn = syndromes(masks)
+    # A syndrome shared by two patterns cannot be corrected: drop every copy of it.
+    order = np.argsort(syn, kind="stable")
+    syn, masks, weights = syn[order], masks[order], weights[order]
+    unique = np.ones(len(syn), dtype=bool)
+    dup = syn[1:] == syn[:-1]
+    unique[1:] &= ~dup
+    unique[:-1] &= ~dup
+    return syn[unique], masks[unique], weights[unique]
+
+
+# Sorted syndromes of all uniquely correctable 1 and 2 bit errors, the byte
+# masks that undo them, and the number of bits each one flips.
+ERROR_SYNDROMES, ERROR_MASKS, ERROR_WEIGHTS = _make_syndrome_table()
+
+
+def correct(squitters, max_errors=2):
+    """
+    Repair squitters with up to max_errors (1 or 2) flipped bits.
+
+    Returns (fixed, flipped): fixed has the same form as the input (a uint8
+    array for uint8 input, else a list of ints), and flipped holds the number of
+    bits corrected per squitter, or -1 where the CRC fails and no 1..max_errors
+    bit pattern explains it (those squitters are returned unchanged).
+    """
+    msgs = to_bytes(squitters)
+    syn = syndromes(msgs)
+    idx = np.searchsorted(ERROR_SYNDROMES, syn)
+    idx[idx == len(ERROR_SYNDROMES)] = 0
+    found = (ERROR_SYNDROMES[idx] == syn) & (ERROR_WEIGHTS[idx] <= max_errors)
+    flipped = np.where(syn == 0, 0, np.where(found, ERROR_WEIGHTS[idx], -1)).astype(np.int8)
+    fixed = msgs ^ np.where(found[:, None], ERROR_MASKS[idx], 0).astype(np.uint8)
+    if isinstance(squitters, np.ndarray) and squitters.dtype == np.uint8:
+        return fixed, flipped
+    return from_bytes(fixed), flipped
@@ -0,0 +1,199 @@
+"""
+Bit-exact NumPy model of the ADS-B pipeline in hdl/top.sv.
+
+Every stage works on whole arrays at once (no per-sample Python), so the
+expected squitters for a capture of millions of samples take seconds rather
+than a full icarus run. Stages are indexed by input sample number k; the
+decoder FSM is indexed by clock edge t, where edge 0 is the rising edge that
+clocks in sample 0 (one sample per cycle, tvalid held high, as test_a drives it).
+"""
+import numpy as np
+
+import fir_engine
+from fir_engine import wrap
+
+SAMPLE_RATE = 64e6
+SQUITTER_LENGTH = 112
+BIT_LENGTH = 32  # 0.5 us physical bit at 64 MSPS
+
+# Pipeline latencies (in clock edges) of the RTL, see top.sv.
+CORDIC_LATENCY = 17  # lowpass output -> cordic magnitude (stage 0 + 16 iterations)
+DECODER_MAG_DELAY = CORDIC_LATENCY + 1  # decoder at edge t sees magnitude[t-18]
+TRIGGER_DELAY = DECODER_MAG_DELAY + 3  # trigger at edge t is centred on matched[t-21]
+TRIGGER_SAMPLE_OFFSET = 3  # adsb_decoder starts sample_counter at 3
+SQUITTER_CYCLES = 14 + 64 * (SQUITTER_LENGTH - 1) + 32  # trigger edge -> tvalid edge
+
+CORDIC_ITERATIONS = 16
+CORDIC_GAIN = 39796
+CORDIC_FIXED_WIDTH = 33  # 16 data bits + 16 fraction bits + 1
+
+
+def preamble_coeffs(sample_rate=SAMPLE_RATE):
+    """0/1 matched-filter taps for the 8 us ADS-B preamble (pulses at 0, 1, 3.5, 4.5 us)"""
+    period = 1 / sample_rate
+    preamble = []
+    preamble += [1] * int(0.5e-6 / period)
+    preamble += [0] * int(0.5e-6 / period)
+    preamble += [1] * int(0.5e-6 / period)
+    preamble += [0] * int(2e-6 / period)
+    preamble += [1] * int(0.5e-6 / period)
+    preamble += [0] * int(0.5e-6 / period)
+    preamble += [1] * int(0.5e-6 / period)
+    preamble += [0] * int(3e-6 / period)
+    assert len(preamble) == int(8e-6 / period), "Preamble generation failed"
+    return preamble
+
+
+def axis_fir(x, coeffs):
+    """
+    Output of axis_fir for a continuous input stream x.
+
+    The RTL accumulates c[i]*x + term[i-1] along the chain, so
+    y[k] = sum_j c[N-1-j] * x[k-j], with 32 bit signed wraparound.
+    Registers start at zero, so the first N-1 outputs only see a partial window.
+    The arithmetic is done by fir_engine.fir with the fastest exact method.
+    """
+    return fir_engine.fir(x, coeffs)
+
+
+def scale_clip(y):
+    """>>>7 then clip to the signed 16 bit range (lowpass output of top.sv)."""
+    return np.clip(np.asarray(y, dtype=np.int64) >> 7, -32768, 32767)
+
+
+def _abs_scale(v):
+    # $signed(-x) is self-determined, so -(-32768) stays -32768 before the multiply.
+    v = np.where(v < 0, wrap(-v, 16), v)
+    return wrap(v * CORDIC_GAIN, CORDIC_FIXED_WIDTH)
+
+
+def _rnd2zerodiv(v, i):
+    # Arithmetic shift that rounds towards zero: add 2**i - 1 to negative values first.
+    return (v + ((v >> 63) & ((1 << i) - 1))) >> i
+
+
+def cordic_magnitude(x, y):
+    """
+    Magnitude output (m00_axis_tdata[15:0]) of the week08 cordic for 16 bit signed
+    inputs x (tdata[15:0]) and y (tdata[31:16]).
+
+    After abs_scale |x|, |y| <= 32768 * CORDIC_GAIN < 2**31, and the rotations
+    grow the vector by at most 1.65 * sqrt(2), so the 33 bit registers of the
+    RTL never overflow and the iterations need no wrapping.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    flips = x < 0
+    x0 = np.where(flips, wrap(-x, 16), x)
+    y0 = np.where(flips, wrap(-y, 16), y)
+    xi = _abs_scale(x0)
+    yi = _abs_scale(y0)
+    for i in range(CORDIC_ITERATIONS):
+        dx = _rnd2zerodiv(yi, i)
+        dy = _rnd2zerodiv(xi, i)
+        # sign is -1 where y < 0 (rotate up) and 0 otherwise; (d ^ sign) - sign negates d where y < 0
+        sign = yi >> 63
+        xi += (dx ^ sign) - sign
+        yi -= (dy ^ sign) - sign
+    return ((xi & ((1 << CORDIC_FIXED_WIDTH) - 1)) >> 16) & 0xFFFF
+
+
+def preamble_detector(matched, threshold):
+    """
+    Trigger of preamble_detector centred on each matched filter sample.
+
+    trigger[c] is high when matched[c] is a strict local maximum that reaches the
+    threshold. The window registers reset to zero, so matched[-1] reads as 0.
+    Comparisons are unsigned 32 bit, as in the RTL.
+    """
+    m = np.asarray(matched, dtype=np.int64) & 0xFFFFFFFF
+    prev = np.concatenate(([0], m[:-1]))
+    nxt = np.concatenate((m[1:], [0]))
+    trigger = (m > prev) & (m > nxt) & (m >= (int(threshold) & 0xFFFFFFFF))
+    # The last sample has no successor yet; the detector window freezes once tvalid drops.
+    if len(trigger):
+        trigger[-1] = False
+    return trigger
+
+
+def adsb_decoder(magnitude, trigger, threshold):
+    """
+    Squitters emitted by the adsb_decoder FSM.
+
+    magnitude[k] and trigger[c] are in sample order; the FSM timing is mapped
+    onto clock edges. A trigger is ignored while a squitter is being decoded.
+    Each returned dict has the 112 bit `data`, an `xmask` of bits that the RTL
+    shifts in as X (no Manchester transition), the matched filter `peak_index`,
+    and the `trigger_cycle`/`valid_cycle` edges.
+    """
+    magnitude = np.asarray(magnitude, dtype=np.int64)
+    n = len(magnitude)
+    if n == 0:
+        return []
+    thresholded = magnitude > (int(threshold) & 0xFFFFFFFF)
+
+    # Trigger edges: t = c + TRIGGER_DELAY. After the input ends the detector
+    # window stops moving; a peak frozen there is only reported once.
+    peaks = np.flatnonzero(trigger)
+    cycles = peaks + TRIGGER_DELAY
+
+    # Sample edges of every physical bit relative to the trigger edge.
+    b = np.arange(SQUITTER_LENGTH)
+    first_edges = (BIT_LENGTH // 2 - TRIGGER_SAMPLE_OFFSET + 1) + 2 * BIT_LENGTH * b
+    second_edges = first_edges + BIT_LENGTH
+    weights = [1 << (SQUITTER_LENGTH - 1 - i) for i in range(SQUITTER_LENGTH)]
+
+    squitters = []
+    busy_until = -1
+    for peak, cycle in zip(peaks.tolist(), cycles.tolist()):
+        if cycle <= busy_until:
+            continue
+        busy_until = cycle + SQUITTER_CYCLES
+        first = thresholded[np.clip(cycle + first_edges - DECODER_MAG_DELAY, 0, n - 1)]
+        second = thresholded[np.clip(cycle + second_edges - DECODER_MAG_DELAY, 0, n - 1)]
+        bits = (first & ~second).tolist()
+        xbits = (first == second).tolist()
+        squitters.append(dict(
+            data=sum(w for w, bit in zip(weights, bits) if bit),
+            xmask=sum(w for w, bit in zip(weights, xbits) if bit),
+            peak_index=peak,
+            trigger_cycle=cycle,
+            valid_cycle=cycle + SQUITTER_CYCLES,
+        ))
+    return squitters
+
+
+def adsb_model(iq, lowpass_coeffs, preamble_coeffs, preamble_detector_threshold, decoder_threshold):
+    """
+    Run a whole IQ capture through the top.sv chain.
+
+    iq is a complex array (real -> tdata[31:16], imag -> tdata[15:0]), converted
+    with astype(np.int16) exactly like test_a. Returns a dict with every
+    intermediate stage and the list of decoded squitters.
+    """
+    iq = np.asarray(iq)
+    real = iq.real.astype(np.int16).astype(np.int64)
+    imag = iq.imag.astype(np.int16).astype(np.int64)
+
+    lowpass_real = axis_fir(real, lowpass_coeffs)
+    lowpass_imag = axis_fir(imag, lowpass_coeffs)
+    clipped_real = scale_clip(lowpass_real)
+    clipped_imag = scale_clip(lowpass_imag)
+    # The cordic sees {real, imag}, i.e. x = imag and y = real.
+    magnitude = cordic_magnitude(clipped_imag, clipped_real)
+    matched = axis_fir(magnitude, preamble_coeffs)
+    trigger = preamble_detector(matched, preamble_detector_threshold)
+    squitters = adsb_decoder(magnitude, trigger, decoder_threshold)
+
+    return dict(
+        real=real,
+        imag=imag,
+        lowpass_real=lowpass_real,
+        lowpass_imag=lowpass_imag,
+        clipped_real=clipped_real,
+        clipped_imag=clipped_imag,
+        magnitude=magnitude,
+        matched=matched,
+        trigger=trigger,
+        squitters=squitters,
+    )
@@ -0,0 +1,143 @@
+"""
+Fast exact models of axis_fir.sv.
+
+axis_fir computes y[k] = sum_j c[N-1-j] * x[k-j] in a 32 bit signed
+accumulator. Doing that directly costs N multiplies per sample, which is
+fine for the 75 tap lowpass and adds up for the 512 tap preamble matched
+filter. fir() picks the cheapest method that gives the same bits for the
+coefficient vector:
+
+    box     piecewise-constant taps (the 0/1 preamble): one prefix sum of x,
+            then one shifted add per run boundary, independent of N
+    fft     long generic filters: overlap-save with real FFTs on 16 bit limbs
+            of x, small enough that float64 rounds back to exact integers
+    direct  short filters: np.convolve
+
+All methods work modulo 2**32, so the RTL's wraparound falls out for free.
+"""
+import numpy as np
+
+FFT_BLOCK = 1 << 12  # default overlap-save FFT size (grown for long filters)
+FFT_BATCH = 64  # overlap-save blocks transformed per np.fft call
+FFT_EXACT_BOUND = 1 << 40  # largest |partial sum| trusted to round back exactly
+BOX_MAX_RUNS = 32
+DIRECT_MAX_TAPS = 64
+
+
+def wrap(values, bits):
+    """Reinterpret int64 values as `bits`-wide two's complement (Verilog overflow)."""
+    half = 1 << (bits - 1)
+    return ((np.asarray(values, dtype=np.int64) + half) & ((1 << bits) - 1)) - half
+
+
+def runs(coeffs):
+    """(start, stop, value) of every constant, nonzero run of coeffs."""
+    c = np.asarray(coeffs, dtype=np.int64)
+    if len(c) == 0:
+        return []
+    edges = np.flatnonzero(np.diff(c)) + 1
+    starts = np.concatenate(([0], edges))
+    stops = np.concatenate((edges, [len(c)]))
+    return [(int(a), int(b), int(c[a])) for a, b in zip(starts, stops) if c[a]]
+
+
+def choose_method(coeffs):
+    """Cheapest exact method for these taps: 'box', 'direct' or 'fft'."""
+    n = len(coeffs)
+    if len(runs(coeffs)) <= min(BOX_MAX_RUNS, max(1, n // 4)):
+        return "box"
+    if n <= DIRECT_MAX_TAPS:
+        return "direct"
+    return "fft"
+
+
+def direct_fir(x, coeffs):
+    """Reference: np.convolve, O(N) per sample."""
+    x = np.asarray(x, dtype=np.int64)
+    h = np.asarray(coeffs, dtype=np.int64)[::-1]
+    return np.convolve(x, h)[:len(x)]
+
+
+def box_fir(x, coeffs):
+    """
+    Sum of box filters, one per constant run of the taps.
+
+    With reversed taps h[j] = c[N-1-j], a run c[a:b] == v covers lags N-b ..
+    N-1-a, so it adds v * (S[k+1-(N-b)] - S[k+1-(N-a)]) where S is the prefix
+    sum of x. Runs that touch share a lag, so each distinct lag is one shifted
+    slice add. int64 overflow only loses bits above bit 63, so the low 32
+    bits stay exact.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    n = len(coeffs)
+    total = np.cumsum(x)
+    weights = {}
+    for a, b, v in runs(coeffs):
+        weights[n - b] = weights.get(n - b, 0) + v
+        weights[n - a] = weights.get(n - a, 0) - v
+    y = np.zeros(len(x), dtype=np.int64)
+    for lag, w in weights.items():
+        if w and lag < len(x):
+            y[lag:] += w * total[:len(x) - lag]
+    return y
+
+
+def _fft_conv(x, h, nfft):
+    # Overlap-save: block i covers outputs [i*step, (i+1)*step) and needs the
+    # len(h)-1 inputs before it, which are zero before the stream starts.
+    m = len(h)
+    step = nfft - m + 1
+    n = len(x)
+    padded = np.zeros(m - 1 + n + step, dtype=np.float64)
+    padded[m - 1:m - 1 + n] = x
+    H = np.fft.rfft(h.astype(np.float64), nfft)
+    y = np.empty(n, dtype=np.int64)
+    blocks = (n + step - 1) // step
+    for first in range(0, blocks, FFT_BATCH):
+        last = min(first + FFT_BATCH, blocks)
+        frames = np.lib.stride_tricks.as_strided(
+            padded[first * step:], shape=(last - first, nfft),
+            strides=(step * padded.strides[0], padded.strides[0]))
+        out = np.fft.irfft(np.fft.rfft(frames, nfft) * H, nfft)[:, m - 1:]
+        lo = first * step
+        hi = min(last * step, n)
+        y[lo:hi] = np.rint(out.ravel()[:hi - lo])
+    return y
+
+
+def fft_fir(x, coeffs, nfft=None):
+    """
+    Overlap-save FFT convolution, exact modulo 2**32.
+
+    Only x mod 2**32 matters for the wrapped result, so x is split into two
+    unsigned 16 bit limbs and each limb is convolved separately; that keeps
+    every float64 partial sum far below 2**53.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    h = np.asarray(coeffs, dtype=np.int64)[::-1]
+    if (1 << 16) * int(np.abs(h).sum()) > FFT_EXACT_BOUND:
+        return direct_fir(x, coeffs)
+    if nfft is None:
+        nfft = max(FFT_BLOCK, 1 << int(np.ceil(np.log2(4 * len(h)))))
+    xu = x & 0xFFFFFFFF
+    y = _fft_conv(xu & 0xFFFF, h, nfft)
+    if (xu >> 16).any():
+        y += _fft_conv(xu >> 16, h, nfft) << 16
+    return y
+
+
+METHODS = dict(box=box_fir, direct=direct_fir, fft=fft_fir)
+
+
+def fir(x, coeffs, method="auto", bits=32):
+    """
+    axis_fir output for a continuous input stream x, wrapped to `bits` bits.
+
+    method: 'auto' (see choose_method), 'box', 'fft' or 'direct'. Every method
+    gives identical results; they only differ in speed.
+    """
+    if method == "auto":
+        method = choose_method(coeffs)
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return wrap(METHODS[method](x, coeffs), bits)
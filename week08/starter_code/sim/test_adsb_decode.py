@@ -2,6 +2,8 @@
 
 import cocotb
 import lowpass
+import iq_capture
+import json
 import os
 import random
 import sys
@@ -10,141 +12,90 @@ import numpy
 import logging
 from pathlib import Path
 from cocotb.clock import Clock
-from cocotb.triggers import Timer, ClockCycles, RisingEdge, FallingEdge, ReadOnly,with_timeout
-from cocotb.utils import get_sim_time as gst
+from cocotb.triggers import Timer, ClockCycles,with_timeout
 from cocotb.runner import get_runner
 #from vicoco.vivado_runner import get_runner
-#new!!!
-from cocotb_bus.bus import Bus
-from cocotb_bus.drivers import BusDriver
-from cocotb_bus.monitors import Monitor
-from cocotb_bus.monitors import BusMonitor
-from cocotb_bus.scoreboard import Scoreboard
-import numpy as np
 test_file = os.path.basename(__file__).replace(".py","")
 
-proj_path = Path(__file__).resolve().parent.parent
+# The two squitters in the bundled adsb_squitters_fake_50dbm_64MSPS_iq.np capture
+CAPTURE_SQUITTERS = [0x8d780976990c83ad98041dc0fbd7, 0x8d780976990c83ad98041dc0fbd7]
 
-class AXISMonitor(BusMonitor):
-    """
-    monitors axi streaming bus
-    """
-    transactions = 0 #use this variable to track good ready/valid handshakes
-    def __init__(self, dut, name, clk, callback=None):
-        self._signals = ['axis_tvalid','axis_tready','axis_tlast','axis_tdata','axis_tstrb']
-        BusMonitor.__init__(self, dut, name, clk, callback=callback)
-        self.clock = clk
-        self.transactions = 0
-    async def _monitor_recv(self):
-        """
-        Monitor receiver
-        """
-        rising_edge = RisingEdge(self.clock) # make these coroutines once and reuse
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly() #This is
-        while True:
-            await rising_edge
-            await falling_edge #sometimes see in AXI shit
-            await read_only  #readonly (the postline)
-            valid = self.bus.axis_tvalid.value
-            ready = self.bus.axis_tready.value
-            last = self.bus.axis_tlast.value
-            data = self.bus.axis_tdata.value #.signed_integer
-            if valid and ready:
-                self.transactions+=1
-                thing = dict(data=data.signed_integer,last=last,name=self.name,count=self.transactions,time=gst())
-                #print(f"{self.name}: {thing}")
-                self._recv(data)
-
-class AXISDriver(BusDriver):
-    def __init__(self, dut, name, clk, role="M"):
-        self._signals = ['axis_tvalid', 'axis_tready', 'axis_tlast', 'axis_tdata','axis_tstrb']
-        BusDriver.__init__(self, dut, name, clk)
-        self.clock = clk
-        if role=='M':
-            self.role = role
-            self.bus.axis_tdata.value = 0
-            self.bus.axis_tstrb.value = 0
-            self.bus.axis_tlast.value = 0
-            self.bus.axis_tvalid.value = 0
-        elif role == 'S':
-            self.role = role
-            self.bus.axis_tready.value = 0
-        else:
-            raise ValueError("role can only be 'M' or 'S'")
-
-    async def _driver_send(self, value, sync=True):
-        rising_edge = RisingEdge(self.clock) # make these coroutines once and reuse
-        falling_edge = FallingEdge(self.clock)
-        read_only = ReadOnly() #This is
-        if self.role == 'M':
-            if value.get("type") == "write_single":
-                await falling_edge #wait until after a rising edge has passed.
-                self.bus.axis_tdata.value = value.get('contents').get('data')
-                self.bus.axis_tstrb.value = 0xF
-                self.bus.axis_tlast.value = value.get('contents').get('last')
-                self.bus.axis_tvalid.value = 1 #set valid to be 1
-                await read_only
-                if self.bus.axis_tready.value == 0: #ifnot there...
-                    await RisingEdge(self.bus.axis_tready) #wait until it does go high
-                await rising_edge
-                #self.bus.axis_tvalid.value = 0 #set to 0 and be done.
-            elif value.get("type") == "pause":
-                await falling_edge
-                self.bus.axis_tvalid.value = 0 #set to 0 and be done.
-                await ClockCycles(self.clock,value.get("duration",1))
-            elif value.get("type") == "write_burst":
-                data = value.get("contents").get("data")
-                for i in range(len(data)):
-                    await falling_edge
-                    self.bus.axis_tdata.value = int(data[i])
-                    if i == len(data)-1:
-                        self.bus.axis_tlast.value = 1
-                    else:
-                        self.bus.axis_tlast.value = 0
-                    self.bus.axis_tvalid.value = 1
-                    if self.bus.axis_tready.value == 0:
-                        await RisingEdge(self.bus.axis_tready)
-                    await rising_edge
-                #self.bus.axis_tvalid.value = 0
-                #self.bus.axis_tlast.value = 0
-            else:
-                pass
-        elif self.role == 'S':
-            if value.get("type") == "pause":
-                await falling_edge
-                self.bus.axis_tready.value = 0 #set to 0 and be done.
-                await ClockCycles(self.clock,value.get("duration",1))
-            elif value.get("type") == "read_single":
-                await falling_edge #wait until after a rising edge has passed.
-                self.bus.axis_tready.value = 1 #set valid to be 1
-                await read_only
-                if self.bus.axis_tvalid.value == 0: #ifnot there...
-                    await RisingEdge(self.bus.axis_tvalid) #wait until it does go high
-                await rising_edge
-                self.bus.axis_tready.value = 0 #set to 0 and be done.
-            elif value.get("type") == "read_burst":
-                for i in range(value.get("duration",1)):
-                    await falling_edge #wait until after a rising edge has passed.
-                    self.bus.axis_tready.value = 1 #set valid to be 1
-                    await read_only
-                    if self.bus.axis_tvalid.value == 0: #ifnot there...
-                        await RisingEdge(self.bus.axis_tvalid) #wait until it does go high
-                    await rising_edge
-                self.bus.axis_tready.value = 0 #set to 0 and be done.
+proj_path = Path(__file__).resolve().parent.parent
+sys.path.append(str(proj_path / "sim" / "model"))
+sys.path.append(str(proj_path.parent.parent))  # repo root, for simlib
+import adsb_model
+import adsb_traffic
+import adsb_windows
+import crc24
+from simlib.axis import AXISMonitor, AXISSink, AXISSource
+from simlib.build_cache import cached_build
+from simlib.clock import even_period
+from simlib.completion import until_done
+from simlib import widebus
 
 async def reset(clk,rst, cycles_held = 3,polarity=1):
     rst.value = polarity
     await ClockCycles(clk, cycles_held)
     rst.value = not polarity
 
-'''
-{"type":"write_single", "contents": {"data":5, "last":0}}
-{"type":"pause","duration":10}
-{"type":"write_burst", "contents": {"data": np.array(9*[0]+[1]+30*[0]+[-2]+59*[0])}}
-{"type":"read_single"}
-{"type":"read_burst", "duration":10}
-'''
+def fit_taps(coeffs, port):
+    """coeffs cut or zero-padded to the taps of a packed coefficient port (NUM_COEFFS_* of the variant)"""
+    n = len(port) // 8
+    return (list(coeffs) + [0] * n)[:n]
+
+async def start_top(dut, preamble, preamble_detector_threshold, decoder_threshold):
+    """
+    Load coefficients and thresholds into top, then start the clock and reset.
+    Returns the (preamble, lowpass) taps actually loaded, fitted to the build's
+    NUM_COEFFS_PREAMBLE_DETECTOR/NUM_COEFFS_LOWPASS; the model must use those.
+    """
+    preamble = fit_taps(preamble, dut.preamble_coeffs)
+    lowpass_taps = fit_taps(lowpass.lowpass_coeffs, dut.lowpass_coeffs)
+    widebus.write(dut.preamble_coeffs, preamble, 8)
+    widebus.write(dut.lowpass_coeffs, lowpass_taps, 8)
+
+    dut.preamble_detector_threshold.value = preamble_detector_threshold
+    dut.decoder_threshold.value = decoder_threshold
+
+    # 64 MHz clock; one step longer where the precision cannot split 15625 ps into two half periods
+    cocotb.start_soon(Clock(dut.s00_axis_aclk, even_period(15625, "ps"), units="step").start())
+    await reset(dut.s00_axis_aclk, dut.s00_axis_aresetn,2,0)
+    return preamble, lowpass_taps
+
+async def _unmask_threshold(dut, cycles, threshold):
+    await ClockCycles(dut.s00_axis_aclk, cycles)
+    dut.preamble_detector_threshold.value = threshold
+
+async def run_windows(dut, ind, words, plan, preamble_detector_threshold, positions=None):
+    """
+    Stream only the windows of an adsb_windows plan through top, back to back.
+
+    preamble_detector_threshold is held at its maximum while each window's
+    pre-roll refills the pipeline, then restored just before the first
+    candidate reaches the detector. If `positions` is a list, the absolute
+    capture sample at which each window starts is appended to it as the window
+    begins, so output times can be mapped back onto the capture.
+    Returns the number of clock cycles simulated.
+    """
+    simulated = 0
+    for w in plan["windows"]:
+        dut.preamble_detector_threshold.value = adsb_windows.THRESHOLD_MASK
+        unmask = cocotb.start_soon(_unmask_threshold(dut, w["lead"] + adsb_model.TRIGGER_DELAY,
+                                                     preamble_detector_threshold))
+        if positions is not None:
+            positions.append((w["start"], ind.cycles))
+        await ind.send(words[w["start"]:w["stop"]])
+        unmask.kill()
+        dut.preamble_detector_threshold.value = preamble_detector_threshold
+        await ClockCycles(dut.s00_axis_aclk, 2)  # let the final tvalid pulse be taken
+        simulated += ind.stream_cycles + 2
+    return simulated
+
+def squitter_binstr(squitter):
+    """Model squitter as the binstr the DUT shows, with x where no Manchester transition was seen."""
+    bits = format(squitter["data"], "0112b")
+    xmask = format(squitter["xmask"], "0112b")
+    return "".join("x" if x == "1" else b for b, x in zip(bits, xmask))
 
 @cocotb.test()
 async def test_a(dut):
@@ -152,77 +103,151 @@ async def test_a(dut):
     received_squitters = []
 
     inm = AXISMonitor(dut,'s00',dut.s00_axis_aclk)
-    outm = AXISMonitor(dut,'m00',dut.s00_axis_aclk, callback = lambda x: received_squitters.append(x.integer))
-    ind = AXISDriver(dut,'s00',dut.s00_axis_aclk,"M") #M driver for S port
-    outd = AXISDriver(dut,'m00',dut.s00_axis_aclk,"S") #S driver for M port
+    outm = AXISMonitor(dut,'m00',dut.s00_axis_aclk, callback = received_squitters.append)
+    ind = AXISSource(dut,'s00',dut.s00_axis_aclk) #M driver for S port
+    outd = AXISSink(dut,'m00',dut.s00_axis_aclk, ready=True) #S driver for M port: always ready
    
     # Load coefficients (ADS-B preamble)
     SAMPLE_RATE = 64e6
-    SAMPLE_PERIOD = 1 / SAMPLE_RATE
-
-    preamble_length = int(8e-6 / SAMPLE_PERIOD) # Preamble is 8 microseconds long
-    preamble = []
-    preamble += [1] * int(0.5e-6 / SAMPLE_PERIOD)
-    preamble += [0] * int(0.5e-6 / SAMPLE_PERIOD)
-    preamble += [1] * int(0.5e-6 / SAMPLE_PERIOD)
-    preamble += [0] * int(2e-6 / SAMPLE_PERIOD)
-    preamble += [1] * int(0.5e-6 / SAMPLE_PERIOD)
-    preamble += [0] * int(0.5e-6 / SAMPLE_PERIOD)
-    preamble += [1] * int(0.5e-6 / SAMPLE_PERIOD)
-    preamble += [0] * int(3e-6 / SAMPLE_PERIOD)
-
-    assert len(preamble) == preamble_length, "Preamble generation failed"
-
-    preamble_coeffs_packed = 0
-    for i in range(preamble_length):
-        preamble_coeffs_packed |= (preamble[i] & 0xFF) << (i * 8)
-    print("Preamble coeffs packed:")
-    print(hex(preamble_coeffs_packed))
-    dut.preamble_coeffs.value = preamble_coeffs_packed
-
-    lowpass_coeffs_packed = 0
-    for i in range(len(lowpass.lowpass_coeffs)):
-        lowpass_coeffs_packed |= (lowpass.lowpass_coeffs[i] & 0xFF) << (i * 8)
-    print("Lowpass coeffs packed:")
-    print(hex(lowpass_coeffs_packed))
-    dut.lowpass_coeffs.value = lowpass_coeffs_packed
-
-    dut.preamble_detector_threshold.value = 8000
-    dut.decoder_threshold.value = 40
-
-    #cocotb.start_soon(Clock(dut.s00_axis_aclk, 15625, units="ps").start()) # 64 MHz clock
-    cocotb.start_soon(Clock(dut.s00_axis_aclk, 15626, units="ps").start()) # 64 MHz clock, plus 1 ps so that /2 is even for simulator issues
-    await reset(dut.s00_axis_aclk, dut.s00_axis_aresetn,2,0)
+    preamble = adsb_model.preamble_coeffs(SAMPLE_RATE)
+    preamble_detector_threshold = 8000
+    decoder_threshold = 40
+    preamble, lowpass_taps = await start_top(dut, preamble, preamble_detector_threshold, decoder_threshold)
 
     # Load example ADC data.
     #adc_data_iq = np.load(proj_path / "sim" / "adsb_squitter_64MSPS_iq.np")
-    adc_data_iq = np.load(proj_path / "sim" / "adsb_squitters_fake_50dbm_64MSPS_iq.np")
-    #adc_data_iq = np.load(proj_path / "sim" / "adsb_squitters_fake_40dbm_64MSPS_iq_again.np")
-    real_data = adc_data_iq.real.astype(np.int16)
-    imag_data = adc_data_iq.imag.astype(np.int16)
-    packed_data = np.zeros((len(real_data),), dtype = np.uint32)
-    for i in range(len(real_data)):
-        packed_data[i] = (real_data[i].astype(np.int32) << 16) | (imag_data[i].astype(np.uint32) & 0xFFFF)
+    adc_data_iq = iq_capture.load_capture(proj_path / "sim" / "adsb_squitters_fake_50dbm_64MSPS_iq.np")
+    #adc_data_iq = iq_capture.load_capture(proj_path / "sim" / "adsb_squitters_fake_40dbm_64MSPS_iq_again.np")
+    packed_data = iq_capture.pack_words(adc_data_iq)
 
     # Write the example ADC data.
-    data = {'type':'write_burst', "contents": {"data": packed_data}}
-    ind.append(data)
-    pause = {"type": "pause","duration": 1}
-    ind.append(pause)
+    feed = ind.start(packed_data)
 
-    # Read the processed data.
-    data = {'type':'read_burst', "duration": 3}
-    outd.append(data)
-    outd.append(pause)
+    # Expected squitters from the bit-exact model (cycles count from the edge that takes sample 0,
+    # which is two edges after reset: the source drives it after the next edge).
+    run_cycles = len(adc_data_iq) + len(preamble) + 100
+    model = adsb_model.adsb_model(adc_data_iq, lowpass_taps, preamble,
+                                  preamble_detector_threshold, decoder_threshold)
+    expected_squitters = [s["data"] for s in model["squitters"] if s["valid_cycle"] < run_cycles - 2]
+    assert expected_squitters == CAPTURE_SQUITTERS, \
+        f"model decodes {[hex(s) for s in expected_squitters]} from the capture, expected the two known squitters"
 
-    await ClockCycles(dut.s00_axis_aclk, len(adc_data_iq) + len(preamble) + 100)
+    # Stop once the capture is in and every expected squitter is out
+    await until_done(outm, beats=len(expected_squitters), source=feed, timeout=run_cycles, budget=run_cycles,
+                     log=dut._log)
 
     print("Received squitters:")
     print(received_squitters)
-    assert [0x8d780976990c83ad98041dc0fbd7, 0x8d780976990c83ad98041dc0fbd7] == received_squitters
+    assert expected_squitters == received_squitters
+    assert crc24.crc_ok(received_squitters).all()
 
-def adsb_runner():
-    """Simulate the ADSB decoder using the Python runner."""
+@cocotb.test()
+async def test_synthetic_traffic(dut):
+    """Dense synthetic DF17 traffic (overlapping frames, mixed SNR) checked against the model"""
+    received_squitters = []
+
+    outm = AXISMonitor(dut,'m00',dut.s00_axis_aclk, binstr=True, callback = lambda x: received_squitters.append(x.lower()))
+    ind = AXISSource(dut,'s00',dut.s00_axis_aclk)
+    outd = AXISSink(dut,'m00',dut.s00_axis_aclk, ready=True)
+
+    preamble = adsb_model.preamble_coeffs()
+    preamble_detector_threshold = 8000
+    decoder_threshold = 40
+    preamble, lowpass_taps = await start_top(dut, preamble, preamble_detector_threshold, decoder_threshold)
+
+    adc_data_iq, messages = adsb_traffic.cached_traffic(
+        num_squitters=12, num_samples=1 << 17, snr_db=20, snr_spread_db=8,
+        carrier_offset=50e3, phase_noise=0.01, overlap=True, seed=17)
+    feed = ind.start(iq_capture.pack_words(adc_data_iq))
+
+    run_cycles = len(adc_data_iq) + len(preamble) + 100
+    model = adsb_model.adsb_model(adc_data_iq, lowpass_taps, preamble,
+                                  preamble_detector_threshold, decoder_threshold)
+    expected = [s for s in model["squitters"] if s["valid_cycle"] < run_cycles - 2]
+
+    await until_done(outm, beats=len(expected), source=feed, timeout=run_cycles, budget=run_cycles, log=dut._log)
+
+    truth = {m["data"] for m in messages}
+    decoded = sum(s["xmask"] == 0 and s["data"] in truth for s in expected)
+    dut._log.info(f"{len(messages)} squitters sent, {len(expected)} decoder outputs, {decoded} match ground truth")
+    intact = [int(s, 2) for s in received_squitters if not s.strip("01")]
+    repaired, flipped = crc24.correct(intact)
+    dut._log.info(f"{int((flipped == 0).sum())} outputs pass CRC, {int((flipped > 0).sum())} more after 1-2 bit repair, "
+                  f"{len(truth & set(repaired)) - len(truth & set(intact))} sent squitters recovered by repair")
+    assert [squitter_binstr(s) for s in expected] == received_squitters
+
+@cocotb.test(skip=os.getenv("ADSB_SWEEP_POINT") is None)
+async def test_sweep_point(dut):
+    """One point of an adsb_sweep.py run; settings come from $ADSB_SWEEP_POINT"""
+    point = json.loads(os.environ["ADSB_SWEEP_POINT"])
+    received_squitters = []
+
+    outm = AXISMonitor(dut,'m00',dut.s00_axis_aclk, binstr=True, callback = lambda x: received_squitters.append(x.lower()))
+    ind = AXISSource(dut,'s00',dut.s00_axis_aclk)
+    outd = AXISSink(dut,'m00',dut.s00_axis_aclk, ready=True)
+
+    preamble = adsb_model.preamble_coeffs()
+    preamble, lowpass_taps = await start_top(dut, preamble, point["preamble_detector_threshold"],
+                                             point["decoder_threshold"])
+
+    if point.get("capture"):
+        adc_data_iq, messages = iq_capture.load_capture(point["capture"]), None
+    else:
+        adc_data_iq, messages = adsb_traffic.cached_traffic(**point["traffic"])
+
+    full_cycles = len(adc_data_iq) + len(preamble) + 100
+    if point.get("windowed"):
+        plan = adsb_windows.plan_windows(adc_data_iq, lowpass_taps, preamble,
+                                         point["preamble_detector_threshold"], point["decoder_threshold"])
+        expected = plan["squitters"]
+        run_cycles = await run_windows(dut, ind, iq_capture.pack_words(adc_data_iq), plan,
+                                       point["preamble_detector_threshold"])
+    else:
+        feed = ind.start(iq_capture.pack_words(adc_data_iq))
+        model = adsb_model.adsb_model(adc_data_iq, lowpass_taps, preamble,
+                                      point["preamble_detector_threshold"], point["decoder_threshold"])
+        expected = [s for s in model["squitters"] if s["valid_cycle"] < full_cycles - 2]
+        done = await until_done(outm, beats=len(expected), source=feed, timeout=full_cycles, budget=full_cycles)
+        run_cycles = done["cycles"]
+
+    result = dict(point, received=received_squitters, expected=[squitter_binstr(s) for s in expected],
+                  truth=None if messages is None else [f"{m['data']:028x}" for m in messages],
+                  sim_cycles=run_cycles, skipped_cycles=full_cycles - run_cycles)
+    with open(os.environ["ADSB_SWEEP_RESULT"], "w") as f:
+        json.dump(result, f)
+
+@cocotb.test()
+async def test_windowed(dut):
+    """test_a on only the windows around candidate preambles; the idle stretches are skipped"""
+    received_squitters = []
+    positions = []
+    ind = AXISSource(dut,'s00',dut.s00_axis_aclk)
+    # Sample 0 of a window is clocked in two edges after send() starts.
+    outm = AXISMonitor(dut,'m00',dut.s00_axis_aclk, binstr=True, callback = lambda x: received_squitters.append(
+        (x.lower(), positions[-1][0] + ind.cycles - positions[-1][1] - 2)))
+    outd = AXISSink(dut,'m00',dut.s00_axis_aclk, ready=True)
+
+    preamble = adsb_model.preamble_coeffs()
+    preamble_detector_threshold = 8000
+    decoder_threshold = 40
+    preamble, lowpass_taps = await start_top(dut, preamble, preamble_detector_threshold, decoder_threshold)
+
+    adc_data_iq = iq_capture.load_capture(proj_path / "sim" / "adsb_squitters_fake_50dbm_64MSPS_iq.np")
+    plan = adsb_windows.plan_windows(adc_data_iq, lowpass_taps, preamble,
+                                     preamble_detector_threshold, decoder_threshold)
+    simulated = await run_windows(dut, ind, iq_capture.pack_words(adc_data_iq), plan,
+                                  preamble_detector_threshold, positions)
+
+    full_cycles = len(adc_data_iq) + len(preamble) + 100
+    dut._log.info(f"{len(plan['windows'])} windows: {simulated} cycles simulated, "
+                  f"{full_cycles - simulated} of {full_cycles} skipped ({full_cycles / max(simulated, 1):.1f}x)")
+    for (binstr, position), s in zip(received_squitters, plan["squitters"]):
+        dut._log.info(f"squitter {int(binstr, 2) if not binstr.strip('01') else binstr} at sample {position} "
+                      f"(model: {s['valid_cycle']})")
+    assert [squitter_binstr(s) for s in plan["squitters"]] == [b for b, _ in received_squitters]
+
+def adsb_build(parameters=None, build_dir="sim_build", waves=True):
+    """Compile top with `parameters` (or reuse a cached build) and return the runner; runs can share the build (see adsb_sweep.py)."""
     hdl_toplevel_lang = os.getenv("HDL_TOPLEVEL_LANG", "verilog")
     sim = os.getenv("SIM", "icarus")
     #sim = os.getenv("SIM", "vivado")
@@ -231,24 +256,29 @@ def adsb_runner():
     sources = [proj_path / "hdl" / "axis_fir.sv", proj_path / "hdl" / "preamble_detector.sv", proj_path / "hdl" / "top.sv", proj_path / "hdl" / "adsb_decoder.sv", proj_path / "hdl" / "cordic.sv"]
     #sources = [proj_path / "hdl" / "j_math.sv"]
     build_test_args = ["-Wall"]
-    parameters = {} #!!!
     sys.path.append(str(proj_path / "sim"))
     runner = get_runner(sim)
-    hdl_toplevel = "top"
-    runner.build(
+    cached_build(
+        runner,
         sources=sources,
-        hdl_toplevel=hdl_toplevel,
-        always=True,
+        hdl_toplevel="top",
+        build_dir=build_dir,
         build_args=build_test_args,
-        parameters=parameters,
+        parameters=dict(parameters or {}),
         timescale = ('1ps','1fs'),
-        waves=True
+        waves=waves
     )
+    return runner
+
+def adsb_runner():
+    """Simulate the ADSB decoder using the Python runner."""
+    runner = adsb_build()
     run_test_args = []
     runner.test(
-        hdl_toplevel=hdl_toplevel,
+        hdl_toplevel="top",
         test_module=test_file,
         test_args=run_test_args,
+        test_dir="sim_build",
         waves=True
     )
 if __name__ == "__main__":